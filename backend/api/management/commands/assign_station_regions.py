@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from api.models import PetrolStation
+from api.services.change_log import record_station_changes
+from api.services.regions import assign_station_region
+
+
+class Command(BaseCommand):
+    help = 'Backfill province and price zone on stations from the stored region boundaries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--all', action='store_true', help='Re-resolve stations that already have a province')
+
+    def handle(self, *args, **options):
+        stations = PetrolStation.objects.only('id', 'latitude', 'longitude', 'province', 'price_zone')
+        if not options['all']:
+            stations = stations.filter(province='')
+
+        changed = []
+        updated = 0
+        for station in stations.iterator(chunk_size=options['batch_size']):
+            if assign_station_region(station):
+                changed.append(station)
+            if len(changed) >= options['batch_size']:
+                updated += PetrolStation.objects.bulk_update(changed, ['province', 'price_zone'])
+                record_station_changes(changed)
+                changed = []
+        if changed:
+            updated += PetrolStation.objects.bulk_update(changed, ['province', 'price_zone'])
+            record_station_changes(changed)
+
+        self.stdout.write(f"Updated region on {updated} stations")
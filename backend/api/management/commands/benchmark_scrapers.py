@@ -0,0 +1,48 @@
+from pathlib import Path
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.services.scrapers import SCRAPERS
+
+FIXTURE_DIR = Path(__file__).resolve().parents[2] / 'scraper_fixtures'
+CHUNK_SIZE = 8192
+
+
+class Command(BaseCommand):
+    help = 'Measure price extraction time per scraper against the saved HTML fixtures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--compare-soup', action='store_true',
+                            help='Also time a full BeautifulSoup html.parser tree of each fixture')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+
+        for scraper in SCRAPERS:
+            fixture = FIXTURE_DIR / f"{scraper.name.replace('.', '_')}.html"
+            if not fixture.exists():
+                self.stdout.write(self.style.WARNING(f"{scraper.name}: no fixture at {fixture}"))
+                continue
+
+            html = fixture.read_text(encoding='utf-8')
+            chunks = [html[i:i + CHUNK_SIZE] for i in range(0, len(html), CHUNK_SIZE)]
+
+            started = time.perf_counter()
+            for _ in range(iterations):
+                prices = scraper.extract(chunks)
+            elapsed_ms = (time.perf_counter() - started) * 1000 / iterations
+
+            line = f"{scraper.name}: {elapsed_ms:.2f} ms/parse ({len(html) // 1024} KB) -> {prices}"
+
+            if options['compare_soup']:
+                from bs4 import BeautifulSoup
+
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    BeautifulSoup(html, 'html.parser')
+                soup_ms = (time.perf_counter() - started) * 1000 / iterations
+                line += f" | BeautifulSoup tree: {soup_ms:.2f} ms"
+
+            self.stdout.write(line)
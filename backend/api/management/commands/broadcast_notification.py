@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Notification
+from api.services.notifications import broadcast
+
+
+class Command(BaseCommand):
+    help = 'Send a notification to every active user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('title')
+        parser.add_argument('message')
+        parser.add_argument(
+            '--type', dest='notification_type', default='SYSTEM',
+            choices=[choice for choice, _ in Notification.NOTIFICATION_TYPES],
+        )
+
+    def handle(self, *args, **options):
+        sent = broadcast(options['title'], options['message'], options['notification_type'])
+        self.stdout.write(f"Sent to {sent} users")
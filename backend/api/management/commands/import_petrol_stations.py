@@ -2,7 +2,7 @@ import requests
 import time
 from django.core.management.base import BaseCommand
 from api.models import PetrolStation, FuelCompany
-from django.contrib.gis.geos import Point
+from api.services.regions import resolve_region
 
 class Command(BaseCommand):
     help = 'Import petrol stations from OpenStreetMap using Overpass API'
@@ -49,6 +49,7 @@ class Command(BaseCommand):
 
             company_name = tags.get('brand') or tags.get('operator') or "Unknown"
             company, _ = FuelCompany.objects.get_or_create(name=company_name)
+            region = resolve_region(lat, lon)
 
             station, created = PetrolStation.objects.update_or_create(
                 name=name,
@@ -71,6 +72,8 @@ class Command(BaseCommand):
                     'has_ev_charging': tags.get('fuel:electricity', '') == "yes",
                     'busy_level': 'low',
                     'wait_time': 0,
+                    'province': region.province,
+                    'price_zone': region.price_zone,
                     'is_active': True
                 }
             )
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import RegionBoundary
+
+
+class Command(BaseCommand):
+    help = 'Load province or fuel price zone boundaries from a GeoJSON FeatureCollection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='GeoJSON file with Polygon/MultiPolygon features')
+        parser.add_argument('--kind', choices=[code for code, _ in RegionBoundary.KIND_CHOICES], required=True)
+        parser.add_argument('--name-property', default='name',
+                            help="Feature property holding the region name (province name, or 'coastal'/'inland')")
+        parser.add_argument('--replace', action='store_true', help='Delete existing boundaries of this kind first')
+
+    def handle(self, *args, **options):
+        with open(options['path'], encoding='utf-8') as geojson_file:
+            data = json.load(geojson_file)
+
+        features = data.get('features') if data.get('type') == 'FeatureCollection' else [data]
+        loaded = 0
+
+        with transaction.atomic():
+            if options['replace']:
+                RegionBoundary.objects.filter(kind=options['kind']).delete()
+
+            for feature in features:
+                geometry = feature.get('geometry') or {}
+                if geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+                    self.stderr.write(f"Skipping feature with {geometry.get('type')} geometry")
+                    continue
+
+                name = (feature.get('properties') or {}).get(options['name_property'])
+                if not name:
+                    raise CommandError(f"Feature without a '{options['name_property']}' property")
+
+                RegionBoundary.objects.update_or_create(
+                    kind=options['kind'],
+                    code=name.strip().lower(),
+                    defaults={'name': name.strip(), 'geometry': geometry},
+                )
+                loaded += 1
+
+        self.stdout.write(f"Loaded {loaded} {options['kind']} boundaries")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.services.amenities import rebuild_amenity_flags
+
+
+class Command(BaseCommand):
+    help = 'Recompute the amenity bitmask on every station from its amenities and has_* flags'
+
+    def handle(self, *args, **options):
+        corrected = rebuild_amenity_flags()
+        self.stdout.write(f"Corrected amenity flags on {corrected} stations")
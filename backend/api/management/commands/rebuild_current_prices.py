@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.services.price_ingestion import rebuild_current_prices
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the current price table from the full FuelPrice history'
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_current_prices()
+        self.stdout.write(f"Rebuilt {rebuilt} current price rows")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.services.traffic import rebuild_current_traffic
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the current traffic table from the full StationTraffic history'
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_current_traffic()
+        self.stdout.write(f"Rebuilt {rebuilt} current traffic rows")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.services.ratings import rebuild_station_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored review aggregates on every station'
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_station_ratings()
+        self.stdout.write(f"Rebuilt rating aggregates for {rebuilt} stations")
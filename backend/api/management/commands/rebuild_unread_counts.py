@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.services.notifications import rebuild_unread_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's unread notification counter"
+
+    def handle(self, *args, **options):
+        corrected = rebuild_unread_counts()
+        self.stdout.write(f"Corrected {corrected} unread counters")
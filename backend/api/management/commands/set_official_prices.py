@@ -0,0 +1,38 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import OfficialPriceBaseline
+
+
+class Command(BaseCommand):
+    help = 'Record an official fuel price adjustment for a zone from its effective date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('effective_date', type=date.fromisoformat, help='YYYY-MM-DD the prices take effect')
+        parser.add_argument('--zone', choices=[code for code, _ in OfficialPriceBaseline.ZONE_CHOICES], default='inland')
+        parser.add_argument('--source', default='')
+        for grade, label in OfficialPriceBaseline.GRADE_CHOICES:
+            parser.add_argument(f"--{grade.replace('_', '-')}", dest=grade, type=Decimal, help=f"{label} price in rand")
+
+    def handle(self, *args, **options):
+        prices = {
+            grade: options[grade]
+            for grade, _ in OfficialPriceBaseline.GRADE_CHOICES
+            if options[grade] is not None
+        }
+        if not prices:
+            raise CommandError('Give at least one grade price, e.g. --ulp-93 23.96')
+
+        for grade, price in prices.items():
+            OfficialPriceBaseline.objects.update_or_create(
+                effective_date=options['effective_date'],
+                zone=options['zone'],
+                grade=grade,
+                defaults={'price': price, 'source': options['source']},
+            )
+
+        self.stdout.write(
+            f"Recorded {len(prices)} {options['zone']} prices effective {options['effective_date']}"
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.services import fuel_price_service, scrapers
+from api.services.source_metrics import get_source_metrics
+
+
+class Command(BaseCommand):
+    help = 'Show call, latency, timeout and win counters for external price sources'
+
+    def handle(self, *args, **options):
+        groups = {
+            fuel_price_service.METRICS_GROUP: [
+                '_fetch_from_gasbuddy', '_fetch_from_aaa', '_fetch_from_government_api',
+            ],
+            scrapers.METRICS_GROUP: [scraper.name for scraper in scrapers.SCRAPERS],
+        }
+
+        for group, sources in groups.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(group))
+            for source, stats in get_source_metrics(group, sources).items():
+                self.stdout.write(
+                    f"  {source}: calls={stats['calls']} success_rate={stats['success_rate']} "
+                    f"avg_latency_ms={stats['avg_latency_ms']} timeouts={stats['timeouts']} "
+                    f"win_rate={stats['win_rate']}"
+                )
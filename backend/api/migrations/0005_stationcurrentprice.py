@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BACKFILL_CURRENT_PRICES = """
+    INSERT INTO api_stationcurrentprice (
+        station_id, fuel_type_id, fuel_price_id, price, previous_price, price_change,
+        source, confidence_score, is_verified, reported_at, updated_at
+    )
+    SELECT DISTINCT ON (station_id, fuel_type_id)
+        station_id, fuel_type_id, id, price, previous_price, price_change,
+        source, confidence_score, is_verified, reported_at, NOW()
+    FROM api_fuelprice
+    ORDER BY station_id, fuel_type_id, reported_at DESC, id DESC
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_remove_fuelprice_api_fuelpri_station_ced801_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationCurrentPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=3, max_digits=6)),
+                ('previous_price', models.DecimalField(blank=True, decimal_places=3, max_digits=6, null=True)),
+                ('price_change', models.DecimalField(blank=True, decimal_places=3, max_digits=5, null=True)),
+                ('source', models.CharField(blank=True, max_length=50)),
+                ('confidence_score', models.FloatField(default=0.5)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('reported_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('fuel_price', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.fuelprice')),
+                ('fuel_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='current_prices', to='api.fueltype')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='current_prices', to='api.petrolstation')),
+            ],
+            options={
+                'unique_together': {('station', 'fuel_type')},
+            },
+        ),
+        migrations.RunSQL(BACKFILL_CURRENT_PRICES, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_stationcurrentprice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceBaselineSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(max_length=50, unique=True)),
+                ('prices', models.JSONField(default=dict)),
+                ('source', models.CharField(blank=True, max_length=255)),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
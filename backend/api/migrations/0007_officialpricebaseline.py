@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:18
+
+import datetime
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# Inland prices previously hard-coded in PetrolStationViewSet._get_official_price_baselines
+INITIAL_BASELINES = [
+    ('ulp_93', Decimal('23.96')),
+    ('ulp_95', Decimal('24.30')),
+    ('diesel_500ppm', Decimal('21.20')),
+    ('diesel_50ppm', Decimal('21.35')),
+]
+
+
+def seed_official_baselines(apps, schema_editor):
+    OfficialPriceBaseline = apps.get_model('api', 'OfficialPriceBaseline')
+    OfficialPriceBaseline.objects.bulk_create([
+        OfficialPriceBaseline(
+            effective_date=datetime.date(2024, 6, 5),
+            zone='inland',
+            grade=grade,
+            price=price,
+            source='Department of Mineral Resources and Energy',
+        )
+        for grade, price in INITIAL_BASELINES
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_pricebaselinesnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfficialPriceBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_date', models.DateField()),
+                ('zone', models.CharField(choices=[('inland', 'Inland'), ('coastal', 'Coastal')], default='inland', max_length=20)),
+                ('grade', models.CharField(choices=[('ulp_93', 'Unleaded 93'), ('ulp_95', 'Unleaded 95'), ('diesel_500ppm', 'Diesel 0.05% (500ppm)'), ('diesel_50ppm', 'Diesel 0.005% (50ppm)')], max_length=20)),
+                ('price', models.DecimalField(decimal_places=3, max_digits=6)),
+                ('source', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-effective_date'],
+                'indexes': [models.Index(fields=['zone', 'grade', '-effective_date'], name='api_officia_zone_27afc3_idx')],
+                'unique_together': {('effective_date', 'zone', 'grade')},
+            },
+        ),
+        migrations.RunPython(seed_official_baselines, migrations.RunPython.noop),
+    ]
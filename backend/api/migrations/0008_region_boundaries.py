@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_officialpricebaseline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='petrolstation',
+            name='price_zone',
+            field=models.CharField(blank=True, choices=[('inland', 'Inland'), ('coastal', 'Coastal')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='province',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.CreateModel(
+            name='RegionBoundary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('province', 'Province'), ('price_zone', 'Fuel price zone')], max_length=20)),
+                ('code', models.CharField(help_text="Value stored on stations, e.g. 'western cape' or 'coastal'", max_length=50)),
+                ('name', models.CharField(max_length=100)),
+                ('geometry', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('kind', 'code')},
+            },
+        ),
+    ]
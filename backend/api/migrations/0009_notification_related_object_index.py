@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_region_boundaries'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['related_object_type', 'related_object_id', 'created_at'], name='api_notific_related_49453a_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_notification_fanout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('object_type', models.CharField(choices=[('station', 'Station'), ('price', 'Current Price'), ('reset', 'Full Resync Required')], max_length=20)),
+                ('action', models.CharField(choices=[('upsert', 'Inserted or Updated'), ('delete', 'Deleted')], default='upsert', max_length=20)),
+                ('station_id', models.UUIDField(blank=True, null=True)),
+                ('fuel_type_id', models.BigIntegerField(blank=True, null=True)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='api_changel_created_697be7_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_change_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fuelprice',
+            index=models.Index(fields=['-reported_at', '-id'], name='api_fuelpri_reporte_439ac6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at', '-id'], name='api_review_created_f4d00d_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:39
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Sum
+
+AGGREGATES = {
+    'rating': ('reviews_count', 'rating_total', 'avg_rating'),
+    'service_rating': ('service_rating_count', 'service_rating_total', 'avg_service_rating'),
+    'cleanliness_rating': ('cleanliness_rating_count', 'cleanliness_rating_total', 'avg_cleanliness_rating'),
+    'price_rating': ('price_rating_count', 'price_rating_total', 'avg_price_rating'),
+}
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    PetrolStation = apps.get_model('api', 'PetrolStation')
+    Review = apps.get_model('api', 'Review')
+    annotations = {}
+    for field, (count, total, average) in AGGREGATES.items():
+        annotations.update({count: Count(field), total: Sum(field), average: Avg(field)})
+    for row in Review.objects.values('station_id').annotate(**annotations):
+        station_id = row.pop('station_id')
+        PetrolStation.objects.filter(id=station_id).update(
+            **{key: (value or 0) if not key.startswith('avg_') else value for key, value in row.items()}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='petrolstation',
+            name='avg_cleanliness_rating',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='avg_price_rating',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='avg_rating',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='avg_service_rating',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='cleanliness_rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='cleanliness_rating_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='price_rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='price_rating_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='rating_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='service_rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='petrolstation',
+            name='service_rating_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:42
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+# Frozen copy of services.amenities: bit position follows StationAmenity.AMENITY_TYPES
+AMENITY_CODES = [
+    'ATM', 'BATHROOM', 'SHOP', 'RESTAURANT', 'CAR_WASH', 'TIRE_PRESSURE', 'VACUUM',
+    'WATER', 'WIFI', 'EV_CHARGING', 'AIR_CONDITIONING', 'DISABLED_ACCESS', 'BABY_CHANGE', 'COFFEE',
+]
+AMENITY_BITS = {code: 1 << position for position, code in enumerate(AMENITY_CODES)}
+BOOLEAN_AMENITIES = {'has_atm': 'ATM', 'has_shop': 'SHOP', 'has_coffee': 'COFFEE', 'has_ev_charging': 'EV_CHARGING'}
+
+
+def backfill_amenity_flags(apps, schema_editor):
+    PetrolStation = apps.get_model('api', 'PetrolStation')
+    StationAmenity = apps.get_model('api', 'StationAmenity')
+    flags = defaultdict(int)
+    for station_id, amenity_type in StationAmenity.objects.filter(is_operational=True).values_list(
+        'station_id', 'amenity_type'
+    ):
+        flags[station_id] |= AMENITY_BITS.get(amenity_type, 0)
+    for row in PetrolStation.objects.values('id', *BOOLEAN_AMENITIES):
+        for field, code in BOOLEAN_AMENITIES.items():
+            if row[field]:
+                flags[row['id']] |= AMENITY_BITS[code]
+    for station_id, mask in flags.items():
+        PetrolStation.objects.filter(id=station_id).update(amenity_flags=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_station_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='petrolstation',
+            name='amenity_flags',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_amenity_flags, migrations.RunPython.noop),
+    ]
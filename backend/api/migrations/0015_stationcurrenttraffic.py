@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BACKFILL_CURRENT_TRAFFIC = """
+    INSERT INTO api_stationcurrenttraffic (
+        station_id, traffic_id, current_visitors, queue_length, estimated_wait_time,
+        busy_level, timestamp, updated_at
+    )
+    SELECT DISTINCT ON (station_id)
+        station_id, id, current_visitors, queue_length, estimated_wait_time,
+        CASE WHEN queue_length <= 3 THEN 'low' WHEN queue_length <= 7 THEN 'medium' ELSE 'high' END,
+        timestamp, NOW()
+    FROM api_stationtraffic
+    ORDER BY station_id, timestamp DESC, id DESC
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_station_amenity_flags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationCurrentTraffic',
+            fields=[
+                ('station', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='current_traffic', serialize=False, to='api.petrolstation')),
+                ('current_visitors', models.PositiveIntegerField(default=0)),
+                ('queue_length', models.PositiveIntegerField(default=0)),
+                ('estimated_wait_time', models.PositiveIntegerField(default=0, help_text='Wait time in minutes')),
+                ('busy_level', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], default='low', max_length=10)),
+                ('timestamp', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('traffic', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.stationtraffic')),
+            ],
+        ),
+        migrations.RunSQL(BACKFILL_CURRENT_TRAFFIC, migrations.RunSQL.noop),
+    ]
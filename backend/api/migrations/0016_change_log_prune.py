@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_stationcurrenttraffic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogPrune',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pruned_through', models.BigIntegerField()),
+                ('pruned_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
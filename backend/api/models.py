@@ -15,6 +15,8 @@ class User(AbstractUser):
     )
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
     preferred_fuel_type = models.CharField(max_length=50, blank=True)
+    # Denormalized count of unread notifications, maintained by services.notifications
+    unread_notifications = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -113,16 +115,57 @@ class PetrolStation(models.Model):
     has_shop = models.BooleanField(default=False)
     has_coffee = models.BooleanField(default=False)
     has_ev_charging = models.BooleanField(default=False)
+    # Bitmask of operational amenities (StationAmenity rows plus the has_* flags), see services.amenities
+    amenity_flags = models.PositiveIntegerField(default=0)
     google_place_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     google_rating = models.FloatField(null=True, blank=True)
     google_user_ratings_total = models.IntegerField(null=True, blank=True)
     last_google_sync = models.DateTimeField(null=True, blank=True)
     busy_level = models.CharField(max_length=20, default='low')  # Optional
     wait_time = models.PositiveIntegerField(default=0)  # Optional
-    
+    # Resolved from RegionBoundary polygons when the station is imported
+    province = models.CharField(max_length=50, blank=True)
+    price_zone = models.CharField(
+        max_length=20,
+        choices=[('inland', 'Inland'), ('coastal', 'Coastal')],
+        blank=True
+    )
+    # Review aggregates, kept in step by services.ratings; totals and counts make updates O(1)
+    reviews_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    avg_rating = models.FloatField(null=True, blank=True)
+    service_rating_count = models.PositiveIntegerField(default=0)
+    service_rating_total = models.PositiveIntegerField(default=0)
+    avg_service_rating = models.FloatField(null=True, blank=True)
+    cleanliness_rating_count = models.PositiveIntegerField(default=0)
+    cleanliness_rating_total = models.PositiveIntegerField(default=0)
+    avg_cleanliness_rating = models.FloatField(null=True, blank=True)
+    price_rating_count = models.PositiveIntegerField(default=0)
+    price_rating_total = models.PositiveIntegerField(default=0)
+    avg_price_rating = models.FloatField(null=True, blank=True)
+
     def __str__(self):
         return f"{self.name} ({self.city})"
-    
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        station = super().from_db(db, field_names, values)
+        # What the row held when loaded, so signal handlers can tell what a save actually changed
+        station._loaded_values = {
+            field: value for field, value in zip(field_names, values) if value is not models.DEFERRED
+        }
+        return station
+
+    def loaded_value(self, field, default=None):
+        return getattr(self, '_loaded_values', {}).get(field, default)
+
+    def mark_saved(self, update_fields=None):
+        """Treat the in-memory values of the saved fields as the stored ones"""
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for field in self._meta.concrete_fields:
+            if (update_fields is None or field.name in update_fields) and field.attname in self.__dict__:
+                loaded[field.attname] = self.__dict__[field.attname]
+
     class Meta:
         ordering = ['name']
         indexes = [
@@ -157,8 +200,35 @@ class PetrolStation(models.Model):
         ]
 
 
+class RegionBoundary(models.Model):
+    """Province or fuel price zone outline, stored as a GeoJSON Polygon/MultiPolygon"""
+    KIND_CHOICES = [
+        ('province', 'Province'),
+        ('price_zone', 'Fuel price zone'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    code = models.CharField(max_length=50, help_text="Value stored on stations, e.g. 'western cape' or 'coastal'")
+    name = models.CharField(max_length=100)
+    geometry = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.name}"
+
+    def polygons(self):
+        """Geometry as a list of polygons, each a list of [lng, lat] rings (outer ring first)"""
+        if self.geometry.get('type') == 'MultiPolygon':
+            return self.geometry['coordinates']
+        return [self.geometry['coordinates']]
+
+    class Meta:
+        unique_together = ['kind', 'code']
+
+
 class StationAmenity(models.Model):
     """Represents amenities available at petrol stations"""
+    # Position in this list is the amenity's bit in PetrolStation.amenity_flags: append only
     AMENITY_TYPES = [
         ('ATM', 'ATM'),
         ('BATHROOM', 'Bathroom'),
@@ -243,10 +313,119 @@ class FuelPrice(models.Model):
             models.Index(fields=['station', 'fuel_type', '-reported_at']),
             models.Index(fields=['source', '-reported_at']),
             models.Index(fields=['confidence_score']),
+            # Keyset pagination of the price history
+            models.Index(fields=['-reported_at', '-id']),
         ]
 
 
 
+class StationCurrentPrice(models.Model):
+    """Latest FuelPrice per station and fuel type, maintained whenever prices are written"""
+    station = models.ForeignKey(PetrolStation, on_delete=models.CASCADE, related_name='current_prices')
+    fuel_type = models.ForeignKey(FuelType, on_delete=models.CASCADE, related_name='current_prices')
+    fuel_price = models.ForeignKey(FuelPrice, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    price = models.DecimalField(max_digits=6, decimal_places=3)
+    previous_price = models.DecimalField(max_digits=6, decimal_places=3, null=True, blank=True)
+    price_change = models.DecimalField(max_digits=5, decimal_places=3, null=True, blank=True)
+    source = models.CharField(max_length=50, blank=True)
+    confidence_score = models.FloatField(default=0.5)
+    is_verified = models.BooleanField(default=False)
+    reported_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.fuel_type.name} at {self.station.name}: {self.price}"
+    
+    class Meta:
+        unique_together = ['station', 'fuel_type']
+
+
+class ChangeLogEntry(models.Model):
+    """Append-only record of station and current-price changes; the id is the delta-sync cursor"""
+    OBJECT_TYPES = [
+        ('station', 'Station'),
+        ('price', 'Current Price'),
+        ('reset', 'Full Resync Required'),
+    ]
+    ACTIONS = [
+        ('upsert', 'Inserted or Updated'),
+        ('delete', 'Deleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    object_type = models.CharField(max_length=20, choices=OBJECT_TYPES)
+    action = models.CharField(max_length=20, choices=ACTIONS, default='upsert')
+    # Copied rather than linked so entries outlive deleted stations and can be filtered by area
+    station_id = models.UUIDField(null=True, blank=True)
+    fuel_type_id = models.BigIntegerField(null=True, blank=True)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.object_type} {self.station_id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+
+class ChangeLogPrune(models.Model):
+    """One row per change log prune; cursors below pruned_through can no longer be paged from"""
+    pruned_through = models.BigIntegerField()
+    pruned_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Pruned through #{self.pruned_through}"
+
+
+class OfficialPriceBaseline(models.Model):
+    """Regulated fuel price for a zone and grade, in force from effective_date until the next row"""
+    ZONE_CHOICES = [
+        ('inland', 'Inland'),
+        ('coastal', 'Coastal'),
+    ]
+    GRADE_CHOICES = [
+        ('ulp_93', 'Unleaded 93'),
+        ('ulp_95', 'Unleaded 95'),
+        ('diesel_500ppm', 'Diesel 0.05% (500ppm)'),
+        ('diesel_50ppm', 'Diesel 0.005% (50ppm)'),
+    ]
+
+    effective_date = models.DateField()
+    zone = models.CharField(max_length=20, choices=ZONE_CHOICES, default='inland')
+    grade = models.CharField(max_length=20, choices=GRADE_CHOICES)
+    price = models.DecimalField(max_digits=6, decimal_places=3)
+    source = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_grade_display()} ({self.zone}) from {self.effective_date}: R{self.price}"
+
+    class Meta:
+        ordering = ['-effective_date']
+        unique_together = ['effective_date', 'zone', 'grade']
+        indexes = [
+            models.Index(fields=['zone', 'grade', '-effective_date']),
+        ]
+
+
+class PriceBaselineSnapshot(models.Model):
+    """Last scraped fuel price baseline per region, refreshed in the background"""
+    region = models.CharField(max_length=50, unique=True)
+    prices = models.JSONField(default=dict)
+    source = models.CharField(max_length=255, blank=True)
+    fetched_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.region} baseline ({self.fetched_at:%Y-%m-%d %H:%M})"
+
+    @property
+    def age(self):
+        return timezone.now() - self.fetched_at
+
+
 class StationTraffic(models.Model):
     """Real-time and historical traffic data for stations"""
     station = models.ForeignKey(PetrolStation, on_delete=models.CASCADE, related_name='traffic_records')
@@ -263,6 +442,29 @@ class StationTraffic(models.Model):
         get_latest_by = 'timestamp'
 
 
+class StationCurrentTraffic(models.Model):
+    """Latest StationTraffic reading per station, maintained whenever traffic is written"""
+    BUSY_LEVELS = [
+        ('low', 'Low'),
+        ('medium', 'Medium'),
+        ('high', 'High'),
+    ]
+
+    station = models.OneToOneField(
+        PetrolStation, on_delete=models.CASCADE, primary_key=True, related_name='current_traffic'
+    )
+    traffic = models.ForeignKey(StationTraffic, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    current_visitors = models.PositiveIntegerField(default=0)
+    queue_length = models.PositiveIntegerField(default=0)
+    estimated_wait_time = models.PositiveIntegerField(default=0, help_text="Wait time in minutes")
+    busy_level = models.CharField(max_length=10, choices=BUSY_LEVELS, default='low')
+    timestamp = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.station.name} - {self.busy_level}"
+
+
 class UserVisit(models.Model):
     """Records when users visit a petrol station"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='station_visits')
@@ -310,6 +512,10 @@ class Review(models.Model):
     class Meta:
         unique_together = ['user', 'station']
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of reviews
+            models.Index(fields=['-created_at', '-id']),
+        ]
 
 
 class ReviewImage(models.Model):
@@ -488,6 +694,12 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Per-user inbox listings and unread filters
+            models.Index(fields=['user', 'is_read', 'created_at']),
+            # Repeat-trigger checks for price alerts look notifications up by related object
+            models.Index(fields=['related_object_type', 'related_object_id', 'created_at']),
+        ]
 
 
 # Promotion and loyalty related models
@@ -0,0 +1,94 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+POSITION_SEPARATOR = '|'
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor pagination on a (timestamp, id) ordering, positioned on both fields.
+
+    DRF positions its cursor on the first ordering field alone and steps over ties
+    with an offset from the top of the list, which shifts as rows are inserted.
+    With the id in the position every position is unique, so a page is always a
+    range scan from the last row seen and never needs an offset.
+    """
+
+    def _get_position_from_instance(self, instance, ordering):
+        field_name = ordering[0].lstrip('-')
+        if isinstance(instance, dict):
+            value, pk = instance[field_name], instance['id']
+        else:
+            value, pk = getattr(instance, field_name), instance.pk
+        return f"{value.isoformat()}{POSITION_SEPARATOR}{pk}"
+
+    def _rows_after(self, position, descending):
+        value, _, pk = position.rpartition(POSITION_SEPARATOR)
+        try:
+            value, pk = parse_datetime(value), int(pk)
+        except ValueError:
+            value = None
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        field_name = self.ordering[0].lstrip('-')
+        lookup = 'lt' if descending else 'gt'
+        return Q(**{f'{field_name}__{lookup}': value}) | Q(**{field_name: value, f'pk__{lookup}': pk})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor is not None else None
+
+        if reverse:
+            queryset = queryset.order_by(*(
+                field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering
+            ))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self._rows_after(position, self.ordering[0].startswith('-') != reverse))
+
+        # One extra row tells whether there is a page beyond this one
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if len(results) > self.page_size else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = position is not None, position
+            self.has_previous, self.previous_position = following_position is not None, following_position
+        else:
+            self.has_next, self.next_position = following_position is not None, following_position
+            self.has_previous, self.previous_position = position is not None, position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class FuelPriceCursorPagination(KeysetCursorPagination):
+    """Newest prices first, keyed on (reported_at, id) so every page is one index range scan"""
+    ordering = ('-reported_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class ReviewCursorPagination(KeysetCursorPagination):
+    """Newest reviews first, keyed on (created_at, id)"""
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,94 @@
+from typing import Dict, List
+
+from rest_framework.renderers import BaseRenderer, BrowsableAPIRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to DRF's stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: MessagePack is only offered when installed
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Decimal, UUID, lazy strings and the rest, encoded the way DRF's JSON encoder does"""
+    return _encoder.default(obj)
+
+
+def _columns(rows: List[Dict], prefix: str = '') -> Dict:
+    keys = tuple(rows[0])
+    if all(tuple(row) == keys for row in rows):
+        # Same fields in the same order (the usual case): transpose in one pass
+        columns = zip(keys, zip(*(row.values() for row in rows)))
+    else:
+        fields = dict.fromkeys(key for row in rows for key in row)
+        columns = ((field, [row.get(field) for row in rows]) for field in fields)
+
+    flat = {}
+    for field, values in columns:
+        if all(isinstance(value, dict) for value in values):
+            flat.update(_columns(list(values), f"{prefix}{field}."))
+        else:
+            flat[f"{prefix}{field}"] = list(values)
+    return flat
+
+
+def to_columns(rows: List[Dict]) -> Dict:
+    """One array per field instead of one object per row; nested objects become dotted fields"""
+    return {'count': len(rows), 'columns': _columns(rows) if rows else {}}
+
+
+def columnar(data):
+    """Columnar form of a list response or a paginated page; anything else is left as is"""
+    if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+        return to_columns(data)
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        return {**data, 'results': to_columns(data['results'])}
+    return data
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer backed by orjson when it is installed"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # orjson has no pretty-print widths, so requests for indentation keep the stdlib path
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Datetimes go through DRF's encoder as well, so both paths format them identically
+        return orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """Compact JSON for station lists: ?format=columnar or Accept: application/vnd.refinego.columnar+json"""
+    media_type = 'application/vnd.refinego.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(columnar(data), accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Columnar layout encoded as MessagePack: ?format=msgpack or Accept: application/msgpack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(columnar(data), default=_default, use_bin_type=True)
+
+
+# Renderers for station list endpoints; the first is the default when no format is requested
+STATION_LIST_RENDERERS = [FastJSONRenderer, BrowsableAPIRenderer, ColumnarJSONRenderer]
+if msgpack is not None:
+    STATION_LIST_RENDERERS.append(MessagePackRenderer)
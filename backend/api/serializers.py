@@ -1,13 +1,16 @@
 from rest_framework import serializers
+from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 from datetime import timedelta
 from .models import (
     User, Vehicle, FuelCompany, PetrolStation, StationAmenity,
-    FuelType, FuelPrice, StationTraffic, UserVisit, Review,
+    FuelType, FuelPrice, StationCurrentPrice, StationTraffic, UserVisit, Review,
     ReviewImage, Favorite, PriceAlert, FuelTransaction,
     TripPlan, RefuelStop, StationReport, Notification,
     PromotionCampaign, StationPromotion, UserSubscription
 )
+from .services.amenities import AMENITY_BITS
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -36,6 +39,45 @@ class StationAmenitySerializer(serializers.ModelSerializer):
         model = StationAmenity
         fields = ['id', 'station', 'amenity_type', 'amenity_type_display', 'is_operational', 'details']
 
+# Fuel type names exposed as flat fields on station lists
+LIST_FUEL_TYPES = ('regular', 'premium', 'diesel')
+
+
+class PetrolStationListBatch:
+    """Related data for a whole list of stations, loaded in a fixed number of queries"""
+
+    def __init__(self, stations):
+        self.station_ids = {station.id for station in stations}
+        self.prices = {}
+
+        if self.station_ids:
+            self._load()
+
+    def covers(self, station) -> bool:
+        return station.id in self.station_ids
+
+    def _load(self):
+        ids = list(self.station_ids)
+
+        current_prices = StationCurrentPrice.objects.annotate(
+            fuel_name=Lower('fuel_type__name')
+        ).filter(
+            station_id__in=ids,
+            fuel_name__in=LIST_FUEL_TYPES
+        ).values_list('station_id', 'fuel_name', 'price')
+        for station_id, fuel_name, price in current_prices:
+            self.prices[(station_id, fuel_name)] = price
+
+
+class PetrolStationListBatchSerializer(serializers.ListSerializer):
+    """Serializes many stations with one PetrolStationListBatch instead of per-station queries"""
+
+    def to_representation(self, data):
+        stations = list(data.all() if isinstance(data, models.Manager) else data)
+        self.context['station_batch'] = PetrolStationListBatch(stations)
+        return super().to_representation(stations)
+
+
 class PetrolStationListSerializer(serializers.ModelSerializer):
     company_name = serializers.CharField(source='company.name', read_only=True)
     company_logo = serializers.ImageField(source='company.logo', read_only=True)
@@ -55,22 +97,40 @@ class PetrolStationListSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = PetrolStation
+        list_serializer_class = PetrolStationListBatchSerializer
         fields = [
-            'id', 'name', 'address', 'rating', 'distance',
+            'id', 'name', 'company_name', 'company_logo', 'address', 'rating', 'distance',
             'regularPrice', 'premiumPrice', 'dieselPrice',
             'isOpen', 'hasATM', 'hasShop', 'hasCoffee', 'hasEVCharging',
             'busyLevel', 'waitTime', 'coordinates'
         ]
 
+    def update(self, instance, validated_data):
+        # Save only the submitted columns: a full save would write back review aggregates
+        # that services.ratings may have moved since this copy was loaded
+        columns = {field.name for field in PetrolStation._meta.concrete_fields}
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[attr for attr in validated_data if attr in columns] + ['updated_at'])
+        return instance
+
+    def _batch(self, obj):
+        """Batch loaded by the list serializer, if this station is part of it"""
+        batch = self.context.get('station_batch')
+        if batch is not None and batch.covers(obj):
+            return batch
+        return None
+
     def get_rating(self, obj):
-        reviews = obj.reviews.all()
-        if not reviews:
-            return None
-        return round(sum(r.rating for r in reviews) / reviews.count(), 1)
+        return round(obj.avg_rating, 1) if obj.avg_rating is not None else None
 
     def get_fuel_price(self, obj, fuel_type_name):
-        latest_price = obj.fuel_prices.filter(fuel_type__name__iexact=fuel_type_name).order_by('-reported_at').first()
-        return round(latest_price.price, 2) if latest_price else None
+        batch = self._batch(obj)
+        if batch:
+            price = batch.prices.get((obj.id, fuel_type_name.lower()))
+            return round(price, 2) if price is not None else None
+        price = obj.current_prices.filter(fuel_type__name__iexact=fuel_type_name).values_list('price', flat=True).first()
+        return round(price, 2) if price is not None else None
 
     def get_regularPrice(self, obj):
         return self.get_fuel_price(obj, 'Regular')
@@ -82,35 +142,36 @@ class PetrolStationListSerializer(serializers.ModelSerializer):
         return self.get_fuel_price(obj, 'Diesel')
 
     def get_isOpen(self, obj):
-        if not obj.is_24h:
-            now = timezone.now().time()
-            return obj.opening_time <= now <= obj.closing_time
-        return True
+        if obj.is_24h:
+            return True
+        # opening_hours is free-form JSON, so without structured times the status is unknown
+        return None
+
+    def has_amenity(self, obj, amenity_type):
+        return bool(obj.amenity_flags & AMENITY_BITS[amenity_type])
 
     def get_hasATM(self, obj):
-        return obj.amenities.filter(type='ATM').exists()
+        return self.has_amenity(obj, 'ATM')
 
     def get_hasShop(self, obj):
-        return obj.amenities.filter(type='Shop').exists()
+        return self.has_amenity(obj, 'SHOP')
 
     def get_hasCoffee(self, obj):
-        return obj.amenities.filter(type='Coffee').exists()
+        return self.has_amenity(obj, 'COFFEE')
 
     def get_hasEVCharging(self, obj):
-        return obj.amenities.filter(type='EV Charging').exists()
+        return self.has_amenity(obj, 'EV_CHARGING')
+
+    def get_latest_traffic(self, obj):
+        # Free when the queryset select_related('current_traffic'); None when there are no readings
+        return getattr(obj, 'current_traffic', None)
 
     def get_busyLevel(self, obj):
-        traffic = obj.traffic_records.order_by('-timestamp').first()
-        if not traffic:
-            return None
-        if traffic.queue_length <= 3:
-            return "low"
-        elif traffic.queue_length <= 7:
-            return "medium"
-        return "high"
+        traffic = self.get_latest_traffic(obj)
+        return traffic.busy_level if traffic else None
 
     def get_waitTime(self, obj):
-        traffic = obj.traffic_records.order_by('-timestamp').first()
+        traffic = self.get_latest_traffic(obj)
         return traffic.estimated_wait_time if traffic else None
 
     def get_coordinates(self, obj):
@@ -139,25 +200,14 @@ class EnhancedPetrolStationSerializer(serializers.ModelSerializer):
     
     def get_current_prices(self, obj):
         """Get latest prices for each fuel type"""
-        latest_prices = []
-        
-        for fuel_type in FuelType.objects.all():
-            latest_price = FuelPrice.objects.filter(
-                station=obj,
-                fuel_type=fuel_type
-            ).order_by('-reported_at').first()
-            
-            if latest_price:
-                latest_prices.append({
-                    'fuel_type': fuel_type.name,
-                    'price': float(latest_price.price),
-                    'reported_at': latest_price.reported_at,
-                    'source': latest_price.source,
-                    'confidence_score': latest_price.confidence_score,
-                    'price_change': float(latest_price.price_change) if latest_price.price_change else None
-                })
-        
-        return latest_prices
+        return [{
+            'fuel_type': current.fuel_type.name,
+            'price': float(current.price),
+            'reported_at': current.reported_at,
+            'source': current.source,
+            'confidence_score': current.confidence_score,
+            'price_change': float(current.price_change) if current.price_change else None
+        } for current in obj.current_prices.select_related('fuel_type')]
     
     def get_price_trend(self, obj):
         """Calculate price trend over the last week"""
@@ -204,45 +254,23 @@ class PetrolStationSerializer(serializers.ModelSerializer):
             'is_24h', 'has_atm', 'has_shop', 'has_coffee', 'has_ev_charging',
             'google_rating', 'google_user_ratings_total', 'data_quality_score',
             'current_prices', 'distance', 'reliability_score', 'price_trend',
-            'amenities', 'average_rating', 'reviews_count', 'current_traffic',
+            'amenities', 'average_rating', 'reviews_count',
+            'avg_service_rating', 'avg_cleanliness_rating', 'avg_price_rating', 'current_traffic',
             # Add any other fields you need
         ]
         read_only_fields = ['google_rating', 'google_user_ratings_total']
     
     def get_current_prices(self, obj):
-        """Combined approach for getting current prices"""
-        latest_prices = []
-        price_map = {}  # For efficient lookup
-        
-        # First get all fuel types
-        fuel_types = FuelType.objects.all()
-        
-        # Pre-fetch prices for this station
-        prices = obj.fuel_prices.order_by('fuel_type', '-reported_at')
-        
-        for fuel_type in fuel_types:
-            # Try to find price in pre-fetched queryset first
-            price = next((p for p in prices if p.fuel_type_id == fuel_type.id), None)
-            
-            if not price:
-                # Fall back to query if not found in pre-fetch
-                price = FuelPrice.objects.filter(
-                    station=obj,
-                    fuel_type=fuel_type
-                ).order_by('-reported_at').first()
-            
-            if price:
-                latest_prices.append({
-                    'fuel_type_id': fuel_type.id,
-                    'fuel_type': fuel_type.name,
-                    'price': float(price.price),
-                    'reported_at': price.reported_at,
-                    'source': price.source,
-                    'confidence_score': price.confidence_score,
-                    'price_change': float(price.price_change) if price.price_change else None
-                })
-        
-        return latest_prices
+        """Latest price per fuel type, read from the current price table"""
+        return [{
+            'fuel_type_id': current.fuel_type_id,
+            'fuel_type': current.fuel_type.name,
+            'price': float(current.price),
+            'reported_at': current.reported_at,
+            'source': current.source,
+            'confidence_score': current.confidence_score,
+            'price_change': float(current.price_change) if current.price_change else None
+        } for current in obj.current_prices.select_related('fuel_type')]
     
     def get_price_trend(self, obj):
         """Calculate price trend over the last week"""
@@ -272,19 +300,16 @@ class PetrolStationSerializer(serializers.ModelSerializer):
         return trends
     
     def get_average_rating(self, obj):
-        """Calculate average from local reviews"""
-        reviews = obj.reviews.all()
-        if not reviews:
-            return None
-        return round(sum(review.rating for review in reviews) / reviews.count(), 1)
+        """Average of local reviews, stored on the station"""
+        return round(obj.avg_rating, 1) if obj.avg_rating is not None else None
     
     def get_reviews_count(self, obj):
         """Count of local reviews"""
-        return obj.reviews.count()
+        return obj.reviews_count
     
     def get_current_traffic(self, obj):
         """Get latest traffic data"""
-        latest_traffic = obj.traffic_records.order_by('-timestamp').first()
+        latest_traffic = getattr(obj, 'current_traffic', None)
         if not latest_traffic:
             return None
         return {
@@ -319,6 +344,21 @@ class StationTrafficSerializer(serializers.ModelSerializer):
                  'queue_length', 'estimated_wait_time', 'timestamp']
 
 
+class TrafficObservationSerializer(serializers.Serializer):
+    """One reading in a batch upload; stations are checked for the whole batch at once by the view"""
+    station = serializers.UUIDField()
+    current_visitors = serializers.IntegerField(min_value=0, default=0)
+    queue_length = serializers.IntegerField(min_value=0, default=0)
+    estimated_wait_time = serializers.IntegerField(min_value=0, default=0)
+    timestamp = serializers.DateTimeField(required=False)
+
+    def to_internal_value(self, data):
+        values = super().to_internal_value(data)
+        values['station_id'] = values.pop('station')
+        values.setdefault('timestamp', timezone.now())
+        return values
+
+
 class ReviewImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReviewImage
@@ -0,0 +1,104 @@
+from typing import Iterable, List
+import logging
+
+from django.db import connection, transaction
+
+from ..models import PetrolStation, StationAmenity
+from . import station_index
+from .change_log import record_station_changes
+
+logger = logging.getLogger(__name__)
+
+# Bit per amenity type, in AMENITY_TYPES order (new types are appended there, so bits never move)
+AMENITY_BITS = {code: 1 << position for position, (code, _) in enumerate(StationAmenity.AMENITY_TYPES)}
+
+# Station booleans set by imports, folded into the same mask
+BOOLEAN_AMENITIES = {
+    'has_atm': 'ATM',
+    'has_shop': 'SHOP',
+    'has_coffee': 'COFFEE',
+    'has_ev_charging': 'EV_CHARGING',
+}
+
+
+def amenity_mask(codes: Iterable[str]) -> int:
+    mask = 0
+    for code in codes:
+        mask |= AMENITY_BITS[code]
+    return mask
+
+
+def parse_amenities(value: str) -> int:
+    """Mask for a comma-separated amenities parameter such as 'ATM,COFFEE'; ValueError on unknown codes"""
+    codes = [code.strip().upper() for code in (value or '').split(',') if code.strip()]
+    unknown = [code for code in codes if code not in AMENITY_BITS]
+    if unknown:
+        raise ValueError(f"Unknown amenities: {', '.join(unknown)}. Choose from {', '.join(AMENITY_BITS)}")
+    return amenity_mask(codes)
+
+
+def has_amenity(mask: int, code: str) -> bool:
+    return bool((mask or 0) & AMENITY_BITS[code])
+
+
+def amenity_codes(mask: int) -> List[str]:
+    return [code for code, bit in AMENITY_BITS.items() if (mask or 0) & bit]
+
+
+def boolean_amenity_mask(station) -> int:
+    """Bits from the has_* flags of a station model or station dict"""
+    get = station.get if isinstance(station, dict) else lambda field: getattr(station, field, False)
+    return amenity_mask(code for field, code in BOOLEAN_AMENITIES.items() if get(field))
+
+
+def station_amenity_flags(station: PetrolStation) -> int:
+    """Full mask for a station: its operational StationAmenity rows plus its has_* flags"""
+    mask = boolean_amenity_mask(station)
+    if not station._state.adding:
+        mask |= amenity_mask(StationAmenity.objects.filter(
+            station_id=station.id, is_operational=True
+        ).values_list('amenity_type', flat=True).distinct())
+    return mask
+
+
+def amenities_changed(station_id):
+    """Recompute a station's mask after its amenity rows changed and resave it for every station listener"""
+    station = PetrolStation.objects.filter(id=station_id).first()
+    if station is not None:
+        station.amenity_flags = station_amenity_flags(station)
+        station.save(update_fields=['amenity_flags', 'updated_at'])
+
+
+def rebuild_amenity_flags() -> int:
+    """Recompute every station's mask in one statement"""
+    station_table = PetrolStation._meta.db_table
+    amenity_table = StationAmenity._meta.db_table
+    row_bits = ' '.join(f"WHEN '{code}' THEN {bit}" for code, bit in AMENITY_BITS.items())
+    boolean_bits = ' | '.join(
+        f"(CASE WHEN s.{field} THEN {AMENITY_BITS[code]} ELSE 0 END)" for field, code in BOOLEAN_AMENITIES.items()
+    )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {station_table} SET amenity_flags = {boolean_bits} | COALESCE(found.bits, 0), updated_at = NOW()
+            FROM {station_table} AS s
+            LEFT JOIN (
+                SELECT station_id, BIT_OR(CASE amenity_type {row_bits} ELSE 0 END) AS bits
+                FROM {amenity_table}
+                WHERE is_operational
+                GROUP BY station_id
+            ) AS found ON found.station_id = s.id
+            WHERE {station_table}.id = s.id
+              AND {station_table}.amenity_flags <> ({boolean_bits} | COALESCE(found.bits, 0))
+            RETURNING {station_table}.id, {station_table}.latitude, {station_table}.longitude
+        """)
+        corrected = cursor.rowcount
+        record_station_changes(
+            PetrolStation(id=station_id, latitude=lat, longitude=lng) for station_id, lat, lng in cursor.fetchall()
+        )
+        if corrected:
+            # Once committed, so rebuilding workers see the new flags
+            transaction.on_commit(station_index.stations_rewritten)
+
+    logger.info(f"Corrected amenity flags on {corrected} stations")
+    return corrected
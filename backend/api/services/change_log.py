@@ -0,0 +1,175 @@
+from datetime import timedelta
+from typing import Dict, Iterable, Optional, Sequence
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from ..models import ChangeLogEntry, ChangeLogPrune, PetrolStation, StationCurrentPrice
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+# Traffic is left out: it changes far too often for the log and reaches clients over live updates
+STATION_FIELDS = [
+    'id', 'name', 'address', 'city', 'state', 'province', 'price_zone',
+    'latitude', 'longitude', 'is_24h', 'is_active',
+    'has_atm', 'has_shop', 'has_coffee', 'has_ev_charging', 'amenity_flags',
+    'google_rating', 'updated_at',
+]
+
+PRICE_FIELDS = [
+    'station_id', 'fuel_type__name', 'price', 'previous_price', 'price_change',
+    'source', 'is_verified', 'reported_at',
+]
+
+
+def _append(entries):
+    """Write entries once the surrounding transaction commits.
+
+    Ids are allocated after commit, so a reader never sees a higher cursor
+    before a lower one's data is visible (apart from the settle window).
+    """
+    entries = list(entries)
+    if entries:
+        transaction.on_commit(lambda: ChangeLogEntry.objects.bulk_create(entries, batch_size=MAX_PAGE_SIZE))
+
+
+def _moved_from(station: PetrolStation):
+    """Loaded coordinates of a station whose position is being changed, else None"""
+    old = (station.loaded_value('latitude'), station.loaded_value('longitude'))
+    if None in old or station.latitude is None or station.longitude is None:
+        return None
+    if all(round(float(before), 6) == round(float(after), 6)
+           for before, after in zip(old, (station.latitude, station.longitude))):
+        return None
+    return old
+
+
+def record_station_changes(stations: Iterable[PetrolStation]):
+    """Log station writes; every bulk station write must come through here as well as saves"""
+    entries = []
+    for station in stations:
+        old = _moved_from(station)
+        if old is not None:
+            # Clients syncing only the old area must hear that the station left it; the upsert
+            # after it wins for clients that can see both positions
+            entries.append(ChangeLogEntry(object_type='station', action='delete', station_id=station.id,
+                                          latitude=old[0], longitude=old[1]))
+        entries.append(ChangeLogEntry(object_type='station', station_id=station.id,
+                                      latitude=station.latitude, longitude=station.longitude))
+    _append(entries)
+
+
+def record_station_deleted(station: PetrolStation):
+    _append([ChangeLogEntry(object_type='station', action='delete', station_id=station.id,
+                            latitude=station.latitude, longitude=station.longitude)])
+
+
+def record_price_changes(keys: Iterable):
+    """Log current-price changes for (station_id, fuel_type_id) keys"""
+    keys = set(keys)
+    if not keys:
+        return
+    locations = dict(
+        (station_id, (lat, lng))
+        for station_id, lat, lng in PetrolStation.objects.filter(
+            id__in={station_id for station_id, _ in keys}
+        ).values_list('id', 'latitude', 'longitude')
+    )
+    _append(
+        ChangeLogEntry(object_type='price', station_id=station_id, fuel_type_id=fuel_type_id,
+                       latitude=locations.get(station_id, (None, None))[0],
+                       longitude=locations.get(station_id, (None, None))[1])
+        for station_id, fuel_type_id in keys
+    )
+
+
+def record_reset():
+    """Tell every client its local copy is no longer trustworthy"""
+    _append([ChangeLogEntry(object_type='reset')])
+
+
+def changes_since(since: Optional[int], bbox: Optional[Sequence[float]] = None,
+                  limit: int = DEFAULT_PAGE_SIZE) -> Dict:
+    """Stations and current prices changed after the cursor, optionally within a south,west,north,east box"""
+    # Entries younger than the settle window may still have lower-id siblings on their way
+    settled = ChangeLogEntry.objects.filter(
+        created_at__lt=timezone.now() - timedelta(seconds=getattr(settings, 'CHANGE_LOG_SETTLE_SECONDS', 5))
+    )
+    latest = settled.aggregate(latest=Max('id'))['latest'] or 0
+
+    # Compared with the prune watermark rather than the oldest id, which rolled-back ids leave gaps below
+    pruned_through = ChangeLogPrune.objects.aggregate(through=Max('pruned_through'))['through']
+    pruned = since is not None and pruned_through is not None and since < pruned_through
+    if since is None or pruned or settled.filter(id__gt=since, object_type='reset').exists():
+        return {'cursor': latest, 'reset': True, 'has_more': False}
+
+    entries = settled.filter(id__gt=since)
+    if bbox:
+        south, west, north, east = bbox
+        entries = entries.filter(
+            latitude__gte=south, latitude__lte=north, longitude__gte=west, longitude__lte=east
+        )
+    page = list(entries.order_by('id').values_list(
+        'id', 'object_type', 'action', 'station_id', 'fuel_type_id'
+    )[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    # Several changes to one object collapse into its final state
+    stations, prices = {}, set()
+    for _, object_type, action, station_id, fuel_type_id in page:
+        if object_type == 'station':
+            stations[station_id] = action
+        elif object_type == 'price':
+            prices.add((station_id, fuel_type_id))
+
+    current = {
+        row['id']: row
+        for row in PetrolStation.objects.filter(
+            id__in=[station_id for station_id, action in stations.items() if action == 'upsert']
+        ).values(*STATION_FIELDS)
+    }
+    deleted = [station_id for station_id in stations if station_id not in current]
+    deactivated = [station_id for station_id, row in current.items() if not row['is_active']]
+
+    price_rows = []
+    if prices:
+        candidates = StationCurrentPrice.objects.filter(
+            station_id__in={station_id for station_id, _ in prices},
+            fuel_type_id__in={fuel_type_id for _, fuel_type_id in prices},
+        ).values('fuel_type_id', *PRICE_FIELDS)
+        for row in candidates:
+            if (row['station_id'], row.pop('fuel_type_id')) in prices:
+                row['fuel_type'] = row.pop('fuel_type__name').lower()
+                price_rows.append(row)
+
+    return {
+        'cursor': page[-1][0] if has_more else max(latest, since, page[-1][0] if page else 0),
+        'reset': False,
+        'has_more': has_more,
+        'stations': [row for row in current.values() if row['is_active']],
+        'deactivated_stations': deactivated,
+        'deleted_stations': deleted,
+        'prices': price_rows,
+    }
+
+
+def prune_change_log(days: Optional[int] = None) -> int:
+    days = days or getattr(settings, 'CHANGE_LOG_RETENTION_DAYS', 30)
+    through = ChangeLogEntry.objects.filter(
+        created_at__lt=timezone.now() - timedelta(days=days)
+    ).aggregate(through=Max('id'))['through']
+    if through is None:
+        return 0
+
+    with transaction.atomic():
+        deleted, _ = ChangeLogEntry.objects.filter(id__lte=through).delete()
+        ChangeLogPrune.objects.create(pruned_through=through)
+    logger.info(f"Pruned {deleted} change log entries")
+    return deleted
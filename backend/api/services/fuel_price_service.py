@@ -1,36 +1,85 @@
 from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor, wait
 import logging
+import threading
+import time
 import requests
 from django.core.cache import cache  # Add this import if using Django's cache framework
 from django.conf import settings  # Import Django settings
+from .price_feeds import PriceFeedSnapshots
+from .source_metrics import record_source_call, record_source_timeout
 logger = logging.getLogger(__name__)
 
+METRICS_GROUP = 'fuel_price_sources'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Worker pool shared by all FuelPriceService instances in this process"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'FUEL_PRICE_SOURCE_WORKERS', 8),
+                    thread_name_prefix='fuel-price-source'
+                )
+    return _executor
+
+
 class FuelPriceService:
     """Service to fetch real fuel prices from multiple sources"""
-    """Service to fetch real fuel prices from multiple sources"""
     
-    def __init__(self):
+    def __init__(self, deadline: float = None, feeds: PriceFeedSnapshots = None):
         self.sources = [
             self._fetch_from_gasbuddy,
             self._fetch_from_aaa,
             self._fetch_from_government_api
         ]
+        self.session = requests.Session()
+        # Regional feeds are downloaded once and shared by every station this service prices
+        self.feeds = feeds or PriceFeedSnapshots(self.session)
+        # Overall budget for all sources together, in seconds
+        self.deadline = deadline or getattr(settings, 'FUEL_PRICE_SOURCE_DEADLINE', 12)
     
     def get_station_prices(self, station) -> List[Dict]:
-        """Get fuel prices for a specific station from multiple sources"""
+        """Get fuel prices for a specific station from all sources in parallel"""
+        futures = {
+            _get_executor().submit(self._timed_fetch, source_func, station): source_func
+            for source_func in self.sources
+        }
+        done, not_done = wait(futures, timeout=self.deadline)
+        
         prices = []
+        for future in done:
+            source_prices = future.result()
+            if source_prices:
+                prices.extend(source_prices)
         
-        for source_func in self.sources:
-            try:
-                source_prices = source_func(station)
-                if source_prices:
-                    prices.extend(source_prices)
-            except Exception as e:
-                logger.error(f"Error fetching prices from {source_func.__name__}: {e}")
-                continue
+        # Late sources are dropped; whatever finished in time is still consolidated
+        for future in not_done:
+            future.cancel()
+            source_name = futures[future].__name__
+            record_source_timeout(METRICS_GROUP, source_name)
+            logger.warning(f"Dropped {source_name} for station {station.id}: missed {self.deadline}s deadline")
         
         return self._consolidate_prices(prices)
     
+    def _timed_fetch(self, source_func, station) -> List[Dict]:
+        """Run one source, recording its latency and outcome"""
+        started = time.monotonic()
+        try:
+            source_prices = source_func(station)
+        except Exception as e:
+            logger.error(f"Error fetching prices from {source_func.__name__}: {e}")
+            record_source_call(METRICS_GROUP, source_func.__name__, time.monotonic() - started, False)
+            return []
+        
+        record_source_call(METRICS_GROUP, source_func.__name__, time.monotonic() - started, bool(source_prices))
+        return source_prices or []
+    
     def _fetch_from_gasbuddy(self, station) -> List[Dict]:
         """Fetch prices from GasBuddy API (if available)"""
         # Note: GasBuddy doesn't have a public API, this would require scraping
@@ -46,44 +95,12 @@ class FuelPriceService:
         return []
     
     def _fetch_from_aaa(self, station) -> List[Dict]:
-        """Fetch average prices from AAA API"""
-        try:
-            # AAA provides regional average prices
-            url = "https://gasprices.aaa.com/api/prices"
-            response = self.session.get(url, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # Process AAA data and match to station location
-                return self._process_aaa_data(data, station)
-        except Exception as e:
-            logger.error(f"Error fetching AAA prices: {e}")
-            return []
+        """Regional average prices from AAA, looked up in this run's feed snapshot"""
+        return self.feeds.lookup('aaa', station.state)
     
     def _fetch_from_government_api(self, station) -> List[Dict]:
-        """Fetch prices from government sources like EIA"""
-        try:
-            # U.S. Energy Information Administration API
-            api_key = settings.EIA_API_KEY
-            url = f"https://api.eia.gov/v2/petroleum/pri/gnd/data/"
-            
-            params = {
-                'api_key': api_key,
-                'frequency': 'weekly',
-                'data[0]': 'value',
-                'facets[product][]': 'EPM0',  # Regular gasoline
-                'sort[0][column]': 'period',
-                'sort[0][direction]': 'desc',
-                'offset': 0,
-                'length': 1
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            if response.status_code == 200:
-                return self._process_eia_data(response.json(), station)
-        except Exception as e:
-            logger.error(f"Error fetching EIA prices: {e}")
-            return []
+        """Prices from government sources like EIA, looked up in this run's feed snapshot"""
+        return self.feeds.lookup('eia', station.state)
     
     def _consolidate_prices(self, prices: List[Dict]) -> List[Dict]:
         """Consolidate prices from multiple sources and calculate reliability score"""
@@ -0,0 +1,93 @@
+from typing import Iterable, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def as_coordinates(values: Iterable) -> np.ndarray:
+    """Convert a sequence of lat or lng values (Decimal/str/None) to a float array, None -> NaN"""
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in km; arguments broadcast like any NumPy ufunc"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Scalar convenience wrapper around haversine_km"""
+    return float(haversine_km(lat1, lng1, lat2, lng2))
+
+
+def distances_from(lat: float, lng: float, lats, lngs) -> np.ndarray:
+    """Distances from one origin to N points"""
+    return haversine_km(lat, lng, lats, lngs)
+
+
+def distance_matrix(lats1, lngs1, lats2, lngs2) -> np.ndarray:
+    """N x M matrix of distances between two sets of points"""
+    lats1 = np.asarray(lats1, dtype=np.float64)[:, np.newaxis]
+    lngs1 = np.asarray(lngs1, dtype=np.float64)[:, np.newaxis]
+    return haversine_km(lats1, lngs1, lats2, lngs2)
+
+
+def within_radius(lat: float, lng: float, lats, lngs, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Boolean mask of points within radius_km of the origin, plus the distances"""
+    distances = distances_from(lat, lng, lats, lngs)
+    # NaN coordinates compare False, so missing points never match
+    return distances <= radius_km, distances
+
+
+_GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 6) -> str:
+    """Standard base32 geohash of a point"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def geohash_bounds(geohash: str) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of a geohash cell"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (value >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_cell(lat: float, lng: float, precision: int = 6) -> Tuple[str, float, float, float]:
+    """Geohash of a point plus its cell centre and the centre-to-corner distance in km"""
+    geohash = geohash_encode(lat, lng, precision)
+    south, west, north, east = geohash_bounds(geohash)
+    center_lat, center_lng = (south + north) / 2, (west + east) / 2
+    half_diagonal = max(distance_km(center_lat, center_lng, south, west),
+                        distance_km(center_lat, center_lng, north, east))
+    return geohash, center_lat, center_lng, half_diagonal
@@ -0,0 +1,241 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence
+import asyncio
+import json
+import logging
+import time
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+# Events per Redis message; a sync run publishes its price changes in a handful of messages
+PUBLISH_CHUNK_SIZE = 500
+
+# Events buffered per client before it is told to resync instead
+MAX_QUEUED_EVENTS = 200
+
+
+def _redis_url() -> str:
+    return getattr(settings, 'LIVE_UPDATES_REDIS_URL', getattr(settings, 'CELERY_BROKER_URL', 'redis://localhost:6379'))
+
+
+def _channel() -> str:
+    return getattr(settings, 'LIVE_UPDATES_CHANNEL', 'live_updates')
+
+
+# Publishing (sync, called from ingestion and signals)
+
+_client = None
+_retry_at = 0.0
+
+
+def publish(events: List[Dict]):
+    """Push events to every worker's subscribers; never raises, as updates are best effort"""
+    global _client, _retry_at
+    if not events or time.monotonic() < _retry_at:
+        return
+
+    try:
+        if _client is None:
+            _client = redis.Redis.from_url(_redis_url(), socket_connect_timeout=1, socket_timeout=1)
+        for start in range(0, len(events), PUBLISH_CHUNK_SIZE):
+            _client.publish(_channel(), json.dumps(events[start:start + PUBLISH_CHUNK_SIZE], cls=DjangoJSONEncoder))
+    except redis.RedisError as e:
+        # Don't stall every write while Redis is away
+        _retry_at = time.monotonic() + getattr(settings, 'LIVE_UPDATES_RETRY_SECONDS', 30)
+        logger.warning(f"Live update publish failed: {e}")
+
+
+def _station_locations(station_ids) -> Dict:
+    from ..models import PetrolStation
+    return {
+        station_id: (float(lat), float(lng))
+        for station_id, lat, lng in PetrolStation.objects.filter(id__in=set(station_ids)).values_list(
+            'id', 'latitude', 'longitude'
+        )
+        if lat is not None and lng is not None
+    }
+
+
+def _event(event_type: str, station_id, location, **data) -> Dict:
+    lat, lng = location
+    return {'type': event_type, 'station_id': str(station_id), 'lat': lat, 'lng': lng, **data}
+
+
+def publish_prices(prices: Iterable):
+    """One event per station and fuel type for newly written FuelPrice rows"""
+    from ..models import FuelType
+
+    newest = {}
+    for price in prices:
+        key = (price.station_id, price.fuel_type_id)
+        if key not in newest or price.reported_at >= newest[key].reported_at:
+            newest[key] = price
+    if not newest:
+        return
+
+    locations = _station_locations(station_id for station_id, _ in newest)
+    fuel_type_names = dict(FuelType.objects.values_list('id', 'name'))
+    publish([
+        _event(
+            'price', price.station_id, locations[price.station_id],
+            fuel_type=fuel_type_names.get(price.fuel_type_id, '').lower(),
+            price=price.price,
+            previous_price=price.previous_price,
+            price_change=price.price_change,
+            source=price.source,
+            reported_at=price.reported_at,
+        )
+        for price in newest.values()
+        if price.station_id in locations
+    ])
+
+
+def publish_traffic(records: Iterable):
+    records = list(records)
+    locations = _station_locations(record.station_id for record in records)
+    publish([
+        _event(
+            'traffic', record.station_id, locations[record.station_id],
+            current_visitors=record.current_visitors,
+            queue_length=record.queue_length,
+            estimated_wait_time=record.estimated_wait_time,
+            timestamp=record.timestamp,
+        )
+        for record in records
+        if record.station_id in locations
+    ])
+
+
+def publish_station(station):
+    if station.latitude is None or station.longitude is None:
+        return
+    publish([_event(
+        'station', station.id, (float(station.latitude), float(station.longitude)),
+        is_active=station.is_active,
+        is_24h=station.is_24h,
+    )])
+
+
+# Subscribing (async, one hub per ASGI worker)
+
+class Subscription:
+    """One connected client: the stations and/or viewport it watches, and its pending events"""
+
+    def __init__(self, station_ids: Optional[Sequence[str]] = None, bbox: Optional[Sequence[float]] = None):
+        self.station_ids = {str(station_id) for station_id in station_ids or ()}
+        self.bbox = tuple(bbox) if bbox else None  # south, west, north, east
+        self.queue = asyncio.Queue(maxsize=MAX_QUEUED_EVENTS)
+        self.lagged = False
+
+    def in_viewport(self, event: Dict) -> bool:
+        south, west, north, east = self.bbox
+        return south <= event['lat'] <= north and west <= event['lng'] <= east
+
+    def push(self, event: Dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # The client has fallen behind; it will be told to refetch rather than fed stale deltas
+            self.lagged = True
+
+    def drain(self):
+        """Drop every queued event and clear the lag flag, ahead of telling the client to refetch"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.lagged = False
+
+
+class LiveUpdateHub:
+    """Fans events from one Redis subscription out to this worker's connected clients"""
+
+    def __init__(self):
+        self._by_station = defaultdict(set)
+        self._viewports = set()
+        self._subscriptions = set()
+        self._listener = None
+
+    def subscribe(self, subscription: Subscription):
+        self._subscriptions.add(subscription)
+        for station_id in subscription.station_ids:
+            self._by_station[station_id].add(subscription)
+        if subscription.bbox:
+            self._viewports.add(subscription)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.ensure_future(self._listen())
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+        self._viewports.discard(subscription)
+        for station_id in subscription.station_ids:
+            watchers = self._by_station.get(station_id)
+            if watchers is not None:
+                watchers.discard(subscription)
+                if not watchers:
+                    del self._by_station[station_id]
+
+    def dispatch(self, events: List[Dict]):
+        for event in events:
+            recipients = set(self._by_station.get(event['station_id'], ()))
+            recipients.update(subscription for subscription in self._viewports if subscription.in_viewport(event))
+            for subscription in recipients:
+                subscription.push(event)
+
+    async def _listen(self):
+        """Relay channel messages while anyone is connected, reconnecting after Redis errors"""
+        while self._subscriptions:
+            client = aioredis.from_url(_redis_url())
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(_channel())
+                while self._subscriptions:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        self.dispatch(json.loads(message['data']))
+            except redis.RedisError as e:
+                logger.warning(f"Live update listener lost Redis: {e}")
+                await asyncio.sleep(getattr(settings, 'LIVE_UPDATES_RETRY_SECONDS', 30))
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+
+_hub = None
+
+
+def get_hub() -> LiveUpdateHub:
+    global _hub
+    if _hub is None:
+        _hub = LiveUpdateHub()
+    return _hub
+
+
+def format_sse(event_type: str, data: Dict) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def event_stream(subscription: Subscription):
+    """SSE body for one client: pushed deltas, periodic keep-alives, and a resync hint after lagging"""
+    hub = get_hub()
+    hub.subscribe(subscription)
+    heartbeat = getattr(settings, 'LIVE_UPDATES_HEARTBEAT', 15)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if subscription.lagged:
+                # This event and everything still queued predate the refetch the client is about to do
+                subscription.drain()
+                yield format_sse('resync', {})
+                continue
+            yield format_sse(event['type'], event)
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,190 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List
+import logging
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from ..models import Favorite, FuelType, Notification, PetrolStation, User
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+
+
+class NotificationFanout:
+    """Collects notifications from several producers and writes them in one pass"""
+
+    def __init__(self):
+        self._pending = []
+
+    def add(self, notification: Notification):
+        self._pending.append(notification)
+
+    def extend(self, notifications: Iterable[Notification]):
+        self._pending.extend(notifications)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def flush(self) -> int:
+        pending, self._pending = self._pending, []
+        return send_notifications(pending)
+
+
+def send_notifications(notifications: List[Notification]) -> int:
+    """Bulk-insert notifications and bump each recipient's unread counter"""
+    if not notifications:
+        return 0
+
+    with transaction.atomic():
+        Notification.objects.bulk_create(notifications, batch_size=BATCH_SIZE)
+        _adjust_unread_counts(Counter(n.user_id for n in notifications if not n.is_read))
+
+    return len(notifications)
+
+
+def _adjust_unread_counts(deltas: Dict[int, int]):
+    """Apply per-user counter changes with one UPDATE per distinct delta"""
+    users_by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if delta:
+            users_by_delta[delta].append(user_id)
+
+    for delta, user_ids in users_by_delta.items():
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            User.objects.filter(id__in=user_ids[start:start + BATCH_SIZE]).update(
+                unread_notifications=Greatest(F('unread_notifications') + delta, Value(0))
+            )
+
+
+def broadcast(title: str, message: str, notification_type: str = 'SYSTEM') -> int:
+    """Send one notification to every active user, set-based so it scales with the user table"""
+    notification_table = Notification._meta.db_table
+    user_table = User._meta.db_table
+
+    # Insert and count in one statement so users activated mid-broadcast stay consistent
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH sent AS (
+                INSERT INTO {notification_table} (
+                    user_id, notification_type, title, message,
+                    related_object_id, related_object_type, is_read, created_at
+                )
+                SELECT id, %s, %s, %s, '', '', FALSE, %s
+                FROM {user_table}
+                WHERE is_active
+                RETURNING user_id
+            )
+            UPDATE {user_table} SET unread_notifications = unread_notifications + 1
+            FROM sent
+            WHERE {user_table}.id = sent.user_id
+        """, [notification_type, title[:100], message, timezone.now()])
+        sent = cursor.rowcount
+
+    logger.info(f"Broadcast '{title}' to {sent} users")
+    return sent
+
+
+def mark_notification_read(notification: Notification) -> bool:
+    """Mark one notification read; False if it already was"""
+    with transaction.atomic():
+        updated = Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True)
+        if updated:
+            _adjust_unread_counts({notification.user_id: -updated})
+    notification.is_read = True
+    return bool(updated)
+
+
+def mark_all_notifications_read(user) -> int:
+    with transaction.atomic():
+        updated = Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+        _adjust_unread_counts({user.id: -updated})
+    return updated
+
+
+def rebuild_unread_counts() -> int:
+    """Recompute every user's unread counter from the notification table"""
+    notification_table = Notification._meta.db_table
+    user_table = User._meta.db_table
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {user_table} SET unread_notifications = COALESCE(counts.unread, 0)
+            FROM {user_table} AS u
+            LEFT JOIN (
+                SELECT user_id, COUNT(*) AS unread
+                FROM {notification_table}
+                WHERE NOT is_read
+                GROUP BY user_id
+            ) AS counts ON counts.user_id = u.id
+            WHERE {user_table}.id = u.id
+              AND {user_table}.unread_notifications <> COALESCE(counts.unread, 0)
+        """)
+        corrected = cursor.rowcount
+
+    logger.info(f"Corrected unread counters for {corrected} users")
+    return corrected
+
+
+def queue_favorite_price_drops(prices: Iterable, fanout: NotificationFanout) -> int:
+    """One notification per user and favourite station whose prices just dropped.
+
+    Drops smaller than FAVORITE_PRICE_DROP_MIN are ignored, and a user hears about
+    a station at most once per FAVORITE_PRICE_DROP_COOLDOWN_HOURS.
+    """
+    min_drop = Decimal(str(getattr(settings, 'FAVORITE_PRICE_DROP_MIN', '0.10')))
+    drops = defaultdict(dict)  # station_id -> fuel_type_id -> lowest new price
+    for price in prices:
+        if price.price_change is None or -price.price_change < min_drop:
+            continue
+        current = drops[price.station_id].get(price.fuel_type_id)
+        if current is None or price.price < current.price:
+            drops[price.station_id][price.fuel_type_id] = price
+    if not drops:
+        return 0
+
+    followers = Favorite.objects.filter(station_id__in=list(drops)).values_list('user_id', 'station_id')
+    recently_told = _recent_favorite_updates(list(drops))
+    station_names = dict(PetrolStation.objects.filter(id__in=list(drops)).values_list('id', 'name'))
+    fuel_type_names = dict(FuelType.objects.values_list('id', 'name'))
+
+    queued = 0
+    for user_id, station_id in followers.iterator(chunk_size=BATCH_SIZE):
+        if (user_id, str(station_id)) in recently_told:
+            continue
+        station_name = station_names.get(station_id, 'A favourite station')
+        changes = '; '.join(
+            f"{fuel_type_names.get(fuel_type_id, 'Fuel')} down R{abs(float(price.price_change)):.2f} "
+            f"to R{float(price.price):.2f}"
+            for fuel_type_id, price in drops[station_id].items()
+        )
+        fanout.add(Notification(
+            user_id=user_id,
+            notification_type='FAVORITE_UPDATE',
+            title=f"Price drop at {station_name}"[:100],
+            message=f"{changes}.",
+            related_object_id=str(station_id),
+            related_object_type='station',
+        ))
+        queued += 1
+    return queued
+
+
+def _recent_favorite_updates(station_ids: List) -> set:
+    """(user_id, station id string) pairs already sent a favourite update within the cooldown"""
+    since = timezone.now() - timedelta(hours=getattr(settings, 'FAVORITE_PRICE_DROP_COOLDOWN_HOURS', 24))
+    told = set()
+    for start in range(0, len(station_ids), BATCH_SIZE):
+        told.update(Notification.objects.filter(
+            related_object_type='station',
+            related_object_id__in=[str(station_id) for station_id in station_ids[start:start + BATCH_SIZE]],
+            created_at__gte=since,
+            notification_type='FAVORITE_UPDATE',
+        ).values_list('user_id', 'related_object_id'))
+    return told
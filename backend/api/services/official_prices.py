@@ -0,0 +1,141 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Optional
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever an OfficialPriceBaseline row changes so every worker reloads
+TABLE_VERSION_KEY = 'official_price_baseline_version'
+
+DEFAULT_ZONE = 'inland'
+
+# Official grades behind the regular/premium/diesel names used across the API
+GRADE_ALIASES = {
+    'regular': 'ulp_93',
+    'premium': 'ulp_95',
+    'diesel': 'diesel_50ppm',
+}
+
+# Last hard-coded inland prices, used for a grade the table has no row for (e.g. before it is seeded)
+FALLBACK_PRICES = {
+    'regular': 23.50,
+    'premium': 24.20,
+    'diesel': 22.80,
+}
+
+
+class OfficialPriceTable:
+    """In-memory copy of OfficialPriceBaseline with point-in-time lookups"""
+
+    def __init__(self):
+        # (zone, grade) -> ([effective dates ascending], [prices])
+        self._series = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._version = None
+
+    def load(self):
+        from ..models import OfficialPriceBaseline
+
+        version = cache.get(TABLE_VERSION_KEY)
+        series = defaultdict(lambda: ([], []))
+        rows = OfficialPriceBaseline.objects.order_by('effective_date').values_list(
+            'zone', 'grade', 'effective_date', 'price'
+        )
+        for zone, grade, effective_date, price in rows:
+            dates, prices = series[(zone, grade)]
+            dates.append(effective_date)
+            prices.append(float(price))
+
+        with self._lock:
+            self._series = dict(series)
+            self._version = version
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"Official price table loaded with {len(self._series)} zone/grade series")
+
+    def refresh(self):
+        """Reload on a version bump, or after OFFICIAL_PRICES_MAX_STALENESS seconds in case the bump came from
+        a process (such as set_official_prices) that doesn't share this worker's cache"""
+        max_staleness = getattr(settings, 'OFFICIAL_PRICES_MAX_STALENESS', 300)
+        if (not self._loaded or cache.get(TABLE_VERSION_KEY) != self._version
+                or time.monotonic() - self._loaded_at >= max_staleness):
+            self.load()
+
+    def price_on(self, grade: str, on_date: date, zone: str = DEFAULT_ZONE) -> Optional[float]:
+        """Price of a grade in force on a date, or None if nothing had been published yet"""
+        grade = GRADE_ALIASES.get(grade, grade)
+        # A zone without its own figure for the date falls back to the inland price
+        for series_zone in dict.fromkeys((zone, DEFAULT_ZONE)):
+            dates, prices = self._series.get((series_zone, grade), ((), ()))
+            position = bisect_right(dates, on_date)
+            if position:
+                return prices[position - 1]
+        return None
+
+    def effective_date_on(self, on_date: date, zone: str = DEFAULT_ZONE) -> Optional[date]:
+        """Most recent adjustment date on or before on_date across all grades in the zone"""
+        latest = None
+        for (series_zone, _), (dates, _) in self._series.items():
+            if series_zone != zone:
+                continue
+            position = bisect_right(dates, on_date)
+            if position and (latest is None or dates[position - 1] > latest):
+                latest = dates[position - 1]
+        return latest
+
+    def prices_on(self, on_date: date = None, zone: str = DEFAULT_ZONE) -> Dict:
+        """regular/premium/diesel plus every official grade in force on a date.
+
+        regular/premium/diesel are never None: without a published price they take FALLBACK_PRICES.
+        """
+        on_date = on_date or timezone.localdate()
+        grades = {grade for _, grade in self._series}
+        prices = {grade: self.price_on(grade, on_date, zone) for grade in grades}
+        for alias, grade in GRADE_ALIASES.items():
+            price = prices.get(grade)
+            prices[alias] = price if price is not None else FALLBACK_PRICES[alias]
+        effective_date = self.effective_date_on(on_date, zone)
+        if effective_date is None:
+            zone = DEFAULT_ZONE
+            effective_date = self.effective_date_on(on_date, zone)
+        prices['effective_date'] = effective_date
+        prices['zone'] = zone
+        return prices
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_official_price_table() -> OfficialPriceTable:
+    """Return this worker's official price table, reloading it if another process changed it"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = OfficialPriceTable()
+    _table.refresh()
+    return _table
+
+
+def get_official_prices(on_date: date = None, zone: str = DEFAULT_ZONE) -> Dict:
+    """Official prices in force on a date (today by default)"""
+    return get_official_price_table().prices_on(on_date, zone)
+
+
+def official_prices_changed():
+    try:
+        cache.incr(TABLE_VERSION_KEY)
+    except ValueError:
+        cache.set(TABLE_VERSION_KEY, 1, None)
@@ -0,0 +1,258 @@
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Tuple
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .geo import haversine_km
+from .notifications import send_notifications
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE_LAT = 111.32
+
+# Bumped whenever a PriceAlert changes
+ALERT_INDEX_VERSION_KEY = 'price_alert_index_version'
+
+# Alerts are grouped by radius so each group can use a grid sized to it:
+# a point only ever has to look at the 3x3 block of cells around it.
+RADIUS_TIERS_KM = (5, 25, 100, 500)
+
+NOTIFICATION_OBJECT_TYPE = 'price_alert'
+
+LOOKUP_CHUNK_SIZE = 5000
+
+
+class _RadiusTier:
+    """Grid over alert centres whose radius fits within max_radius_km"""
+
+    def __init__(self, max_radius_km: float, positions: np.ndarray, lats: np.ndarray, lngs: np.ndarray):
+        self.cell_size = max_radius_km / KM_PER_DEGREE_LAT
+        self.max_radius_km = max_radius_km
+        rows = np.floor(lats[positions] / self.cell_size).astype(np.int64)
+        cols = np.floor(lngs[positions] / self.cell_size).astype(np.int64)
+        cells = defaultdict(list)
+        for position, row, col in zip(positions.tolist(), rows.tolist(), cols.tolist()):
+            cells[(row, col)].append(position)
+        self.cells = {cell: np.array(members, dtype=np.int64) for cell, members in cells.items()}
+
+    def candidates(self, lat: float, lng: float) -> List[np.ndarray]:
+        lat_span = self.max_radius_km / KM_PER_DEGREE_LAT
+        lng_span = self.max_radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        min_row, max_row = math.floor((lat - lat_span) / self.cell_size), math.floor((lat + lat_span) / self.cell_size)
+        min_col, max_col = math.floor((lng - lng_span) / self.cell_size), math.floor((lng + lng_span) / self.cell_size)
+        found = []
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                members = self.cells.get((row, col))
+                if members is not None:
+                    found.append(members)
+        return found
+
+
+class _FuelTypeBucket:
+    """Active alerts for one fuel type, as parallel arrays plus radius-tiered grids"""
+
+    def __init__(self, rows: List[Tuple]):
+        alert_ids, user_ids, lats, lngs, radii, targets = zip(*rows)
+        self.alert_ids = np.array(alert_ids, dtype=np.int64)
+        self.user_ids = np.array(user_ids, dtype=np.int64)
+        self.lats = np.array(lats, dtype=np.float64)
+        self.lngs = np.array(lngs, dtype=np.float64)
+        self.radii = np.array(radii, dtype=np.float64)
+        self.targets = np.array(targets, dtype=np.float64)
+
+        self.tiers = []
+        lower = 0.0
+        for upper in RADIUS_TIERS_KM:
+            positions = np.flatnonzero((self.radii > lower) & (self.radii <= upper))
+            if len(positions):
+                self.tiers.append(_RadiusTier(upper, positions, self.lats, self.lngs))
+            lower = upper
+        # Anything wider than the largest tier is simply scanned
+        self.wide = np.flatnonzero(self.radii > RADIUS_TIERS_KM[-1])
+
+    def match(self, lat: float, lng: float, price: float) -> np.ndarray:
+        """Positions of alerts whose circle contains the point and whose target the price meets"""
+        groups = [members for tier in self.tiers for members in tier.candidates(lat, lng)]
+        if len(self.wide):
+            groups.append(self.wide)
+        if not groups:
+            return np.empty(0, dtype=np.int64)
+
+        candidates = np.concatenate(groups)
+        candidates = candidates[self.targets[candidates] >= price]
+        if not len(candidates):
+            return candidates
+        distances = haversine_km(lat, lng, self.lats[candidates], self.lngs[candidates])
+        return candidates[distances <= self.radii[candidates]]
+
+
+class PriceAlertIndex:
+    """In-process index of active price alerts, bucketed by fuel type"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._version = None
+
+    def load(self):
+        from ..models import PriceAlert
+
+        version = cache.get(ALERT_INDEX_VERSION_KEY)
+        rows_by_fuel_type = defaultdict(list)
+        alerts = PriceAlert.objects.filter(is_active=True).values_list(
+            'fuel_type_id', 'id', 'user_id', 'location_lat', 'location_lng', 'location_radius', 'target_price'
+        )
+        for fuel_type_id, *row in alerts.iterator(chunk_size=10000):
+            rows_by_fuel_type[fuel_type_id].append(row)
+
+        buckets = {fuel_type_id: _FuelTypeBucket(rows) for fuel_type_id, rows in rows_by_fuel_type.items()}
+        with self._lock:
+            self._buckets = buckets
+            self._version = version
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"Price alert index loaded with {sum(len(b.alert_ids) for b in buckets.values())} alerts")
+
+    def refresh(self):
+        """Reload if alerts changed, at most once per PRICE_ALERT_INDEX_MAX_STALENESS seconds.
+
+        The version bump only reaches other processes through a shared cache, so the
+        index is also reloaded unconditionally every PRICE_ALERT_INDEX_MAX_AGE seconds.
+        """
+        if self._loaded_at is None:
+            self.load()
+            return
+        age = time.monotonic() - self._loaded_at
+        if age >= getattr(settings, 'PRICE_ALERT_INDEX_MAX_AGE', 300):
+            self.load()
+        elif (age >= getattr(settings, 'PRICE_ALERT_INDEX_MAX_STALENESS', 60)
+                and cache.get(ALERT_INDEX_VERSION_KEY) != self._version):
+            self.load()
+
+    def match(self, fuel_type_id, lat: float, lng: float, price: float) -> List[Tuple[int, int, float]]:
+        """(alert_id, user_id, target_price) for every alert the price triggers"""
+        bucket = self._buckets.get(fuel_type_id)
+        if bucket is None:
+            return []
+        hits = bucket.match(lat, lng, price)
+        return list(zip(bucket.alert_ids[hits].tolist(), bucket.user_ids[hits].tolist(), bucket.targets[hits].tolist()))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_price_alert_index() -> PriceAlertIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = PriceAlertIndex()
+    _index.refresh()
+    return _index
+
+
+def price_alerts_changed():
+    try:
+        cache.incr(ALERT_INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(ALERT_INDEX_VERSION_KEY, 1, None)
+
+
+def notification_key(alert_id, station_id) -> str:
+    return f"{alert_id}:{station_id}"
+
+
+def match_price_alerts(prices: Iterable, fanout=None) -> int:
+    """Notify users whose price alerts are triggered by newly written FuelPrice rows.
+
+    Notifications go to the given NotificationFanout, or are sent straight away without one.
+    """
+    from ..models import Notification, PetrolStation, PriceAlert
+
+    # Lowest new price per station and fuel type
+    lowest = {}
+    for price in prices:
+        key = (price.station_id, price.fuel_type_id)
+        if key not in lowest or price.price < lowest[key].price:
+            lowest[key] = price
+    if not lowest:
+        return 0
+
+    index = get_price_alert_index()
+    stations = {
+        station_id: (lat, lng, name)
+        for station_id, lat, lng, name in PetrolStation.objects.filter(
+            id__in={station_id for station_id, _ in lowest}
+        ).values_list('id', 'latitude', 'longitude', 'name')
+    }
+
+    triggered = {}  # notification key -> (alert_id, user_id, target, price)
+    for (station_id, fuel_type_id), price in lowest.items():
+        station = stations.get(station_id)
+        if station is None or station[0] is None or station[1] is None:
+            continue
+        for alert_id, user_id, target in index.match(fuel_type_id, float(station[0]), float(station[1]), float(price.price)):
+            triggered[notification_key(alert_id, station_id)] = (alert_id, user_id, target, price)
+    if not triggered:
+        return 0
+
+    # Drop repeats: an alert fires once per station within the dedup window
+    dedup_window = timedelta(hours=getattr(settings, 'PRICE_ALERT_DEDUP_HOURS', 24))
+    recent = Notification.objects.filter(
+        related_object_type=NOTIFICATION_OBJECT_TYPE, created_at__gte=timezone.now() - dedup_window,
+    )
+    keys = list(triggered)
+    already_sent = set()
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        already_sent.update(recent.filter(
+            related_object_id__in=keys[start:start + LOOKUP_CHUNK_SIZE]
+        ).values_list('related_object_id', flat=True))
+
+    # The index may be a little stale; only notify for alerts that are still active
+    alert_ids = list({alert_id for alert_id, *_ in triggered.values()})
+    active_alerts = set()
+    for start in range(0, len(alert_ids), LOOKUP_CHUNK_SIZE):
+        active_alerts.update(PriceAlert.objects.filter(
+            id__in=alert_ids[start:start + LOOKUP_CHUNK_SIZE], is_active=True
+        ).values_list('id', flat=True))
+
+    fuel_type_names = _fuel_type_names({price.fuel_type_id for *_, price in triggered.values()})
+    notifications = []
+    for key, (alert_id, user_id, target, price) in triggered.items():
+        if key in already_sent or alert_id not in active_alerts:
+            continue
+        fuel_name = fuel_type_names.get(price.fuel_type_id, 'Fuel')
+        station_name = stations[price.station_id][2]
+        notifications.append(Notification(
+            user_id=user_id,
+            notification_type='PRICE_ALERT',
+            title=f"{fuel_name} price alert: {station_name}"[:100],
+            message=f"{fuel_name} is R{float(price.price):.2f} at {station_name}, "
+                    f"at or below your target of R{target:.2f}.",
+            related_object_id=key,
+            related_object_type=NOTIFICATION_OBJECT_TYPE,
+        ))
+
+    if fanout is None:
+        send_notifications(notifications)
+    else:
+        fanout.extend(notifications)
+    if notifications:
+        logger.info(f"Triggered {len(notifications)} price alert notifications")
+    return len(notifications)
+
+
+def _fuel_type_names(fuel_type_ids) -> Dict:
+    from ..models import FuelType
+    return dict(FuelType.objects.filter(id__in=fuel_type_ids).values_list('id', 'name'))
@@ -0,0 +1,61 @@
+from typing import Dict, Optional
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import PriceBaselineSnapshot
+
+logger = logging.getLogger(__name__)
+
+NATIONAL_REGION = 'national'
+
+# Held while a background refresh is queued or running, so a burst of
+# requests that all see stale data only triggers one scrape
+REFRESH_LOCK_KEY = 'price_baseline_refresh_lock'
+
+
+def get_price_baseline(region: str = NATIONAL_REGION) -> Optional[PriceBaselineSnapshot]:
+    """Read the stored baseline, queueing a background refresh if it is missing or stale"""
+    snapshot = PriceBaselineSnapshot.objects.filter(region=region).first()
+
+    max_age = getattr(settings, 'PRICE_BASELINE_MAX_AGE', 3600)
+    if snapshot is None or snapshot.age.total_seconds() > max_age:
+        request_baseline_refresh()
+
+    return snapshot
+
+
+def save_price_baseline(prices: Dict, source: str = '', region: str = NATIONAL_REGION) -> PriceBaselineSnapshot:
+    """Store a freshly scraped baseline"""
+    snapshot, _ = PriceBaselineSnapshot.objects.update_or_create(
+        region=region,
+        defaults={'prices': prices, 'source': source, 'fetched_at': timezone.now()},
+    )
+    return snapshot
+
+
+def request_baseline_refresh() -> bool:
+    """Queue a single refresh_price_baselines task; returns False if one is already pending"""
+    lock_timeout = getattr(settings, 'PRICE_BASELINE_REFRESH_LOCK_TIMEOUT', 300)
+    if not cache.add(REFRESH_LOCK_KEY, True, lock_timeout):
+        return False
+
+    # Publish from a background thread so a slow or unreachable broker can't hold up the request
+    threading.Thread(target=_enqueue_refresh, name='price-baseline-refresh', daemon=True).start()
+    return True
+
+
+def _enqueue_refresh():
+    try:
+        from ..tasks import refresh_price_baselines
+        refresh_price_baselines.apply_async(retry=False)
+    except Exception as e:
+        # Keep the lock so an unreachable broker isn't retried on every request
+        logger.error(f"Could not queue price baseline refresh: {e}")
+
+
+def release_refresh_lock():
+    cache.delete(REFRESH_LOCK_KEY)
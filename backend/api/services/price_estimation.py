@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from typing import Dict, List, Sequence, Tuple
+import hashlib
+import re
+import threading
+
+import numpy as np
+
+GRADES = ('regular', 'premium', 'diesel')
+
+DEFAULT_BASE_PRICE = 23.0
+
+# Estimates drift by up to this much (rand) either side of the modelled price,
+# so neighbouring unknown stations don't all show the identical figure
+JITTER_RAND = 0.10
+
+# Rules are (keywords, regular, premium, diesel); earlier rules win when several match.
+BRAND_RULES = [
+    (('shell',), 0.15, 0.20, 0.10),
+    (('bp',), 0.12, 0.18, 0.08),
+    (('total',), 0.10, 0.15, 0.05),
+    (('engen',), 0.08, 0.12, 0.03),
+    (('sasol',), 0.05, 0.08, 0.02),
+    (('caltex',), 0.07, 0.10, 0.04),
+]
+
+LOCATION_RULES = [
+    # Highway stations typically charge more
+    (('highway', 'n1', 'n2', 'n3', 'n4', 'freeway'), 0.20, 0.25, 0.15),
+    # City centre stations
+    (('cbd', 'city', 'center', 'central'), 0.10, 0.12, 0.08),
+    # Township/rural areas might be cheaper
+    (('township', 'rural', 'village'), -0.05, -0.08, -0.03),
+]
+
+# (minimum rating, adjustments); checked top down, ratings below 3.0 get a discount
+RATING_RULES = [
+    (4.5, (0.08, 0.10, 0.05)),
+    (4.0, (0.05, 0.07, 0.03)),
+    (3.5, (0.02, 0.03, 0.01)),
+]
+LOW_RATING = 3.0
+LOW_RATING_ADJUSTMENT = (-0.03, -0.05, -0.02)
+
+MEMO_SIZE = 20000
+
+
+class KeywordMatcher:
+    """All keywords of a rule list compiled into one regex; reports the highest-priority rule present"""
+
+    def __init__(self, rules: Sequence[Tuple]):
+        self._rule_for_keyword = {}
+        for index, rule in enumerate(rules):
+            for keyword in rule[0]:
+                self._rule_for_keyword.setdefault(keyword, index)
+        # Substring matching, as the keyword lists have always been applied
+        keywords = sorted(self._rule_for_keyword, key=len, reverse=True)
+        self._pattern = re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+        self.adjustments = np.vstack([
+            np.array([rule[1:] for rule in rules], dtype=np.float64),
+            np.zeros((1, len(GRADES))),  # row used when nothing matches
+        ])
+        self.no_match = len(rules)
+
+    def match(self, text: str) -> int:
+        """Index of the winning rule, or no_match"""
+        best = self.no_match
+        if text:
+            for found in self._pattern.finditer(text.lower()):
+                best = min(best, self._rule_for_keyword[found.group(0)])
+        return best
+
+    def match_all(self, texts: Sequence[str]) -> np.ndarray:
+        return np.fromiter((self.match(text) for text in texts), dtype=np.intp, count=len(texts))
+
+
+BRAND_MATCHER = KeywordMatcher(BRAND_RULES)
+LOCATION_MATCHER = KeywordMatcher(LOCATION_RULES)
+
+
+def rating_adjustments(ratings: np.ndarray) -> np.ndarray:
+    """N x 3 rating adjustments; NaN (no rating) gets none"""
+    ratings = ratings[:, np.newaxis]
+    conditions = [ratings >= minimum for minimum, _ in RATING_RULES] + [ratings < LOW_RATING]
+    choices = [np.array(values) for _, values in RATING_RULES] + [np.array(LOW_RATING_ADJUSTMENT)]
+    return np.select(conditions, choices, default=0.0)
+
+
+def station_identity(station: Dict) -> str:
+    """Stable key for a station dict, whichever source it came from"""
+    if station.get('google_place_id'):
+        return f"g:{station['google_place_id']}"
+    if station.get('id') is not None:
+        return f"db:{station['id']}"
+    return f"n:{station.get('name', '')}:{station.get('latitude')}:{station.get('longitude')}"
+
+
+def station_jitter(identities: Sequence[str]) -> np.ndarray:
+    """N x 3 offsets in [-JITTER_RAND, JITTER_RAND], fixed for each station identity and grade"""
+    raw = np.frombuffer(
+        b''.join(hashlib.blake2b(identity.encode(), digest_size=2 * len(GRADES)).digest() for identity in identities),
+        dtype='<u2',
+    ).reshape(len(identities), len(GRADES))
+    return (raw / 65535.0 * 2 - 1) * JITTER_RAND
+
+
+def _parse_rating(station: Dict) -> float:
+    rating = station.get('rating') or station.get('google_rating')
+    try:
+        return float(rating) if rating is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class PriceEstimator:
+    """Deterministic batch estimates for stations without reported prices.
+
+    Results depend only on the station's identity and attributes and on the
+    baseline prices, so they are memoised on exactly those inputs.
+    """
+
+    def __init__(self, memo_size: int = MEMO_SIZE):
+        self._memo = OrderedDict()
+        self._memo_size = memo_size
+        self._lock = threading.Lock()
+
+    def estimate(self, stations: List[Dict], baseline: Dict, jitter: bool = True,
+                 reliability: float = 0.6) -> List[List[Dict]]:
+        """Estimated regular/premium/diesel prices for each station, in order"""
+        base = np.array([float(baseline.get(grade) or DEFAULT_BASE_PRICE) for grade in GRADES])
+        as_of = baseline.get('effective_date') or baseline.get('last_updated')
+        as_of = as_of.isoformat() if hasattr(as_of, 'isoformat') else as_of
+        baseline_version = (tuple(base), as_of)
+
+        keys = [self._memo_key(station, baseline_version, jitter) for station in stations]
+        results = [None] * len(stations)
+        with self._lock:
+            for position, key in enumerate(keys):
+                cached = self._memo.get(key)
+                if cached is not None:
+                    self._memo.move_to_end(key)
+                    results[position] = cached
+
+        missing = [position for position, result in enumerate(results) if result is None]
+        if missing:
+            prices = self._estimate_batch([stations[position] for position in missing], base, jitter)
+            with self._lock:
+                for row, position in enumerate(missing):
+                    estimate = tuple(float(price) for price in prices[row])
+                    results[position] = estimate
+                    self._memo[keys[position]] = estimate
+                while len(self._memo) > self._memo_size:
+                    self._memo.popitem(last=False)
+
+        return [[{
+            'fuel_type': grade,
+            'price': price,
+            'last_updated': as_of,
+            'reliability_score': reliability,
+            'source': 'estimated',
+        } for grade, price in zip(GRADES, estimate)] for estimate in results]
+
+    def _estimate_batch(self, stations: List[Dict], base: np.ndarray, jitter: bool) -> np.ndarray:
+        brand_rules = BRAND_MATCHER.match_all([station.get('name') or '' for station in stations])
+        location_rules = LOCATION_MATCHER.match_all([station.get('address') or '' for station in stations])
+        ratings = np.array([_parse_rating(station) for station in stations], dtype=np.float64)
+
+        prices = (base[np.newaxis, :]
+                  + BRAND_MATCHER.adjustments[brand_rules]
+                  + LOCATION_MATCHER.adjustments[location_rules]
+                  + rating_adjustments(ratings))
+        if jitter:
+            prices = prices + station_jitter([station_identity(station) for station in stations])
+        return np.round(prices, 2)
+
+    def _memo_key(self, station: Dict, baseline_version: Tuple, jitter: bool) -> Tuple:
+        return (
+            station_identity(station), station.get('name') or '', station.get('address') or '',
+            station.get('rating') or station.get('google_rating'), baseline_version, jitter,
+        )
+
+
+_estimator = None
+_estimator_lock = threading.Lock()
+
+
+def get_price_estimator() -> PriceEstimator:
+    """Process-wide estimator, so its memo is shared between requests"""
+    global _estimator
+    if _estimator is None:
+        with _estimator_lock:
+            if _estimator is None:
+                _estimator = PriceEstimator()
+    return _estimator
@@ -0,0 +1,154 @@
+from typing import Dict, List, Optional
+from datetime import date, timedelta
+import logging
+import threading
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+NATIONAL = 'national'
+
+# EIA product codes -> our FuelType names
+EIA_PRODUCTS = {
+    'EPM0': 'Regular',
+    'EPMP': 'Premium',
+    'EPD2D': 'Diesel',
+}
+
+AAA_GRADES = {
+    'regular': 'Regular',
+    'premium': 'Premium',
+    'diesel': 'Diesel',
+}
+
+
+class FeedSnapshot:
+    """One download of a regional price feed, indexed by region"""
+
+    def __init__(self, feed: str, period: str, prices_by_region: Dict[str, List[Dict]]):
+        self.feed = feed
+        self.period = period
+        self.prices_by_region = prices_by_region
+
+    def lookup(self, region: Optional[str]) -> List[Dict]:
+        """Prices for a region, falling back to the national figures"""
+        region = (region or '').strip().lower()
+        prices = self.prices_by_region.get(region) or self.prices_by_region.get(NATIONAL, [])
+        return [dict(price) for price in prices]
+
+
+class PriceFeedSnapshots:
+    """Regional/national price feeds, downloaded once per publication period"""
+
+    def __init__(self, session: requests.Session = None):
+        self.session = session or requests.Session()
+        self._snapshots = {}
+        self._loaders = {
+            'aaa': (self._aaa_period, self._download_aaa),
+            'eia': (self._eia_period, self._download_eia),
+        }
+        # One lock per feed so different feeds can download in parallel
+        self._locks = {feed: threading.Lock() for feed in self._loaders}
+
+    def get(self, feed: str) -> Optional[FeedSnapshot]:
+        """Snapshot for a feed; downloaded at most once per run and once per period overall"""
+        with self._locks[feed]:
+            if feed in self._snapshots:
+                return self._snapshots[feed]
+
+            period_func, download_func = self._loaders[feed]
+            period, period_length = period_func()
+            cache_key = f"price_feed_{feed}_{period}"
+
+            prices_by_region = cache.get(cache_key)
+            if prices_by_region is None:
+                try:
+                    prices_by_region = download_func()
+                except Exception as e:
+                    logger.error(f"Error downloading {feed} price feed: {e}")
+                    prices_by_region = None
+
+                if prices_by_region:
+                    cache.set(cache_key, prices_by_region, int(period_length.total_seconds()))
+                    logger.info(f"Downloaded {feed} price feed for {period} ({len(prices_by_region)} regions)")
+
+            # Failures are remembered for the rest of the run so each station
+            # doesn't retry a feed that is down
+            snapshot = FeedSnapshot(feed, period, prices_by_region) if prices_by_region else None
+            self._snapshots[feed] = snapshot
+            return snapshot
+
+    def lookup(self, feed: str, region: Optional[str]) -> List[Dict]:
+        snapshot = self.get(feed)
+        return snapshot.lookup(region) if snapshot else []
+
+    def _aaa_period(self):
+        # AAA publishes daily averages
+        return date.today().isoformat(), timedelta(days=1)
+
+    def _eia_period(self):
+        # EIA publishes weekly retail prices
+        year, week, _ = date.today().isocalendar()
+        return f"{year}-W{week:02d}", timedelta(days=7)
+
+    def _download_aaa(self) -> Dict[str, List[Dict]]:
+        response = self.session.get("https://gasprices.aaa.com/api/prices", timeout=10)
+        response.raise_for_status()
+        data = response.json()
+
+        # Accept either {region: {grade: price}} or [{'state': region, grade: price}]
+        records = data.items() if isinstance(data, dict) else ((r.get('state'), r) for r in data)
+
+        prices_by_region = {}
+        for region, grades in records:
+            if not region or not isinstance(grades, dict):
+                continue
+            prices = [{
+                'fuel_type': fuel_type,
+                'price': float(grades[grade]),
+                'source': 'aaa',
+                'source_weight': 1.0,
+            } for grade, fuel_type in AAA_GRADES.items() if grades.get(grade) is not None]
+            if prices:
+                key = NATIONAL if region.lower() in ('national', 'us', 'u.s.') else region.lower()
+                prices_by_region[key] = prices
+
+        return prices_by_region
+
+    def _download_eia(self) -> Dict[str, List[Dict]]:
+        params = {
+            'api_key': settings.EIA_API_KEY,
+            'frequency': 'weekly',
+            'data[0]': 'value',
+            'facets[product][]': list(EIA_PRODUCTS),
+            'sort[0][column]': 'period',
+            'sort[0][direction]': 'desc',
+            'offset': 0,
+            'length': 500,
+        }
+        response = self.session.get("https://api.eia.gov/v2/petroleum/pri/gnd/data/", params=params, timeout=10)
+        response.raise_for_status()
+        rows = response.json().get('response', {}).get('data', [])
+        if not rows:
+            return {}
+
+        # Only the most recent published week
+        latest_period = max(row.get('period', '') for row in rows)
+
+        prices_by_region = {}
+        for row in rows:
+            fuel_type = EIA_PRODUCTS.get(row.get('product'))
+            if row.get('period') != latest_period or not fuel_type or row.get('value') is None:
+                continue
+            area = (row.get('area-name') or '').lower()
+            key = NATIONAL if row.get('duoarea') == 'NUS' or area == 'u.s.' else area
+            prices_by_region.setdefault(key, []).append({
+                'fuel_type': fuel_type,
+                'price': float(row['value']),
+                'source': 'eia',
+                'source_weight': 1.5,  # Official survey data
+            })
+
+        return prices_by_region
@@ -0,0 +1,153 @@
+from typing import Iterable, List
+import logging
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from ..models import FuelPrice, StationCurrentPrice
+from .change_log import record_price_changes, record_reset
+
+logger = logging.getLogger(__name__)
+
+CURRENT_PRICE_COLUMNS = [
+    'station_id', 'fuel_type_id', 'fuel_price_id', 'price', 'previous_price', 'price_change',
+    'source', 'confidence_score', 'is_verified', 'reported_at',
+]
+
+# Rows per INSERT ... ON CONFLICT statement
+UPSERT_CHUNK_SIZE = 1000
+
+
+def create_fuel_prices(prices: List[FuelPrice]) -> List[FuelPrice]:
+    """Insert FuelPrice rows in bulk and keep the current-price table in step"""
+    if not prices:
+        return []
+
+    with transaction.atomic():
+        created = FuelPrice.objects.bulk_create(prices)
+        prices_written(created)
+
+    return created
+
+
+def prices_written(prices: List[FuelPrice]):
+    """Follow-up for newly written FuelPrice rows: current prices now, notifications and live updates once committed"""
+    update_current_prices(prices)
+    transaction.on_commit(lambda: _notify_price_changes(prices))
+    transaction.on_commit(lambda: _publish_price_changes(prices))
+
+
+def _notify_price_changes(prices: List[FuelPrice]):
+    from .notifications import NotificationFanout, queue_favorite_price_drops
+    from .price_alerts import match_price_alerts
+
+    fanout = NotificationFanout()
+    try:
+        match_price_alerts(prices, fanout)
+        queue_favorite_price_drops(prices, fanout)
+        fanout.flush()
+    except Exception as e:
+        # Notifications are best effort; the prices themselves are already saved
+        logger.error(f"Error sending price notifications: {e}")
+
+
+def _publish_price_changes(prices: List[FuelPrice]):
+    from .live_updates import publish_prices
+
+    try:
+        publish_prices(prices)
+    except Exception as e:
+        logger.error(f"Error publishing live price updates: {e}")
+
+
+def update_current_prices(prices: Iterable[FuelPrice]) -> int:
+    """Upsert StationCurrentPrice rows for newly written prices, keeping the newest per key.
+
+    The reported_at check sits in the ON CONFLICT clause, so an older price
+    never replaces a newer one even when writers race on a brand-new key.
+    """
+    newest = {}
+    for price in prices:
+        key = (price.station_id, price.fuel_type_id)
+        if key not in newest or price.reported_at >= newest[key].reported_at:
+            newest[key] = price
+
+    if not newest:
+        return 0
+
+    table = StationCurrentPrice._meta.db_table
+    rows = [
+        (price.station_id, price.fuel_type_id, price.id, price.price, price.previous_price, price.price_change,
+         price.source, price.confidence_score, price.is_verified, price.reported_at)
+        for price in newest.values()
+    ]
+    changed = []
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+            values = ', '.join([f"({', '.join(['%s'] * len(CURRENT_PRICE_COLUMNS))}, NOW())"] * len(chunk))
+            cursor.execute(f"""
+                INSERT INTO {table} ({', '.join(CURRENT_PRICE_COLUMNS)}, updated_at)
+                VALUES {values}
+                ON CONFLICT (station_id, fuel_type_id) DO UPDATE SET
+                    {', '.join(f"{column} = EXCLUDED.{column}" for column in CURRENT_PRICE_COLUMNS[2:])},
+                    updated_at = EXCLUDED.updated_at
+                WHERE {table}.reported_at <= EXCLUDED.reported_at
+                RETURNING station_id, fuel_type_id
+            """, [value for row in chunk for value in row])
+            changed += cursor.fetchall()
+
+        record_price_changes(changed)
+
+    return len(changed)
+
+
+def recompute_current_prices(keys: Iterable) -> int:
+    """Re-derive the current price of (station_id, fuel_type_id) keys from the remaining history.
+
+    For edits and deletes, where the newest-wins upsert can't move a key backwards.
+    """
+    keys = set(keys)
+    if not keys:
+        return 0
+
+    matching = Q()
+    for station_id, fuel_type_id in keys:
+        matching |= Q(station_id=station_id, fuel_type_id=fuel_type_id)
+
+    with transaction.atomic():
+        StationCurrentPrice.objects.filter(matching).delete()
+        latest = FuelPrice.objects.filter(matching).order_by(
+            'station_id', 'fuel_type_id', '-reported_at', '-id'
+        ).distinct('station_id', 'fuel_type_id')
+        update_current_prices(latest)
+        # Keys left without any price drop out of the table; log those too
+        record_price_changes(keys)
+
+    return len(keys)
+
+
+def rebuild_current_prices() -> int:
+    """Recompute the whole current-price table from FuelPrice history"""
+    current_table = StationCurrentPrice._meta.db_table
+    price_table = FuelPrice._meta.db_table
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {current_table}")
+        cursor.execute(f"""
+            INSERT INTO {current_table} (
+                station_id, fuel_type_id, fuel_price_id, price, previous_price, price_change,
+                source, confidence_score, is_verified, reported_at, updated_at
+            )
+            SELECT DISTINCT ON (station_id, fuel_type_id)
+                station_id, fuel_type_id, id, price, previous_price, price_change,
+                source, confidence_score, is_verified, reported_at, NOW()
+            FROM {price_table}
+            ORDER BY station_id, fuel_type_id, reported_at DESC, id DESC
+        """)
+        rebuilt = cursor.rowcount
+        record_reset()
+
+    logger.info(f"Rebuilt {rebuilt} current price rows")
+    return rebuilt
@@ -0,0 +1,87 @@
+from typing import Dict, Optional
+import logging
+
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Greatest, NullIf
+
+from ..models import PetrolStation, Review
+
+logger = logging.getLogger(__name__)
+
+# Review field -> (count, total, average) columns on PetrolStation
+AGGREGATES = {
+    'rating': ('reviews_count', 'rating_total', 'avg_rating'),
+    'service_rating': ('service_rating_count', 'service_rating_total', 'avg_service_rating'),
+    'cleanliness_rating': ('cleanliness_rating_count', 'cleanliness_rating_total', 'avg_cleanliness_rating'),
+    'price_rating': ('price_rating_count', 'price_rating_total', 'avg_price_rating'),
+}
+
+
+def review_snapshot(review: Review) -> Dict:
+    """The parts of a review the station aggregates depend on"""
+    return {'station_id': review.station_id, **{field: getattr(review, field) for field in AGGREGATES}}
+
+
+def _apply(station_id, ratings: Dict, sign: int):
+    """Add (sign=1) or remove (sign=-1) one review's ratings with a single UPDATE"""
+    updates = {}
+    for field, (count, total, average) in AGGREGATES.items():
+        value = ratings.get(field)
+        if value is None:
+            continue
+        new_count = F(count) + sign
+        new_total = F(total) + sign * value
+        if sign < 0:
+            # Reviews written around the viewset (admin, shell) aren't counted; don't go negative
+            new_count, new_total = Greatest(new_count, Value(0)), Greatest(new_total, Value(0))
+        updates[count] = new_count
+        updates[total] = new_total
+        # Right-hand sides all see the row as it was, so the average uses the new totals
+        updates[average] = Cast(new_total, FloatField()) / NullIf(new_count, Value(0))
+    if updates:
+        PetrolStation.objects.filter(id=station_id).update(**updates)
+
+
+def review_changed(old: Optional[Dict] = None, new: Optional[Dict] = None):
+    """Update station aggregates for a review created (old=None), edited, or deleted (new=None)"""
+    with transaction.atomic():
+        if old is not None:
+            _apply(old['station_id'], old, -1)
+        if new is not None:
+            _apply(new['station_id'], new, 1)
+
+
+def rebuild_station_ratings() -> int:
+    """Recompute every station's review aggregates from the review table"""
+    station_table = PetrolStation._meta.db_table
+    review_table = Review._meta.db_table
+
+    assignments, selects = [], []
+    for field, (count, total, average) in AGGREGATES.items():
+        assignments += [
+            f"{count} = COALESCE(agg.{count}, 0)",
+            f"{total} = COALESCE(agg.{total}, 0)",
+            f"{average} = agg.{average}",
+        ]
+        selects += [
+            f"COUNT({field}) AS {count}",
+            f"SUM({field}) AS {total}",
+            f"AVG({field})::float AS {average}",
+        ]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {station_table} SET {', '.join(assignments)}
+            FROM {station_table} AS s
+            LEFT JOIN (
+                SELECT station_id, {', '.join(selects)}
+                FROM {review_table}
+                GROUP BY station_id
+            ) AS agg ON agg.station_id = s.id
+            WHERE {station_table}.id = s.id
+        """)
+        rebuilt = cursor.rowcount
+
+    logger.info(f"Rebuilt rating aggregates for {rebuilt} stations")
+    return rebuilt
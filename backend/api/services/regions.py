@@ -0,0 +1,190 @@
+from collections import defaultdict, namedtuple
+from typing import Dict, List, Optional, Tuple
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever a RegionBoundary changes so every worker rebuilds its index
+BOUNDARY_VERSION_KEY = 'region_boundary_version'
+
+# ~28km cells: fine enough that most cells lie wholly inside one province
+DEFAULT_CELL_SIZE = 0.25
+
+DEFAULT_PRICE_ZONE = 'inland'
+
+Region = namedtuple('Region', ['province', 'price_zone'])
+
+
+class BoundaryPolygon:
+    """One polygon of a boundary with its edges precomputed for ray casting"""
+
+    def __init__(self, code: str, rings: List[List]):
+        self.code = code
+        # Per ring: (x1, y1, x2, y2) arrays of edges, x = lng, y = lat
+        self.rings = []
+        for ring in rings:
+            points = np.asarray([point[:2] for point in ring], dtype=np.float64)
+            if len(points) < 3:
+                continue
+            x1, y1 = points[:, 0], points[:, 1]
+            self.rings.append((x1, y1, np.roll(x1, -1), np.roll(y1, -1)))
+
+        outer = self.rings[0] if self.rings else (np.zeros(1),) * 4
+        self.bounds = (outer[1].min(), outer[0].min(), outer[1].max(), outer[0].max())  # south, west, north, east
+
+    def contains(self, lat: float, lng: float) -> bool:
+        south, west, north, east = self.bounds
+        if not self.rings or not (south <= lat <= north and west <= lng <= east):
+            return False
+        outer, holes = self.rings[0], self.rings[1:]
+        return _ring_contains(outer, lat, lng) and not any(_ring_contains(hole, lat, lng) for hole in holes)
+
+    def edges_touch(self, south: float, west: float, north: float, east: float) -> bool:
+        """Whether any edge's bounding box overlaps the given box"""
+        for x1, y1, x2, y2 in self.rings:
+            overlaps = ((np.minimum(x1, x2) <= east) & (np.maximum(x1, x2) >= west) &
+                        (np.minimum(y1, y2) <= north) & (np.maximum(y1, y2) >= south))
+            if overlaps.any():
+                return True
+        return False
+
+
+def _ring_contains(ring: Tuple, lat: float, lng: float) -> bool:
+    x1, y1, x2, y2 = ring
+    crosses = (y1 > lat) != (y2 > lat)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_at_lat = x1 + (lat - y1) * (x2 - x1) / (y2 - y1)
+    return bool(np.count_nonzero(crosses & (lng < x_at_lat)) % 2)
+
+
+class RegionResolver:
+    """Grid index over province and price zone polygons for (lat, lng) -> region lookups.
+
+    Each grid cell lists the polygons overlapping it. Cells no polygon edge
+    passes through are marked as wholly inside their polygon, so most
+    lookups are a dict access with no geometry at all.
+    """
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = {}  # kind -> {(row, col): [(polygon, interior)]}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._version = None
+        self._fingerprint = None  # (boundary count, latest updated_at) at load
+        self._checked_at = 0.0
+
+    def _cell_for(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def load(self):
+        from ..models import RegionBoundary
+
+        version = cache.get(BOUNDARY_VERSION_KEY)
+        fingerprint = self._current_fingerprint()
+        cells = defaultdict(lambda: defaultdict(list))
+        for boundary in RegionBoundary.objects.all():
+            for rings in boundary.polygons():
+                self._index_polygon(cells[boundary.kind], BoundaryPolygon(boundary.code, rings))
+
+        with self._lock:
+            self._cells = {kind: dict(kind_cells) for kind, kind_cells in cells.items()}
+            self._version = version
+            self._fingerprint = fingerprint
+            self._checked_at = time.monotonic()
+            self._loaded = True
+
+        logger.info(f"Region resolver loaded {sum(len(c) for c in self._cells.values())} grid cells")
+
+    def refresh(self):
+        """Rebuild on a version bump. Every REGION_RESOLVER_CHECK_SECONDS also compare a cheap fingerprint
+        of the table, since bumps from other processes (load_region_boundaries) need a shared cache"""
+        if not self._loaded or cache.get(BOUNDARY_VERSION_KEY) != self._version:
+            self.load()
+            return
+        if time.monotonic() - self._checked_at < getattr(settings, 'REGION_RESOLVER_CHECK_SECONDS', 60):
+            return
+        self._checked_at = time.monotonic()
+        if self._current_fingerprint() != self._fingerprint:
+            self.load()
+
+    def _current_fingerprint(self) -> Tuple:
+        from django.db.models import Count, Max
+        from ..models import RegionBoundary
+
+        state = RegionBoundary.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+        return state['count'], state['latest']
+
+    def _index_polygon(self, cells: Dict, polygon: BoundaryPolygon):
+        if not polygon.rings:
+            return
+        south, west, north, east = polygon.bounds
+        min_row, min_col = self._cell_for(south, west)
+        max_row, max_col = self._cell_for(north, east)
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                cell_south, cell_west = row * self.cell_size, col * self.cell_size
+                cell_north, cell_east = cell_south + self.cell_size, cell_west + self.cell_size
+                if polygon.edges_touch(cell_south, cell_west, cell_north, cell_east):
+                    cells[(row, col)].append((polygon, False))
+                elif polygon.contains(cell_south + self.cell_size / 2, cell_west + self.cell_size / 2):
+                    cells[(row, col)].append((polygon, True))
+
+    def lookup(self, kind: str, lat: float, lng: float) -> Optional[str]:
+        """Code of the boundary of this kind containing the point, if any"""
+        for polygon, interior in self._cells.get(kind, {}).get(self._cell_for(lat, lng), ()):
+            if interior or polygon.contains(lat, lng):
+                return polygon.code
+        return None
+
+    def resolve(self, lat, lng) -> Region:
+        """Province and fuel price zone of a point; blanks where no boundaries are loaded"""
+        if lat is None or lng is None:
+            return Region('', '')
+        lat, lng = float(lat), float(lng)
+        province = self.lookup('province', lat, lng) or ''
+        price_zone = self.lookup('price_zone', lat, lng)
+        if price_zone is None:
+            price_zone = DEFAULT_PRICE_ZONE if 'price_zone' in self._cells else ''
+        return Region(province, price_zone)
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_region_resolver() -> RegionResolver:
+    """Return this worker's resolver, rebuilding it if boundaries changed"""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = RegionResolver()
+    _resolver.refresh()
+    return _resolver
+
+
+def resolve_region(lat, lng) -> Region:
+    return get_region_resolver().resolve(lat, lng)
+
+
+def assign_station_region(station) -> bool:
+    """Set station.province/price_zone from its coordinates (not saved); True if they changed"""
+    region = resolve_region(station.latitude, station.longitude)
+    changed = (station.province, station.price_zone) != tuple(region)
+    station.province, station.price_zone = region
+    return changed
+
+
+def boundaries_changed():
+    try:
+        cache.incr(BOUNDARY_VERSION_KEY)
+    except ValueError:
+        cache.set(BOUNDARY_VERSION_KEY, 1, None)
@@ -0,0 +1,356 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterable, List, Optional
+import hashlib
+import logging
+import re
+import threading
+import time
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .source_metrics import record_source_call, record_source_race, record_source_timeout, record_source_win
+
+logger = logging.getLogger(__name__)
+
+METRICS_GROUP = 'price_scrapers'
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Validators and last parsed prices are kept long enough to outlive a few
+# quiet periods on the source sites
+SCRAPER_STATE_TIMEOUT = 7 * 24 * 3600
+
+PRICE_PATTERN = re.compile(r'R?(\d+\.?\d*)')
+RAND_AMOUNT_PATTERN = re.compile(r'R\s?(\d+\.\d+)')
+PRICE_CLASS_PATTERN = re.compile(r'price|fuel', re.I)
+PETROL_PATTERN = re.compile(r'Petrol.*?R(\d+\.?\d*)', re.I)
+DIESEL_PATTERN = re.compile(r'Diesel.*?R(\d+\.?\d*)', re.I)
+
+FUEL_GRADES = ('regular', 'premium', 'diesel')
+
+_VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr',
+])
+
+
+def parse_price(text: str) -> Optional[float]:
+    """First rand amount in the text, else the first bare number"""
+    match = RAND_AMOUNT_PATTERN.search(text) or PRICE_PATTERN.search(text)
+    return float(match.group(1)) if match else None
+
+
+def classify_fuel_label(label: str) -> Optional[str]:
+    """Map a scraped label to a fuel grade; octane numbers win over the generic word 'petrol'"""
+    label = label.lower()
+    if '93' in label:
+        return 'regular'
+    if '95' in label or 'premium' in label:
+        return 'premium'
+    if 'diesel' in label:
+        return 'diesel'
+    if 'petrol' in label:
+        return 'regular'
+    return None
+
+
+class TargetedExtractor(HTMLParser):
+    """Streaming HTML parser that only keeps text inside elements it is told to watch.
+
+    No tree is built: text is collected for open target elements only, and each
+    target is handed to on_block(tag, text) when it closes. on_block returns True
+    once it has what it needs, which stops the parse.
+    """
+
+    def __init__(self, is_target: Callable[[str, Dict], bool], on_block: Callable[[str, str], bool]):
+        super().__init__(convert_charrefs=True)
+        self.is_target = is_target
+        self.on_block = on_block
+        self.done = False
+        self._stack = []  # (tag, text parts or None for non-targets)
+        self._open_targets = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.done or tag in _VOID_TAGS:
+            return
+        parts = [] if self.is_target(tag, dict(attrs)) else None
+        self._stack.append((tag, parts))
+        if parts is not None:
+            self._open_targets.append(parts)
+
+    def handle_endtag(self, tag):
+        if self.done or not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        # Pop up to the matching tag, closing anything left unclosed inside it
+        while self._stack:
+            open_tag, parts = self._stack.pop()
+            if parts is not None:
+                self._open_targets.pop()
+                if self.on_block(open_tag, ''.join(parts)):
+                    self.done = True
+                    return
+            if open_tag == tag:
+                return
+
+    def handle_data(self, data):
+        if self._open_targets:
+            for parts in self._open_targets:
+                parts.append(data)
+
+
+class TableRowExtractor(HTMLParser):
+    """Streaming HTML parser that yields the cell texts of each table row to on_row(cells)"""
+
+    def __init__(self, on_row: Callable[[List[str]], bool]):
+        super().__init__(convert_charrefs=True)
+        self.on_row = on_row
+        self.done = False
+        self._table_depth = 0
+        self._cells = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == 'table':
+            self._table_depth += 1
+        elif self._table_depth and tag == 'tr':
+            self._finish_row()
+            self._cells = []
+        elif self._cells is not None and tag in ('td', 'th'):
+            self._finish_cell()
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag in ('td', 'th'):
+            self._finish_cell()
+        elif tag == 'tr':
+            self._finish_row()
+        elif tag == 'table' and self._table_depth:
+            self._finish_row()
+            self._table_depth -= 1
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def _finish_cell(self):
+        if self._cell is not None:
+            self._cells.append(''.join(self._cell).strip())
+            self._cell = None
+
+    def _finish_row(self):
+        self._finish_cell()
+        if self._cells is not None:
+            cells, self._cells = self._cells, None
+            if cells and self.on_row(cells):
+                self.done = True
+
+
+class ScrapeCancelled(Exception):
+    """Raised inside a losing scraper that stopped reading because another one won the race"""
+
+
+class PriceScraper(ABC):
+    """One fuel price site: conditional download plus a targeted extractor"""
+
+    name = ''
+    url = ''
+
+    def fetch(self, session: requests.Session, cancelled: threading.Event = None) -> Optional[Dict[str, float]]:
+        """Raw {grade: price} from the site, reusing the last parse when the page is unchanged"""
+        state_key = f"scraper_state_{hashlib.md5(self.url.encode()).hexdigest()}"
+        state = cache.get(state_key) or {}
+
+        headers = {'User-Agent': USER_AGENT}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+
+        with session.get(self.url, headers=headers, timeout=10, stream=True) as response:
+            if response.status_code == 304 and state.get('prices'):
+                logger.info(f"{self.name} unchanged since last scrape")
+                return dict(state['prices'])
+
+            response.raise_for_status()
+            response.encoding = response.encoding or 'utf-8'
+            prices = self.extract(response.iter_content(chunk_size=8192, decode_unicode=True), cancelled)
+
+            if prices and (response.headers.get('ETag') or response.headers.get('Last-Modified')):
+                cache.set(state_key, {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'prices': prices,
+                }, SCRAPER_STATE_TIMEOUT)
+
+        return prices
+
+    def extract(self, chunks: Iterable[str], cancelled: threading.Event = None) -> Dict[str, float]:
+        """Feed HTML chunks to the extractor, stopping as soon as it has the price region"""
+        prices = {}
+        parser = self.build_parser(prices)
+        for chunk in chunks:
+            if cancelled is not None and cancelled.is_set():
+                # Another scraper already won; stop reading this body
+                raise ScrapeCancelled(self.name)
+            parser.feed(chunk)
+            if parser.done:
+                break
+        else:
+            parser.close()
+        return prices
+
+    @abstractmethod
+    def build_parser(self, prices: Dict[str, float]) -> HTMLParser:
+        """Parser with a done flag that fills prices as it is fed the page"""
+
+
+class FuelPricesCoZaScraper(PriceScraper):
+    name = 'fuelprices.co.za'
+    url = 'https://www.fuelprices.co.za/'
+
+    def build_parser(self, prices):
+        matched_lengths = {}
+
+        def is_target(tag, attrs):
+            return tag in ('div', 'td', 'span') and bool(PRICE_CLASS_PATTERN.search(attrs.get('class') or ''))
+
+        def on_block(tag, text):
+            grade = classify_fuel_label(text)
+            price = parse_price(text)
+            # Blocks close innermost first; an enclosing block's text mixes several
+            # grades, so the shortest block that names a grade is the most specific
+            if grade and price is not None and len(text) < matched_lengths.get(grade, float('inf')):
+                prices[grade] = price
+                matched_lengths[grade] = len(text)
+            return False
+
+        return TargetedExtractor(is_target, on_block)
+
+
+class AACoZaScraper(PriceScraper):
+    name = 'aa.co.za'
+    url = 'https://www.aa.co.za/fuel-price'
+
+    def build_parser(self, prices):
+        def is_target(tag, attrs):
+            return tag in ('div', 'table') and bool(PRICE_CLASS_PATTERN.search(attrs.get('class') or ''))
+
+        def on_block(tag, text):
+            petrol_match = PETROL_PATTERN.search(text)
+            if petrol_match:
+                prices['regular'] = float(petrol_match.group(1))
+            diesel_match = DIESEL_PATTERN.search(text)
+            if diesel_match:
+                prices['diesel'] = float(diesel_match.group(1))
+            # The AA page only lists petrol and diesel
+            return 'regular' in prices and 'diesel' in prices
+
+        return TargetedExtractor(is_target, on_block)
+
+
+class AutomobilCoZaScraper(PriceScraper):
+    name = 'automobil.co.za'
+    url = 'https://www.automobil.co.za/fuel-prices/'
+
+    def build_parser(self, prices):
+        def on_row(cells):
+            if len(cells) >= 2:
+                grade = classify_fuel_label(cells[0])
+                price = parse_price(cells[1])
+                if grade and price is not None:
+                    prices[grade] = price
+            return all(grade in prices for grade in FUEL_GRADES)
+
+        return TableRowExtractor(on_row)
+
+
+SCRAPERS = [FuelPricesCoZaScraper(), AACoZaScraper(), AutomobilCoZaScraper()]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Worker pool for scraper races; sized so a race never queues behind stragglers from the last one"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=len(SCRAPERS) * 2, thread_name_prefix='price-scraper')
+    return _executor
+
+
+_sessions = None
+
+
+def _get_sessions() -> Dict[str, requests.Session]:
+    """One keep-alive session per site, shared by every race in the process and opened on first use"""
+    global _sessions
+    if _sessions is None:
+        with _executor_lock:
+            if _sessions is None:
+                _sessions = {scraper.name: requests.Session() for scraper in SCRAPERS}
+    return _sessions
+
+
+def _record_call(scraper: PriceScraper, started: float) -> Callable:
+    """Done-callback recording a scraper's latency and outcome, including ones finishing after the winner"""
+    def record(future):
+        # Never started, or cut short by the winner: says nothing about the source's health
+        if future.cancelled() or isinstance(future.exception(), ScrapeCancelled):
+            return
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Error scraping {scraper.url}: {str(error)}")
+        record_source_call(
+            METRICS_GROUP, scraper.name, time.monotonic() - started, error is None and bool(future.result())
+        )
+    return record
+
+
+def race_scrapers(accept: Callable[[Dict], Optional[Dict]],
+                  sessions: Dict[str, requests.Session] = None,
+                  deadline: float = None) -> Optional[Dict]:
+    """Run every scraper at once and return the first result that accept() turns into prices.
+
+    accept() receives a scraper's raw {grade: price} and returns the formatted prices,
+    or None to reject them. The remaining scrapers are cancelled once one wins.
+    """
+    deadline = deadline or getattr(settings, 'FUEL_PRICE_SCRAPE_DEADLINE', 15)
+    sessions = sessions or _get_sessions()
+    cancelled = threading.Event()
+    futures = {}
+    for scraper in SCRAPERS:
+        future = _get_executor().submit(scraper.fetch, sessions[scraper.name], cancelled)
+        future.add_done_callback(_record_call(scraper, time.monotonic()))
+        futures[future] = scraper
+    record_source_race(METRICS_GROUP, [scraper.name for scraper in SCRAPERS])
+
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            scraper = futures[future]
+            raw_prices = future.result() if future.exception() is None else None
+            prices = accept(raw_prices) if raw_prices else None
+            if prices:
+                record_source_win(METRICS_GROUP, scraper.name)
+                logger.info(f"Successfully scraped prices from {scraper.url}")
+                return prices
+    except FuturesTimeoutError:
+        for future, scraper in futures.items():
+            if not future.done():
+                record_source_timeout(METRICS_GROUP, scraper.name)
+                logger.warning(f"Dropped {scraper.url}: missed {deadline}s scrape deadline")
+    finally:
+        cancelled.set()
+        for future in futures:
+            future.cancel()
+
+    return None
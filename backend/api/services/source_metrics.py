@@ -0,0 +1,64 @@
+from typing import Dict, Iterable
+import logging
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Counters roll over after a week of inactivity so stale sources age out
+METRICS_TIMEOUT = 7 * 24 * 3600
+
+COUNTERS = ['calls', 'successes', 'failures', 'timeouts', 'latency_ms', 'races', 'wins']
+
+
+def _key(group: str, source: str, counter: str) -> str:
+    return f"source_metrics_{group}_{source}_{counter}"
+
+
+def _incr(key: str, delta: int = 1):
+    # add() is a no-op when the key exists, so this is race-free on shared caches
+    cache.add(key, 0, METRICS_TIMEOUT)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, METRICS_TIMEOUT)
+
+
+def record_source_call(group: str, source: str, latency: float, success: bool):
+    """Record one completed call to an external source"""
+    _incr(_key(group, source, 'calls'))
+    _incr(_key(group, source, 'successes' if success else 'failures'))
+    _incr(_key(group, source, 'latency_ms'), int(latency * 1000))
+
+
+def record_source_timeout(group: str, source: str):
+    """Record a call that missed its deadline and was dropped"""
+    _incr(_key(group, source, 'timeouts'))
+
+
+def record_source_race(group: str, sources: Iterable[str]):
+    """Record that these sources were started together, first valid result wins"""
+    for source in sources:
+        _incr(_key(group, source, 'races'))
+
+
+def record_source_win(group: str, source: str):
+    """Record the source whose result was used in a race"""
+    _incr(_key(group, source, 'wins'))
+
+
+def get_source_metrics(group: str, sources: Iterable[str]) -> Dict[str, Dict]:
+    """Counters plus derived success rate and average latency for each source"""
+    sources = list(sources)
+    keys = [_key(group, source, counter) for source in sources for counter in COUNTERS]
+    values = cache.get_many(keys)
+
+    metrics = {}
+    for source in sources:
+        stats = {counter: values.get(_key(group, source, counter), 0) for counter in COUNTERS}
+        calls = stats['calls']
+        stats['success_rate'] = round(stats['successes'] / calls, 3) if calls else None
+        stats['avg_latency_ms'] = round(stats['latency_ms'] / calls) if calls else None
+        stats['win_rate'] = round(stats['wins'] / stats['races'], 3) if stats['races'] else None
+        metrics[source] = stats
+    return metrics
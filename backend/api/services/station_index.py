@@ -0,0 +1,221 @@
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .geo import within_radius
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE_LAT = 111.32
+
+# Roughly 5.5km of latitude per cell, so a typical 5km nearby query touches ~9 cells
+DEFAULT_CELL_SIZE = 0.05
+
+# Shared cache keys used to tell other workers that their copy is out of date.
+# The version is bumped on every station change (apply a delta), the generation
+# on deletions (rebuild from scratch, since deleted rows can't be queried for).
+INDEX_VERSION_KEY = 'station_index_version'
+INDEX_GENERATION_KEY = 'station_index_generation'
+
+# Overlap applied to delta queries to absorb clock skew between workers
+DELTA_SYNC_OVERLAP = timedelta(seconds=5)
+
+
+class StationGridIndex:
+    """Uniform lat/lng grid over active petrol stations for radius lookups"""
+
+    def __init__(self, cell_size: float = DEFAULT_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = defaultdict(set)
+        self._stations = {}  # station id -> (lat, lng, cell, amenity flags)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._synced_at = None
+        self._checked_at = 0.0  # time.monotonic() of the last load or delta sync
+        self._version = None
+        self._generation = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._stations)
+
+    def _cell_for(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def load(self):
+        """Rebuild the whole index from the database"""
+        from ..models import PetrolStation
+
+        started_at = timezone.now()
+        version, generation = self._shared_state()
+        rows = PetrolStation.objects.filter(is_active=True).values_list(
+            'id', 'latitude', 'longitude', 'amenity_flags'
+        )
+
+        with self._lock:
+            self._cells = defaultdict(set)
+            self._stations = {}
+            for station_id, lat, lng, flags in rows:
+                self._insert(station_id, lat, lng, flags)
+            self._synced_at = started_at
+            self._checked_at = time.monotonic()
+            self._version = version
+            self._generation = generation
+            self._loaded = True
+
+        logger.info(f"Station index loaded with {len(self._stations)} stations")
+
+    def refresh(self):
+        """Bring the index up to date with changes made by other workers.
+
+        Version bumps only travel between processes through a shared cache, so the
+        updated_at delta also runs every STATION_INDEX_SYNC_SECONDS regardless.
+        Deleted stations left behind are harmless: lookups re-filter on the database.
+        """
+        if not self._loaded:
+            self.load()
+            return
+
+        version, generation = self._shared_state()
+        if generation != self._generation:
+            self.load()
+            return
+        sync_seconds = getattr(settings, 'STATION_INDEX_SYNC_SECONDS', 30)
+        if version == self._version and time.monotonic() - self._checked_at < sync_seconds:
+            return
+
+        from ..models import PetrolStation
+
+        started_at = timezone.now()
+        changed = PetrolStation.objects.filter(
+            updated_at__gte=self._synced_at - DELTA_SYNC_OVERLAP
+        ).values_list('id', 'latitude', 'longitude', 'amenity_flags', 'is_active')
+
+        with self._lock:
+            for station_id, lat, lng, flags, is_active in changed:
+                if is_active:
+                    self.upsert(station_id, lat, lng, flags)
+                else:
+                    self.remove(station_id)
+            self._synced_at = started_at
+            self._checked_at = time.monotonic()
+            self._version = version
+
+    def upsert(self, station_id, lat, lng, flags: int = 0):
+        """Insert or move a single station"""
+        with self._lock:
+            self.remove(station_id)
+            self._insert(station_id, lat, lng, flags)
+
+    def remove(self, station_id):
+        """Drop a single station from the index"""
+        with self._lock:
+            entry = self._stations.pop(station_id, None)
+            if entry:
+                cell = self._cells.get(entry[2])
+                if cell is not None:
+                    cell.discard(station_id)
+                    if not cell:
+                        del self._cells[entry[2]]
+
+    def nearby(self, lat: float, lng: float, radius_km: float,
+               amenities: int = 0) -> List[Tuple[object, float]]:
+        """Return (station_id, distance_km) pairs within radius, nearest first.
+
+        ``amenities`` is an amenity bitmask; only stations with all of those bits are returned.
+        """
+        if radius_km <= 0:
+            return []
+
+        lat_span = radius_km / KM_PER_DEGREE_LAT
+        lng_span = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        min_row, min_col = self._cell_for(lat - lat_span, lng - lng_span)
+        max_row, max_col = self._cell_for(lat + lat_span, lng + lng_span)
+
+        ids, lats, lngs = [], [], []
+        with self._lock:
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    for station_id in self._cells.get((row, col), ()):
+                        station_lat, station_lng, _, flags = self._stations[station_id]
+                        if flags & amenities != amenities:
+                            continue
+                        ids.append(station_id)
+                        lats.append(station_lat)
+                        lngs.append(station_lng)
+
+        if not ids:
+            return []
+
+        mask, distances = within_radius(lat, lng, lats, lngs, radius_km)
+        order = np.argsort(distances[mask], kind='stable')
+        hits = np.flatnonzero(mask)[order]
+        return [(ids[i], float(distances[i])) for i in hits]
+
+    def _insert(self, station_id, lat, lng, flags: int = 0):
+        if lat is None or lng is None:
+            return
+        lat, lng = float(lat), float(lng)
+        cell = self._cell_for(lat, lng)
+        self._stations[station_id] = (lat, lng, cell, flags or 0)
+        self._cells[cell].add(station_id)
+
+    def _shared_state(self) -> Tuple[Optional[int], Optional[int]]:
+        state = cache.get_many([INDEX_VERSION_KEY, INDEX_GENERATION_KEY])
+        return state.get(INDEX_VERSION_KEY), state.get(INDEX_GENERATION_KEY)
+
+
+def _bump(key: str):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_station_index() -> StationGridIndex:
+    """Return this worker's station index, loading or refreshing it as needed"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = StationGridIndex()
+    _index.refresh()
+    return _index
+
+
+def station_saved(station):
+    """Apply a saved station to the local index and flag the change to other workers"""
+    if _index is not None and _index.is_loaded:
+        if station.is_active:
+            _index.upsert(station.id, station.latitude, station.longitude, station.amenity_flags)
+        else:
+            _index.remove(station.id)
+    _bump(INDEX_VERSION_KEY)
+
+
+def stations_rewritten():
+    """Force every worker, this one included, to rebuild after stations were rewritten in bulk SQL"""
+    _bump(INDEX_GENERATION_KEY)
+
+
+def station_deleted(station_id):
+    """Drop a deleted station locally and force other workers to rebuild"""
+    if _index is not None and _index.is_loaded:
+        _index.remove(station_id)
+    _bump(INDEX_GENERATION_KEY)
@@ -0,0 +1,124 @@
+from typing import Iterable, List
+import logging
+
+from django.db import connection, transaction
+
+from ..models import StationCurrentTraffic, StationTraffic
+
+logger = logging.getLogger(__name__)
+
+CURRENT_TRAFFIC_FIELDS = [
+    'traffic', 'current_visitors', 'queue_length', 'estimated_wait_time',
+    'busy_level', 'timestamp', 'updated_at',
+]
+
+# Queue lengths at or below these are 'low' and 'medium'; anything longer is 'high'
+LOW_QUEUE_LENGTH = 3
+MEDIUM_QUEUE_LENGTH = 7
+
+
+def busy_level(queue_length: int) -> str:
+    if queue_length <= LOW_QUEUE_LENGTH:
+        return 'low'
+    if queue_length <= MEDIUM_QUEUE_LENGTH:
+        return 'medium'
+    return 'high'
+
+
+def create_traffic_records(records: List[StationTraffic]) -> List[StationTraffic]:
+    """Insert StationTraffic rows in bulk and keep the current-traffic table in step"""
+    if not records:
+        return []
+
+    with transaction.atomic():
+        created = StationTraffic.objects.bulk_create(records)
+        traffic_written(created)
+
+    return created
+
+
+def traffic_written(records: List[StationTraffic]):
+    """Follow-up for newly written StationTraffic rows: the snapshot now, live updates once committed"""
+    update_current_traffic(records)
+    transaction.on_commit(lambda: _publish_traffic(records))
+
+
+def _publish_traffic(records: List[StationTraffic]):
+    from .live_updates import publish_traffic
+
+    try:
+        publish_traffic(records)
+    except Exception as e:
+        logger.error(f"Error publishing live traffic updates: {e}")
+
+
+def update_current_traffic(records: Iterable[StationTraffic]) -> int:
+    """Upsert StationCurrentTraffic rows for newly written readings, keeping the newest per station"""
+    newest = {}
+    for record in records:
+        if record.station_id not in newest or record.timestamp >= newest[record.station_id].timestamp:
+            newest[record.station_id] = record
+
+    if not newest:
+        return 0
+
+    with transaction.atomic():
+        # Lock the rows we may replace so concurrent writers apply in order
+        existing = dict(
+            StationCurrentTraffic.objects.select_for_update().filter(
+                station_id__in=list(newest)
+            ).values_list('station_id', 'timestamp')
+        )
+
+        rows = [
+            StationCurrentTraffic(
+                station_id=station_id,
+                traffic=record,
+                current_visitors=record.current_visitors,
+                queue_length=record.queue_length,
+                estimated_wait_time=record.estimated_wait_time,
+                busy_level=busy_level(record.queue_length),
+                timestamp=record.timestamp,
+            )
+            for station_id, record in newest.items()
+            if station_id not in existing or record.timestamp >= existing[station_id]
+        ]
+
+        if rows:
+            StationCurrentTraffic.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['station'],
+                update_fields=CURRENT_TRAFFIC_FIELDS,
+            )
+
+    return len(rows)
+
+
+def rebuild_current_traffic() -> int:
+    """Recompute the whole current-traffic table from StationTraffic history"""
+    current_table = StationCurrentTraffic._meta.db_table
+    traffic_table = StationTraffic._meta.db_table
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {current_table}")
+        cursor.execute(f"""
+            INSERT INTO {current_table} (
+                station_id, traffic_id, current_visitors, queue_length, estimated_wait_time,
+                busy_level, timestamp, updated_at
+            )
+            SELECT DISTINCT ON (station_id)
+                station_id, id, current_visitors, queue_length, estimated_wait_time,
+                CASE
+                    WHEN queue_length <= %s THEN 'low'
+                    WHEN queue_length <= %s THEN 'medium'
+                    ELSE 'high'
+                END,
+                timestamp, NOW()
+            FROM {traffic_table}
+            ORDER BY station_id, timestamp DESC, id DESC
+        """, [LOW_QUEUE_LENGTH, MEDIUM_QUEUE_LENGTH])
+        rebuilt = cursor.rowcount
+
+    logger.info(f"Rebuilt {rebuilt} current traffic rows")
+    return rebuilt
@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    OfficialPriceBaseline, PetrolStation, PriceAlert, RegionBoundary, StationAmenity, StationTraffic
+)
+from .services import (
+    amenities, change_log, live_updates, official_prices, price_alerts, regions, station_index, traffic
+)
+
+
+@receiver(pre_save, sender=PetrolStation)
+def update_amenity_flags(sender, instance, update_fields=None, **kwargs):
+    """Recompute the amenity bitmask when a save changes the has_* flags; amenity rows use amenities_changed"""
+    saved = set(amenities.BOOLEAN_AMENITIES)
+    if update_fields is not None:
+        saved &= set(update_fields)
+    # Unknown loaded values (None) count as changed
+    if instance._state.adding or any(instance.loaded_value(field) != getattr(instance, field) for field in saved):
+        flags = amenities.station_amenity_flags(instance)
+        # update_fields can't be widened from here, so a mask the save leaves out is written after it
+        instance._unsaved_amenity_flags = (
+            update_fields is not None and 'amenity_flags' not in update_fields and flags != instance.amenity_flags
+        )
+        instance.amenity_flags = flags
+
+
+@receiver(post_save, sender=PetrolStation)
+def update_station_index(sender, instance, update_fields=None, **kwargs):
+    """Keep the in-process spatial index in step with station edits"""
+    if instance.__dict__.pop('_unsaved_amenity_flags', False):
+        PetrolStation.objects.filter(pk=instance.pk).update(amenity_flags=instance.amenity_flags)
+        update_fields = {*update_fields, 'amenity_flags'}
+    station_index.station_saved(instance)
+    transaction.on_commit(lambda: live_updates.publish_station(instance))
+    change_log.record_station_changes([instance])
+    instance.mark_saved(update_fields)
+
+
+@receiver(post_delete, sender=PetrolStation)
+def remove_from_station_index(sender, instance, **kwargs):
+    station_index.station_deleted(instance.id)
+    change_log.record_station_deleted(instance)
+
+
+@receiver(post_save, sender=StationAmenity)
+@receiver(post_delete, sender=StationAmenity)
+def sync_amenity_flags(sender, instance, origin=None, **kwargs):
+    """Carry amenity edits into the station's bitmask"""
+    # Nothing to sync when the amenities go because their station is being deleted
+    if isinstance(origin, PetrolStation) or getattr(origin, 'model', None) is PetrolStation:
+        return
+    amenities.amenities_changed(instance.station_id)
+
+
+@receiver(post_save, sender=OfficialPriceBaseline)
+@receiver(post_delete, sender=OfficialPriceBaseline)
+def reload_official_prices(sender, instance, **kwargs):
+    """Tell every worker to reload its in-memory official price table"""
+    official_prices.official_prices_changed()
+
+
+@receiver(post_save, sender=RegionBoundary)
+@receiver(post_delete, sender=RegionBoundary)
+def rebuild_region_resolver(sender, instance, **kwargs):
+    """Tell every worker to rebuild its region grid index"""
+    regions.boundaries_changed()
+
+
+@receiver(post_save, sender=PriceAlert)
+@receiver(post_delete, sender=PriceAlert)
+def reload_price_alert_index(sender, instance, **kwargs):
+    """Tell every worker its price alert index is out of date"""
+    price_alerts.price_alerts_changed()
+
+
+@receiver(post_save, sender=StationTraffic)
+def update_current_traffic(sender, instance, created, **kwargs):
+    """Single readings saved outside services.traffic still refresh the snapshot and reach live subscribers"""
+    if created:
+        traffic.traffic_written([instance])
@@ -1,65 +1,105 @@
 # tasks.py - Celery background tasks
 from celery import shared_task
+from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 @shared_task
-def sync_fuel_prices():
+def sync_fuel_prices(batch_size=None, max_stations=None):
     """Background task to sync fuel prices from external sources"""
     from .services.fuel_price_service import FuelPriceService
-    from .models import PetrolStation, FuelType, FuelPrice
+    from .models import PetrolStation, FuelType
+    
+    batch_size = batch_size or getattr(settings, 'FUEL_PRICE_SYNC_BATCH_SIZE', 200)
+    max_stations = max_stations or getattr(settings, 'FUEL_PRICE_SYNC_MAX_STATIONS', None)
     
     price_service = FuelPriceService()
+    fuel_types = {fuel_type.name: fuel_type for fuel_type in FuelType.objects.all()}
     updated_count = 0
     
     # Get stations that need price updates (prioritize high-traffic stations)
-    stations_to_update = PetrolStation.objects.filter(
-        is_active=True,
-        last_price_update__lt=timezone.now() - timedelta(hours=2)
-    ).order_by('-google_user_ratings_total', 'last_price_update')[:100]
+    stale_before = timezone.now() - timedelta(hours=2)
+    station_ids = list(PetrolStation.objects.filter(
+        Q(last_price_update__lt=stale_before) | Q(last_price_update__isnull=True),
+        is_active=True
+    ).order_by('-google_user_ratings_total', 'last_price_update').values_list('id', flat=True))
     
-    for station in stations_to_update:
+    if max_stations:
+        station_ids = station_ids[:max_stations]
+    
+    for offset in range(0, len(station_ids), batch_size):
+        updated_count += _sync_price_batch(station_ids[offset:offset + batch_size], price_service, fuel_types)
+    
+    logger.info(f"Updated prices for {updated_count} stations")
+    return updated_count
+
+
+def _sync_price_batch(station_ids, price_service, fuel_types) -> int:
+    """Fetch and store prices for one batch of stations with a fixed number of queries"""
+    from .services.price_ingestion import create_fuel_prices
+    from .models import PetrolStation, FuelPrice, StationCurrentPrice
+    
+    stations = PetrolStation.objects.in_bulk(station_ids)
+    
+    # Previous prices for change tracking, for the whole batch at once
+    previous_prices = {
+        (station_id, fuel_type_id): price
+        for station_id, fuel_type_id, price in StationCurrentPrice.objects.filter(
+            station_id__in=station_ids
+        ).values_list('station_id', 'fuel_type_id', 'price')
+    }
+    
+    new_prices = []
+    updated_stations = []
+    for station_id in station_ids:
+        station = stations.get(station_id)
+        if station is None:
+            continue
+        
         try:
             prices = price_service.get_station_prices(station)
-            if prices:
-                for price_data in prices:
-                    # Create or update price records
-                    fuel_type = FuelType.objects.get(name=price_data['fuel_type'])
-                    
-                    # Get previous price for change tracking
-                    previous_price_obj = FuelPrice.objects.filter(
-                        station=station,
-                        fuel_type=fuel_type
-                    ).order_by('-reported_at').first()
-                    
-                    previous_price = previous_price_obj.price if previous_price_obj else None
-                    price_change = None
-                    if previous_price:
-                        price_change = price_data['price'] - float(previous_price)
-                    
-                    FuelPrice.objects.create(
-                        station=station,
-                        fuel_type=fuel_type,
-                        price=price_data['price'],
-                        source=price_data.get('source', 'api_scrape'),
-                        confidence_score=price_data.get('reliability_score', 0.5),
-                        previous_price=previous_price,
-                        price_change=price_change
-                    )
-                
-                station.last_price_update = timezone.now()
-                station.save()
-                updated_count += 1
-                
         except Exception as e:
             logger.error(f"Error updating prices for station {station.id}: {e}")
             continue
+        
+        if not prices:
+            continue
+        
+        for price_data in prices:
+            fuel_type = fuel_types.get(price_data['fuel_type'])
+            if fuel_type is None:
+                logger.warning(f"Unknown fuel type {price_data['fuel_type']} for station {station.id}")
+                continue
+            
+            previous_price = previous_prices.get((station.id, fuel_type.id))
+            price_change = None
+            if previous_price:
+                price_change = price_data['price'] - float(previous_price)
+            
+            new_prices.append(FuelPrice(
+                station=station,
+                fuel_type=fuel_type,
+                price=price_data['price'],
+                source=price_data.get('source', 'api_scrape'),
+                confidence_score=price_data.get('reliability_score', 0.5),
+                previous_price=previous_price,
+                price_change=price_change
+            ))
+        
+        station.last_price_update = timezone.now()
+        updated_stations.append(station)
     
-    logger.info(f"Updated prices for {updated_count} stations")
-    return updated_count
+    if new_prices:
+        create_fuel_prices(new_prices)
+    if updated_stations:
+        PetrolStation.objects.bulk_update(updated_stations, ['last_price_update'])
+    
+    return len(updated_stations)
 
 
 @shared_task
@@ -97,7 +137,10 @@ def sync_google_places_data():
                 
                 station.last_google_sync = timezone.now()
                 station.data_quality_score = min(1.0, station.data_quality_score + 0.1)
-                station.save()
+                station.save(update_fields=[
+                    'google_rating', 'google_user_ratings_total', 'website', 'phone_number',
+                    'opening_hours', 'is_24h', 'last_google_sync', 'data_quality_score', 'updated_at',
+                ])
                 updated_count += 1
                 
         except Exception as e:
@@ -109,40 +152,135 @@ def sync_google_places_data():
 
 
 @shared_task
-def cleanup_old_price_data():
+def cleanup_old_price_data(chunk_size=None):
     """Clean up old price data to maintain database performance"""
-    from .models import FuelPrice, PetrolStation, FuelType
+    from django.db import connection, transaction
+    from .models import FuelPrice, PetrolStation, StationCurrentPrice
     
-    # Keep only last 30 days of price data per station/fuel type combination
-    cutoff_date = timezone.now() - timedelta(days=30)
+    started = time.monotonic()
+    retention_days = getattr(settings, 'PRICE_RETENTION_DAYS', 30)
+    keep_per_fuel_type = getattr(settings, 'PRICE_RETENTION_KEEP', 10)
+    chunk_size = chunk_size or getattr(settings, 'PRICE_RETENTION_CHUNK_SIZE', 5000)
     
-    # For each station/fuel_type combination, keep only the most recent prices
-    deleted_count = 0
+    # Keep only last 30 days of price data per station/fuel type combination,
+    # plus the 10 most recent older records as history
+    cutoff_date = timezone.now() - timedelta(days=retention_days)
     
-    for station in PetrolStation.objects.filter(is_active=True):
-        for fuel_type in FuelType.objects.all():
-            old_prices = FuelPrice.objects.filter(
-                station=station,
-                fuel_type=fuel_type,
-                reported_at__lt=cutoff_date
-            ).order_by('-reported_at')[10:]  # Keep 10 historical records
-            
-            if old_prices:
-                old_price_ids = [price.id for price in old_prices]
-                deleted_count += FuelPrice.objects.filter(id__in=old_price_ids).delete()[0]
+    price_table = FuelPrice._meta.db_table
+    station_table = PetrolStation._meta.db_table
+    current_table = StationCurrentPrice._meta.db_table
+    
+    # Each statement ranks the old rows within their station/fuel type partition and
+    # deletes at most chunk_size of the expired ones, so no id list is ever held in
+    # Python. Deleting ranks past the limit leaves the kept ranks unchanged between
+    # passes; rows a current price points at are never touched.
+    delete_chunk = f"""
+        WITH ranked AS (
+            SELECT p.id, ROW_NUMBER() OVER (
+                PARTITION BY p.station_id, p.fuel_type_id ORDER BY p.reported_at DESC
+            ) AS recency
+            FROM {price_table} AS p
+            JOIN {station_table} AS s ON s.id = p.station_id
+            WHERE s.is_active AND p.reported_at < %s
+        )
+        DELETE FROM {price_table} WHERE id IN (
+            SELECT ranked.id FROM ranked
+            WHERE ranked.recency > %s
+              AND NOT EXISTS (SELECT 1 FROM {current_table} AS c WHERE c.fuel_price_id = ranked.id)
+            LIMIT %s
+        )
+    """
+    
+    # Each chunk runs in its own short transaction, so locks are released
+    # between batches and the price sync is never blocked for long
+    deleted_count = 0
+    chunks = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(delete_chunk, [cutoff_date, keep_per_fuel_type, chunk_size])
+            deleted = cursor.rowcount
+        chunks += 1
+        deleted_count += deleted
+        if deleted < chunk_size:
+            break
     
-    logger.info(f"Cleaned up {deleted_count} old price records")
-    return deleted_count
+    elapsed = round(time.monotonic() - started, 2)
+    logger.info(f"Cleaned up {deleted_count} old price records in {chunks} chunks ({elapsed}s)")
+    return {'deleted': deleted_count, 'chunks': chunks, 'seconds': elapsed}
+
+
+@shared_task
+def refresh_price_baselines():
+    """Scrape fuel price baselines into PriceBaselineSnapshot, off the request path"""
+    from .views import FuelPriceEnhancer
+    from .services.price_baselines import release_refresh_lock
+
+    try:
+        prices = FuelPriceEnhancer().refresh_baseline()
+    finally:
+        release_refresh_lock()
+
+    if not prices:
+        logger.warning("Price baseline refresh found no valid prices; keeping the previous baseline")
+        return {'refreshed': False}
+
+    logger.info(f"Refreshed price baseline: {prices}")
+    return {'refreshed': True}
 
 
 @shared_task
-def calculate_data_quality_scores():
+def broadcast_notification(title, message, notification_type='SYSTEM'):
+    """Send a notification to every active user"""
+    from .services.notifications import broadcast
+    return broadcast(title, message, notification_type)
+
+
+@shared_task
+def ingest_traffic(readings):
+    """Store a batch of traffic readings (dicts of station_id, counts and an ISO timestamp) and refresh the snapshot"""
+    import uuid
+    from django.utils.dateparse import parse_datetime
+    from .models import StationTraffic
+    from .services.traffic import create_traffic_records
+
+    records = [
+        StationTraffic(
+            # Task arguments arrive as JSON; the snapshot keys on real UUIDs
+            station_id=uuid.UUID(str(reading['station_id'])),
+            current_visitors=reading.get('current_visitors', 0),
+            queue_length=reading.get('queue_length', 0),
+            estimated_wait_time=reading.get('estimated_wait_time', 0),
+            timestamp=parse_datetime(reading['timestamp']) if reading.get('timestamp') else timezone.now(),
+        )
+        for reading in readings
+    ]
+    return len(create_traffic_records(records))
+
+
+@shared_task
+def prune_change_log():
+    """Drop delta-sync change log entries past their retention; older cursors get a full resync"""
+    from .services.change_log import prune_change_log as prune
+    return prune()
+
+
+@shared_task
+def calculate_data_quality_scores(batch_size=1000):
     """Calculate and update data quality scores for all stations"""
-    from .models import PetrolStation, FuelPrice
+    from django.db.models import Count
+    from .models import PetrolStation
     
-    updated_count = 0
+    week_ago = timezone.now() - timedelta(days=7)
+    stations = PetrolStation.objects.filter(is_active=True).only(
+        'id', 'name', 'address', 'google_place_id', 'google_rating', 'last_google_sync',
+        'is_verified', 'data_quality_score',
+    ).annotate(
+        recent_prices=Count('fuel_prices', filter=Q(fuel_prices__reported_at__gte=week_ago))
+    ).order_by()
     
-    for station in PetrolStation.objects.filter(is_active=True):
+    changed = []
+    updated_count = 0
+    for station in stations.iterator(chunk_size=batch_size):
         score = 0.0
         
         # Base score for having basic information
@@ -156,27 +294,29 @@ def calculate_data_quality_scores():
                 score += 0.1
         
         # Recent price data
-        recent_prices = FuelPrice.objects.filter(
-            station=station,
-            reported_at__gte=timezone.now() - timedelta(days=7)
-        ).count()
-        
-        if recent_prices > 0:
+        if station.recent_prices > 0:
             score += 0.2
-            if recent_prices >= 3:  # Multiple fuel types
+            if station.recent_prices >= 3:  # Multiple fuel types
                 score += 0.1
         
         # Data freshness
-        if station.last_google_sync and station.last_google_sync >= timezone.now() - timedelta(days=7):
+        if station.last_google_sync and station.last_google_sync >= week_ago:
             score += 0.1
         
         # User verification
         if station.is_verified:
             score += 0.1
         
-        station.data_quality_score = min(1.0, score)
-        station.save()
-        updated_count += 1
+        score = min(1.0, score)
+        if score != station.data_quality_score:
+            station.data_quality_score = score
+            changed.append(station)
+        if len(changed) >= batch_size:
+            # bulk_update skips the station signals: the score is neither indexed, logged nor streamed
+            updated_count += PetrolStation.objects.bulk_update(changed, ['data_quality_score'])
+            changed = []
+    if changed:
+        updated_count += PetrolStation.objects.bulk_update(changed, ['data_quality_score'])
     
     logger.info(f"Updated data quality scores for {updated_count} stations")
     return updated_count
@@ -187,14 +327,14 @@ from django_ratelimit.decorators import ratelimit
 from django.utils.decorators import method_decorator
 
 # Enhanced ViewSet with rate limiting
-from .views import EnhancedPetrolStationViewSet  # Make sure this import path is correct
+from .views import PetrolStationViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
 
 @method_decorator(ratelimit(key='ip', rate='100/h', method='GET'), name='nearby_with_real_data')
 @method_decorator(ratelimit(key='user', rate='50/h', method='GET'), name='nearby_with_real_data')
-class RateLimitedPetrolStationViewSet(EnhancedPetrolStationViewSet):
+class RateLimitedPetrolStationViewSet(PetrolStationViewSet):
     """ViewSet with rate limiting for production use"""
     
     @action(detail=False, methods=['get'])
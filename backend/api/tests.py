@@ -1,3 +1,895 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+import json
+import threading
+from unittest import mock
+from uuid import UUID
 
-# Create your tests here.
+import numpy as np
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models.signals import pre_save
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from api.management.commands.benchmark_scrapers import FIXTURE_DIR
+from api.models import (
+    ChangeLogEntry, FuelPrice, FuelType, Notification, OfficialPriceBaseline, PetrolStation, PriceAlert,
+    RegionBoundary, Review, StationCurrentPrice, StationCurrentTraffic, StationTraffic, User,
+)
+from api.renderers import ColumnarJSONRenderer, FastJSONRenderer
+from api.serializers import PetrolStationListSerializer
+from api.services import station_index
+from api.services.amenities import amenity_mask, rebuild_amenity_flags
+from api.services.change_log import changes_since, prune_change_log, record_reset
+from api.services.geo import distance_km, geohash_cell
+from api.services.google_places_service import GooglePlacesService
+from api.services.notifications import (
+    broadcast, mark_all_notifications_read, mark_notification_read, rebuild_unread_counts, send_notifications,
+)
+from api.services.official_prices import FALLBACK_PRICES, OfficialPriceTable
+from api.services.price_estimation import JITTER_RAND, PriceEstimator
+from api.services.price_ingestion import create_fuel_prices, recompute_current_prices
+from api.services.ratings import AGGREGATES, rebuild_station_ratings, review_changed, review_snapshot
+from api.services.regions import (
+    DEFAULT_PRICE_ZONE, BoundaryPolygon, Region, RegionResolver, assign_station_region, boundaries_changed,
+)
+from api.services.scrapers import SCRAPERS, PriceScraper, ScrapeCancelled
+from api.services.station_index import StationGridIndex
+from api.services.traffic import create_traffic_records
+from api.tasks import calculate_data_quality_scores, cleanup_old_price_data
+from api.views import NEARBY_CACHE_PRECISION
+
+# south, west, north, east
+JOHANNESBURG = (-26.4, 27.8, -26.0, 28.3)
+CAPE_TOWN = (-34.1, 18.3, -33.8, 18.7)
+
+
+def create_station(name='Sandton', latitude='-26.107600', longitude='28.056700', **fields):
+    return PetrolStation.objects.create(
+        name=name, address='1 Main Road', city='Test', state='Test', postal_code='0000',
+        country='South Africa', latitude=Decimal(latitude), longitude=Decimal(longitude), **fields
+    )
+
+
+@override_settings(CHANGE_LOG_SETTLE_SECONDS=0)
+class ChangeLogTests(TestCase):
+    def create_station(self, name, latitude, longitude):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_station(name, latitude, longitude)
+
+    def latest_cursor(self):
+        return ChangeLogEntry.objects.order_by('-id').values_list('id', flat=True).first()
+
+    def test_missing_cursor_requires_reset(self):
+        self.create_station('Sandton', '-26.107600', '28.056700')
+
+        result = changes_since(None)
+
+        self.assertTrue(result['reset'])
+        self.assertEqual(result['cursor'], self.latest_cursor())
+
+    def test_pruned_cursor_requires_reset(self):
+        self.create_station('Sandton', '-26.107600', '28.056700')
+        cursor = self.latest_cursor()
+        self.create_station('Rosebank', '-26.145900', '28.043600')
+        pruned_through = self.latest_cursor()
+        ChangeLogEntry.objects.update(created_at=timezone.now() - timedelta(days=40))
+        self.create_station('Randburg', '-26.094100', '28.006400')
+
+        self.assertEqual(prune_change_log(days=30), 2)
+
+        self.assertTrue(changes_since(cursor)['reset'])
+        # A client that had seen everything that was pruned can still page on
+        result = changes_since(pruned_through)
+        self.assertFalse(result['reset'])
+        self.assertEqual([row['name'] for row in result['stations']], ['Randburg'])
+
+    def test_id_gap_is_not_mistaken_for_pruning(self):
+        self.create_station('Sandton', '-26.107600', '28.056700')
+        cursor = self.latest_cursor()
+        self.create_station('Rosebank', '-26.145900', '28.043600')
+        self.create_station('Randburg', '-26.094100', '28.006400')
+        # As if the transactions that took these ids had rolled back
+        ChangeLogEntry.objects.filter(id__lte=cursor + 1).delete()
+
+        self.assertFalse(changes_since(cursor - 1)['reset'])
+
+    def test_reset_entry_requires_reset(self):
+        self.create_station('Sandton', '-26.107600', '28.056700')
+        cursor = self.latest_cursor()
+        with self.captureOnCommitCallbacks(execute=True):
+            record_reset()
+
+        result = changes_since(cursor)
+
+        self.assertTrue(result['reset'])
+        self.assertEqual(result['cursor'], self.latest_cursor())
+        self.assertFalse(changes_since(result['cursor'])['reset'])
+
+    def test_bbox_only_returns_stations_inside(self):
+        cursor = self.latest_cursor() or 0
+        sandton = self.create_station('Sandton', '-26.107600', '28.056700')
+        self.create_station('Sea Point', '-33.915400', '18.388700')
+
+        result = changes_since(cursor, bbox=JOHANNESBURG)
+
+        self.assertFalse(result['reset'])
+        self.assertEqual([row['id'] for row in result['stations']], [sandton.id])
+        self.assertEqual(result['cursor'], self.latest_cursor())
+
+    def test_station_moved_out_of_bbox_is_deleted_there(self):
+        station = self.create_station('Sandton', '-26.107600', '28.056700')
+        cursor = self.latest_cursor()
+
+        station = PetrolStation.objects.get(id=station.id)
+        station.latitude, station.longitude = Decimal('-33.915400'), Decimal('18.388700')
+        with self.captureOnCommitCallbacks(execute=True):
+            station.save()
+
+        old_area = changes_since(cursor, bbox=JOHANNESBURG)
+        self.assertEqual(old_area['deleted_stations'], [station.id])
+        self.assertEqual(old_area['stations'], [])
+
+        new_area = changes_since(cursor, bbox=CAPE_TOWN)
+        self.assertEqual([row['id'] for row in new_area['stations']], [station.id])
+
+        everywhere = changes_since(cursor)
+        self.assertEqual([row['id'] for row in everywhere['stations']], [station.id])
+        self.assertEqual(everywhere['deleted_stations'], [])
+
+    def test_unmoved_station_save_logs_no_delete(self):
+        station = self.create_station('Sandton', '-26.107600', '28.056700')
+        cursor = self.latest_cursor()
+
+        station = PetrolStation.objects.get(id=station.id)
+        station.name = 'Sandton City'
+        with self.captureOnCommitCallbacks(execute=True):
+            station.save()
+
+        self.assertFalse(ChangeLogEntry.objects.filter(id__gt=cursor, action='delete').exists())
+
+    def test_traffic_readings_leave_the_station_and_log_alone(self):
+        station = self.create_station('Sandton', '-26.107600', '28.056700')
+        cursor = self.latest_cursor()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_traffic_records([StationTraffic(
+                station=station, current_visitors=12, queue_length=9,
+                estimated_wait_time=15, timestamp=timezone.now(),
+            )])
+
+        self.assertEqual(StationCurrentTraffic.objects.get(station=station).busy_level, 'high')
+        self.assertEqual(self.latest_cursor(), cursor)
+
+
+class AmenityFlagTests(TestCase):
+    def setUp(self):
+        station_index._index = None
+        self.station = create_station()
+
+    def nearby_with(self, code):
+        index = station_index.get_station_index()
+        return [station_id for station_id, _ in index.nearby(-26.1076, 28.0567, 1, amenity_mask([code]))]
+
+    def test_rebuild_reaches_loaded_indexes(self):
+        self.assertEqual(self.nearby_with('ATM'), [])
+        updated_at = timezone.now() - timedelta(days=1)
+        PetrolStation.objects.filter(id=self.station.id).update(has_atm=True, updated_at=updated_at)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(rebuild_amenity_flags(), 1)
+
+        self.assertEqual(self.nearby_with('ATM'), [self.station.id])
+        self.assertGreater(PetrolStation.objects.get(id=self.station.id).updated_at, updated_at)
+
+    def test_partial_save_of_a_flag_writes_the_mask(self):
+        station = PetrolStation.objects.get(id=self.station.id)
+        station.has_coffee = True
+        station.save(update_fields=['has_coffee'])
+
+        stored = PetrolStation.objects.get(id=self.station.id).amenity_flags
+        self.assertEqual(stored, amenity_mask(['COFFEE']))
+        self.assertEqual(self.nearby_with('COFFEE'), [self.station.id])
+
+    def test_unchanged_flags_skip_the_amenity_query(self):
+        station = PetrolStation.objects.get(id=self.station.id)
+        station.name = 'Sandton City'
+        with self.assertNumQueries(0):
+            pre_save.send(PetrolStation, instance=station, raw=False, using='default', update_fields=None)
+
+
+class StationWriteTests(TestCase):
+    def setUp(self):
+        self.station = create_station()
+
+    def test_station_update_keeps_review_aggregates(self):
+        stale = PetrolStation.objects.get(id=self.station.id)
+        review_changed(new={'station_id': self.station.id, 'rating': 4})
+        serializer = PetrolStationListSerializer(stale, data={'name': 'Sandton City'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+
+        serializer.save()
+
+        station = PetrolStation.objects.get(id=self.station.id)
+        self.assertEqual((station.name, station.reviews_count, station.avg_rating), ('Sandton City', 1, 4.0))
+
+    def test_quality_scores_skip_station_signals(self):
+        with mock.patch('api.signals.change_log.record_station_changes') as record:
+            self.assertEqual(calculate_data_quality_scores(), 1)
+
+        record.assert_not_called()
+        self.assertAlmostEqual(PetrolStation.objects.get(id=self.station.id).data_quality_score, 0.2)
+        self.assertEqual(calculate_data_quality_scores(), 0)
+
+
+class OfficialPriceTests(TestCase):
+    def setUp(self):
+        OfficialPriceBaseline.objects.all().delete()
+        self.table = OfficialPriceTable()
+
+    def add(self, effective_date, grade, price, zone='inland'):
+        OfficialPriceBaseline.objects.create(effective_date=effective_date, zone=zone, grade=grade, price=price)
+
+    def test_price_in_force_on_a_date(self):
+        self.add(date(2025, 1, 1), 'ulp_93', '21.50')
+        self.add(date(2025, 2, 5), 'ulp_93', '22.00')
+        self.table.load()
+
+        self.assertIsNone(self.table.price_on('ulp_93', date(2024, 12, 31)))
+        self.assertEqual(self.table.price_on('ulp_93', date(2025, 2, 4)), 21.50)
+        self.assertEqual(self.table.price_on('regular', date(2025, 2, 5)), 22.00)
+
+    def test_zone_without_a_figure_uses_inland(self):
+        self.add(date(2025, 1, 1), 'ulp_95', '22.40')
+        self.add(date(2025, 1, 1), 'ulp_95', '21.60', zone='coastal')
+        self.add(date(2025, 1, 1), 'diesel_50ppm', '20.10')
+        self.table.load()
+
+        prices = self.table.prices_on(date(2025, 1, 10), zone='coastal')
+
+        self.assertEqual((prices['premium'], prices['diesel']), (21.60, 20.10))
+        self.assertEqual((prices['zone'], prices['effective_date']), ('coastal', date(2025, 1, 1)))
+
+    def test_missing_grades_take_the_fallback_prices(self):
+        self.add(date(2025, 1, 1), 'ulp_93', '21.50')
+        self.table.load()
+
+        prices = self.table.prices_on(date(2025, 1, 10))
+
+        self.assertEqual(prices['regular'], 21.50)
+        self.assertEqual(prices['premium'], FALLBACK_PRICES['premium'])
+        self.assertEqual(prices['diesel'], FALLBACK_PRICES['diesel'])
+
+    def test_default_date_is_the_local_date(self):
+        self.add(date(2025, 1, 1), 'ulp_93', '21.50')
+        self.table.load()
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.add(tomorrow, 'ulp_93', '25.00')
+        self.table.load()
+
+        with mock.patch('api.services.official_prices.timezone.localdate', return_value=tomorrow):
+            self.assertEqual(self.table.prices_on()['regular'], 25.00)
+        self.assertEqual(self.table.prices_on()['regular'], 21.50)
+
+
+class ScraperFixtureTests(SimpleTestCase):
+    EXPECTED = {
+        'fuelprices.co.za': {'regular': 23.96, 'premium': 24.3, 'diesel': 21.2},
+        'aa.co.za': {'regular': 23.96, 'diesel': 21.2},
+        'automobil.co.za': {'regular': 23.96, 'premium': 24.3, 'diesel': 21.2},
+    }
+
+    def fixture(self, scraper):
+        return (FIXTURE_DIR / f"{scraper.name.replace('.', '_')}.html").read_text(encoding='utf-8')
+
+    def test_every_scraper_extracts_its_fixture(self):
+        for scraper in SCRAPERS:
+            with self.subTest(scraper.name):
+                self.assertEqual(scraper.extract([self.fixture(scraper)]), self.EXPECTED[scraper.name])
+
+    def test_chunk_boundaries_do_not_change_the_result(self):
+        for scraper in SCRAPERS:
+            html = self.fixture(scraper)
+            for size in (97, 8192):
+                with self.subTest(scraper.name, chunk_size=size):
+                    chunks = [html[i:i + size] for i in range(0, len(html), size)]
+                    self.assertEqual(scraper.extract(chunks), self.EXPECTED[scraper.name])
+
+    def test_cancelled_scrape_stops_reading(self):
+        cancelled = threading.Event()
+        cancelled.set()
+        with self.assertRaises(ScrapeCancelled):
+            SCRAPERS[0].extract([self.fixture(SCRAPERS[0])], cancelled)
+
+    def test_scrapers_must_build_a_parser(self):
+        with self.assertRaises(TypeError):
+            PriceScraper()
+
+
+class StationGridIndexTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        # Scattered around a cell corner (multiples of the cell size) so scans cross cell edges
+        self.points = {
+            f"station-{i}": (lat, lng)
+            for i, (lat, lng) in enumerate(zip(rng.uniform(-26.30, -26.10, 400), rng.uniform(27.90, 28.10, 400)))
+        }
+        self.index = StationGridIndex()
+        for station_id, (lat, lng) in self.points.items():
+            self.index.upsert(station_id, lat, lng, amenity_mask(['ATM']) if station_id.endswith('3') else 0)
+
+    def brute_force(self, lat, lng, radius_km):
+        hits = []
+        for station_id, (station_lat, station_lng) in self.points.items():
+            distance = distance_km(lat, lng, station_lat, station_lng)
+            if distance <= radius_km:
+                hits.append((distance, station_id))
+        return [station_id for _, station_id in sorted(hits)]
+
+    def test_radius_scan_matches_brute_force(self):
+        for lat, lng, radius in [(-26.20, 28.00, 5), (-26.2001, 27.9999, 0.8), (-26.25, 27.95, 12), (-26.1, 28.1, 3)]:
+            with self.subTest(lat=lat, lng=lng, radius=radius):
+                found = self.index.nearby(lat, lng, radius)
+                self.assertEqual([station_id for station_id, _ in found], self.brute_force(lat, lng, radius))
+                self.assertEqual([d for _, d in found], sorted(d for _, d in found))
+
+    def test_amenity_filter(self):
+        found = [station_id for station_id, _ in self.index.nearby(-26.20, 28.00, 8, amenity_mask(['ATM']))]
+        expected = [station_id for station_id in self.brute_force(-26.20, 28.00, 8) if station_id.endswith('3')]
+        self.assertEqual(found, expected)
+
+    def test_moved_and_removed_stations(self):
+        self.index.upsert('station-0', -33.9, 18.4)
+        self.index.remove('station-1')
+        del self.points['station-1']
+        self.points['station-0'] = (-33.9, 18.4)
+
+        self.assertEqual([s for s, _ in self.index.nearby(-26.20, 28.00, 20)], self.brute_force(-26.20, 28.00, 20))
+        self.assertEqual([s for s, _ in self.index.nearby(-33.9, 18.4, 1)], ['station-0'])
+
+
+class StationIndexInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        station_index._index = None
+        self.station = create_station()
+        # Stands in for another worker: it only hears about changes through the shared cache
+        self.other = StationGridIndex()
+        self.other.load()
+
+    def ids_near(self, index, lat=-26.1076, lng=28.0567):
+        return [station_id for station_id, _ in index.nearby(lat, lng, 2)]
+
+    def test_saved_station_reaches_other_workers(self):
+        added = create_station('Rosebank', '-26.110000', '28.050000')
+
+        self.other.refresh()
+
+        self.assertEqual(set(self.ids_near(self.other)), {self.station.id, added.id})
+
+    def test_deleted_station_forces_a_rebuild(self):
+        self.station.delete()
+
+        self.other.refresh()
+
+        self.assertEqual(self.ids_near(self.other), [])
+
+    @override_settings(STATION_INDEX_SYNC_SECONDS=0)
+    def test_timer_catches_changes_without_a_version_bump(self):
+        # A queryset update fires no signal, as with a worker that doesn't share the cache
+        PetrolStation.objects.filter(id=self.station.id).update(
+            latitude=Decimal('-33.915400'), longitude=Decimal('18.388700'), updated_at=timezone.now()
+        )
+
+        self.other.refresh()
+
+        self.assertEqual(self.ids_near(self.other), [])
+        self.assertEqual(self.ids_near(self.other, -33.9154, 18.3887), [self.station.id])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class NearbyCacheTests(TestCase):
+    url = '/api/api/v1/stations/nearby/'
+
+    def setUp(self):
+        cache.clear()
+        station_index._index = None
+        rng = np.random.default_rng(11)
+        for i, (lat, lng) in enumerate(zip(rng.uniform(-26.16, -26.06, 60), rng.uniform(28.00, 28.11, 60))):
+            create_station(f"Station {i}", f"{lat:.6f}", f"{lng:.6f}")
+
+        _, center_lat, center_lng, _ = geohash_cell(-26.1076, 28.0567, NEARBY_CACHE_PRECISION)
+        # Two points inside the same cell, away from its centre in opposite directions
+        self.first = (center_lat + 0.002, center_lng - 0.004)
+        self.second = (center_lat - 0.002, center_lng + 0.004)
+
+        patches = [
+            mock.patch.object(GooglePlacesService, 'find_nearby_stations', return_value=[]),
+            mock.patch('api.services.price_baselines.request_baseline_refresh'),
+        ]
+        self.google = patches[0].start()
+        patches[1].start()
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def nearby(self, point, radius, **params):
+        response = self.client.get(self.url, {'lat': point[0], 'lng': point[1], 'radius': radius, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(station['id'], station['distance']) for station in response.json()]
+
+    def test_points_share_a_cell(self):
+        cells = {geohash_cell(*point, NEARBY_CACHE_PRECISION)[0] for point in (self.first, self.second)}
+        self.assertEqual(len(cells), 1)
+
+    def test_hit_returns_what_a_miss_would(self):
+        self.nearby(self.first, 3)
+        hit = self.nearby(self.second, 3)
+        self.assertEqual(self.google.call_count, 1)
+
+        miss = self.nearby(self.second, 3, refresh='true')
+
+        self.assertEqual(self.google.call_count, 2)
+        self.assertTrue(hit)
+        self.assertEqual(hit, miss)
+
+    def test_radii_in_one_bucket_share_an_entry(self):
+        self.nearby(self.first, 3)
+        self.nearby(self.second, 4.5)
+        # A smaller bucket is served from the larger entry already cached
+        self.nearby(self.second, 1.5)
+
+        self.assertEqual(self.google.call_count, 1)
+        self.assertEqual(self.nearby(self.second, 1.5), self.nearby(self.second, 1.5, refresh='true'))
+
+    def test_results_stay_within_the_radius(self):
+        self.nearby(self.first, 5)
+        for station_id, distance in self.nearby(self.second, 2):
+            self.assertLessEqual(distance, 2)
+
+
+class CurrentPriceTests(TestCase):
+    def setUp(self):
+        self.station = create_station()
+        self.petrol = FuelType.objects.create(name='Regular')
+        self.diesel = FuelType.objects.create(name='Diesel')
+        self.now = timezone.now()
+
+    def price(self, price, hours_ago=0, fuel_type=None):
+        return FuelPrice(station=self.station, fuel_type=fuel_type or self.petrol, price=Decimal(price),
+                         reported_at=self.now - timedelta(hours=hours_ago))
+
+    def current(self, fuel_type=None):
+        return StationCurrentPrice.objects.get(station=self.station, fuel_type=fuel_type or self.petrol)
+
+    def test_newest_price_per_key_wins(self):
+        create_fuel_prices([self.price('21.00', 3), self.price('21.50', 1), self.price('20.10', 2, self.diesel)])
+
+        self.assertEqual(self.current().price, Decimal('21.50'))
+        self.assertEqual(self.current(self.diesel).price, Decimal('20.10'))
+        self.assertEqual(StationCurrentPrice.objects.count(), 2)
+
+    def test_older_price_never_replaces_a_newer_one(self):
+        create_fuel_prices([self.price('21.50', 1)])
+        create_fuel_prices([self.price('20.00', 5)])
+
+        self.assertEqual(self.current().price, Decimal('21.50'))
+
+        create_fuel_prices([self.price('22.00', 0)])
+        self.assertEqual(self.current().price, Decimal('22.00'))
+
+    def test_edits_and_deletes_are_recomputed(self):
+        older, newer = create_fuel_prices([self.price('21.00', 2), self.price('21.50', 1)])
+
+        newer.reported_at = self.now - timedelta(hours=3)
+        newer.save()
+        recompute_current_prices([(self.station.id, self.petrol.id)])
+        self.assertEqual(self.current().fuel_price_id, older.id)
+
+        older.delete()
+        recompute_current_prices([(self.station.id, self.petrol.id)])
+        self.assertEqual(self.current().fuel_price_id, newer.id)
+
+        newer.delete()
+        recompute_current_prices([(self.station.id, self.petrol.id)])
+        self.assertFalse(StationCurrentPrice.objects.exists())
+
+
+@override_settings(PRICE_RETENTION_DAYS=30, PRICE_RETENTION_KEEP=2)
+class PriceRetentionTests(TestCase):
+    def setUp(self):
+        self.station = create_station()
+        self.petrol = FuelType.objects.create(name='Regular')
+        now = timezone.now()
+        # One recent price, then six older than the retention window, newest first
+        self.prices = create_fuel_prices([
+            FuelPrice(station=self.station, fuel_type=self.petrol, price=Decimal('21.00') + days,
+                      reported_at=now - timedelta(days=days))
+            for days in (1, 40, 41, 42, 43, 44, 45)
+        ])
+
+    def remaining_ids(self):
+        return set(FuelPrice.objects.values_list('id', flat=True))
+
+    def test_keeps_recent_rows_and_the_newest_old_history(self):
+        result = cleanup_old_price_data(chunk_size=1)
+
+        self.assertEqual(result['deleted'], 4)
+        self.assertEqual(result['chunks'], 5)
+        self.assertEqual(self.remaining_ids(), {price.id for price in self.prices[:3]})
+
+    def test_never_deletes_a_row_a_current_price_points_at(self):
+        referenced = self.prices[-1]
+        StationCurrentPrice.objects.filter(station=self.station, fuel_type=self.petrol).update(
+            fuel_price_id=referenced.id, price=referenced.price
+        )
+
+        cleanup_old_price_data()
+
+        self.assertEqual(self.remaining_ids(), {price.id for price in self.prices[:3]} | {referenced.id})
+
+
+class PriceEstimatorTests(SimpleTestCase):
+    baseline = {'regular': 23.0, 'premium': 24.0, 'diesel': 22.0, 'effective_date': date(2024, 5, 1)}
+    stations = [
+        {'google_place_id': 'a', 'name': 'Shell Ultra City', 'address': 'N1 Highway', 'rating': 4.6},
+        {'google_place_id': 'b', 'name': 'Engen', 'address': 'Soweto township', 'rating': 2.5},
+        {'id': 7, 'name': 'Independent', 'address': '', 'rating': None},
+    ]
+
+    def prices(self, estimates):
+        return [[price['price'] for price in station] for station in estimates]
+
+    def test_estimates_are_the_same_whatever_the_batch(self):
+        alone = [self.prices(PriceEstimator().estimate([station], self.baseline))[0] for station in self.stations]
+        together = self.prices(PriceEstimator().estimate(self.stations, self.baseline))
+        reversed_batch = self.prices(PriceEstimator().estimate(self.stations[::-1], self.baseline))
+
+        self.assertEqual(together, alone)
+        self.assertEqual(reversed_batch, alone[::-1])
+
+    def test_memoised_estimates_match_fresh_ones(self):
+        estimator = PriceEstimator()
+        first = estimator.estimate(self.stations, self.baseline)
+        self.assertEqual(estimator.estimate(self.stations, self.baseline), first)
+        self.assertEqual(PriceEstimator().estimate(self.stations, self.baseline), first)
+
+    def test_rules_apply_and_jitter_stays_bounded(self):
+        plain = self.prices(PriceEstimator().estimate(self.stations, self.baseline, jitter=False))
+        self.assertEqual(plain[0], [23.43, 24.55, 22.3])
+        self.assertEqual(plain[1], [23.0, 23.99, 21.98])
+        self.assertEqual(plain[2], [23.0, 24.0, 22.0])
+
+        jittered = self.prices(PriceEstimator().estimate(self.stations, self.baseline))
+        for station_plain, station_jittered in zip(plain, jittered):
+            for price, estimate in zip(station_plain, station_jittered):
+                self.assertLessEqual(abs(estimate - price), JITTER_RAND + 0.005)
+
+    def test_a_new_baseline_is_not_served_from_the_memo(self):
+        estimator = PriceEstimator()
+        estimator.estimate(self.stations, self.baseline, jitter=False)
+        raised = dict(self.baseline, regular=24.0)
+        self.assertEqual(self.prices(estimator.estimate(self.stations, raised, jitter=False))[2][0], 24.0)
+
+
+def square(south, west, north, east):
+    return [[west, south], [east, south], [east, north], [west, north], [west, south]]
+
+
+class RegionResolverTests(TestCase):
+    def setUp(self):
+        # A province with a hole, and a coastal zone overlapping its western half
+        self.province = RegionBoundary.objects.create(kind='province', code='gauteng', name='Gauteng', geometry={
+            'type': 'Polygon', 'coordinates': [square(-27.0, 27.0, -25.0, 29.0), square(-26.2, 28.2, -26.0, 28.4)],
+        })
+        RegionBoundary.objects.create(kind='price_zone', code='coastal', name='Coastal', geometry={
+            'type': 'MultiPolygon', 'coordinates': [[square(-27.0, 26.9, -25.0, 28.0)]],
+        })
+        self.resolver = RegionResolver()
+        self.resolver.load()
+        # Rolling back the boundaries sends no signal; don't leave them in the shared resolver
+        self.addCleanup(boundaries_changed)
+
+    def test_resolves_interior_edge_and_hole_points(self):
+        self.assertEqual(self.resolver.resolve(-26.5, 27.5), Region('gauteng', 'coastal'))
+        self.assertEqual(self.resolver.resolve('-26.10', '28.01'), Region('gauteng', 'inland'))
+        self.assertEqual(self.resolver.resolve(-26.1, 28.3), Region('', DEFAULT_PRICE_ZONE))
+        self.assertEqual(self.resolver.resolve(-30.0, 30.0), Region('', DEFAULT_PRICE_ZONE))
+        self.assertEqual(self.resolver.resolve(None, 28.0), Region('', ''))
+
+    def test_grid_lookups_match_plain_point_in_polygon(self):
+        polygon = BoundaryPolygon('gauteng', self.province.polygons()[0])
+        rng = np.random.default_rng(3)
+        for lat, lng in zip(rng.uniform(-27.5, -24.5, 500), rng.uniform(26.5, 29.5, 500)):
+            expected = 'gauteng' if polygon.contains(lat, lng) else None
+            self.assertEqual(self.resolver.lookup('province', lat, lng), expected)
+
+    def test_station_region_follows_boundary_edits(self):
+        station = create_station(latitude='-26.500000', longitude='27.500000')
+        self.assertTrue(assign_station_region(station))
+        self.assertEqual((station.province, station.price_zone), ('gauteng', 'coastal'))
+
+        RegionBoundary.objects.filter(kind='price_zone').delete()
+        self.assertTrue(assign_station_region(station))
+        self.assertEqual((station.province, station.price_zone), ('gauteng', ''))
+        self.assertFalse(assign_station_region(station))
+
+
+@override_settings(PRICE_ALERT_INDEX_MAX_STALENESS=0)
+class PriceAlertTests(TestCase):
+    def setUp(self):
+        self.station = create_station()
+        self.petrol = FuelType.objects.create(name='Regular')
+        self.diesel = FuelType.objects.create(name='Diesel')
+        self.user = User.objects.create_user('driver')
+
+    def alert(self, radius_km, km_north, target='22.00', fuel_type=None, **fields):
+        # Alert centres sit due north of the station, so km_north is their distance from it
+        return PriceAlert.objects.create(
+            user=self.user, fuel_type=fuel_type or self.petrol, target_price=Decimal(target),
+            location_radius=Decimal(radius_km), location_lat=Decimal('-26.107600') + Decimal(km_north) / 111,
+            location_lng=Decimal('28.056700'), **fields,
+        )
+
+    def report(self, price, fuel_type=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_fuel_prices([FuelPrice(
+                station=self.station, fuel_type=fuel_type or self.petrol, price=Decimal(price),
+            )])
+
+    def alerted(self):
+        keys = Notification.objects.filter(related_object_type='price_alert').values_list('related_object_id', flat=True)
+        return sorted(int(key.split(':')[0]) for key in keys)
+
+    def test_every_radius_tier_matches_alerts_that_cover_the_station(self):
+        hits = [self.alert('3', '2'), self.alert('20', '15'), self.alert('80', '60'), self.alert('600', '550')]
+        self.alert('5', '4.9', fuel_type=self.diesel)
+        self.alert('3', '4')
+        self.alert('20', '-25')
+        self.alert('600', '10', target='21.00')
+        self.alert('80', '10', is_active=False)
+
+        self.report('21.50')
+
+        self.assertEqual(self.alerted(), sorted(alert.id for alert in hits))
+
+    def test_an_alert_fires_once_per_station_within_the_dedup_window(self):
+        alert = self.alert('20', '5')
+
+        self.report('21.50')
+        self.report('21.00')
+        self.assertEqual(self.alerted(), [alert.id])
+
+        Notification.objects.update(created_at=timezone.now() - timedelta(hours=25))
+        self.report('20.90')
+        self.assertEqual(self.alerted(), [alert.id, alert.id])
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice')
+        self.bob = User.objects.create_user('bob')
+
+    def notify(self, user, count=1, **fields):
+        send_notifications([
+            Notification(user=user, notification_type='SYSTEM', title='Hello', message='Hi', **fields)
+            for _ in range(count)
+        ])
+
+    def unread(self, user):
+        user.refresh_from_db(fields=['unread_notifications'])
+        self.assertEqual(user.unread_notifications, user.notifications.filter(is_read=False).count())
+        return user.unread_notifications
+
+    def test_sending_counts_only_unread_notifications(self):
+        self.notify(self.alice, 3)
+        self.notify(self.alice, is_read=True)
+        self.notify(self.bob)
+
+        self.assertEqual(self.unread(self.alice), 3)
+        self.assertEqual(self.unread(self.bob), 1)
+
+    def test_marking_read_decrements_once(self):
+        self.notify(self.alice, 2)
+        notification = self.alice.notifications.first()
+
+        self.assertTrue(mark_notification_read(notification))
+        self.assertFalse(mark_notification_read(Notification.objects.get(pk=notification.pk)))
+        self.assertEqual(self.unread(self.alice), 1)
+
+    def test_mark_all_read_only_touches_that_user(self):
+        self.notify(self.alice, 2)
+        self.notify(self.bob, 2)
+
+        self.assertEqual(mark_all_notifications_read(self.alice), 2)
+        self.assertEqual(mark_all_notifications_read(self.alice), 0)
+        self.assertEqual(self.unread(self.alice), 0)
+        self.assertEqual(self.unread(self.bob), 2)
+
+    def test_broadcast_and_rebuild_agree_with_the_table(self):
+        self.notify(self.bob)
+        User.objects.create_user('carol', is_active=False)
+
+        self.assertEqual(broadcast('Maintenance', 'Back soon'), 2)
+        self.assertEqual(self.unread(self.alice), 1)
+        self.assertEqual(self.unread(self.bob), 2)
+
+        User.objects.filter(pk=self.bob.pk).update(unread_notifications=9)
+        self.assertEqual(rebuild_unread_counts(), 1)
+        self.assertEqual(self.unread(self.bob), 2)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.station = create_station()
+        self.petrol = FuelType.objects.create(name='Regular')
+        self.reported_at = timezone.now() - timedelta(hours=1)
+
+    def add_prices(self, count, reported_at):
+        return create_fuel_prices([
+            FuelPrice(station=self.station, fuel_type=self.petrol, price=Decimal('21.00'), reported_at=reported_at)
+            for _ in range(count)
+        ])
+
+    def walk(self, url, between_pages=None):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.json()['results'])
+            url = response.json()['next']
+            pages += 1
+            if between_pages:
+                between_pages()
+        return ids, pages
+
+    def test_price_pages_are_stable_while_new_prices_arrive(self):
+        # Rows sharing a timestamp must still split cleanly across pages
+        older = self.add_prices(4, self.reported_at - timedelta(minutes=5))
+        newer = self.add_prices(3, self.reported_at)
+
+        ids, pages = self.walk(
+            '/api/api/fuel-prices/?page_size=2', lambda: self.add_prices(1, timezone.now())
+        )
+
+        expected = [price.id for price in sorted(newer, key=lambda p: -p.id)] + \
+                   [price.id for price in sorted(older, key=lambda p: -p.id)]
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 4)
+
+    def test_review_pages_are_stable_while_new_reviews_arrive(self):
+        users = iter(User.objects.create_user(f'reviewer{number}') for number in range(20))
+        reviews = [Review.objects.create(user=next(users), station=self.station, rating=4, comment='Fine')
+                   for _ in range(5)]
+        Review.objects.filter(id__in=[review.id for review in reviews[:3]]).update(created_at=self.reported_at)
+
+        def add_review():
+            Review.objects.create(user=next(users), station=self.station, rating=5, comment='New')
+
+        ids, _ = self.walk('/api/api/reviews/?page_size=2', add_review)
+
+        self.assertEqual(ids, [reviews[4].id, reviews[3].id, reviews[2].id, reviews[1].id, reviews[0].id])
+
+    def test_previous_links_walk_back_over_the_same_pages(self):
+        self.add_prices(5, self.reported_at)
+        url, forward = '/api/api/fuel-prices/?page_size=2', []
+        while url:
+            body = self.client.get(url).json()
+            forward.append([item['id'] for item in body['results']])
+            url, previous = body['next'], body['previous']
+
+        backward = []
+        while previous:
+            body = self.client.get(previous).json()
+            backward.append([item['id'] for item in body['results']])
+            previous = body['previous']
+
+        self.assertEqual(backward, forward[-2::-1])
+
+    def test_malformed_cursors_are_not_found(self):
+        response = self.client.get('/api/api/fuel-prices/', {'cursor': 'cD1ub3QtYS1kYXRl'})
+        self.assertEqual(response.status_code, 404)
+
+
+class RendererTests(SimpleTestCase):
+    payload = [{
+        'id': 1,
+        'name': 'Café 24',
+        'reported_at': datetime(2024, 5, 1, 6, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'local_time': datetime(2024, 5, 1, 6, 30),
+        'effective_date': date(2024, 5, 1),
+        'opens': time(6, 0, 0, 500000),
+        'price': Decimal('21.350'),
+        'uuid': UUID('12345678-1234-5678-1234-567812345678'),
+        'label': gettext_lazy('Diesel'),
+        'distance': 1.25,
+        'prices': {7: Decimal('20.10'), 'station': {'lat': -26.1076, 'open': True, 'brand': None}},
+    }]
+
+    def test_fast_renderer_matches_the_stdlib_renderer(self):
+        expected = JSONRenderer().render(self.payload)
+
+        self.assertEqual(FastJSONRenderer().render(self.payload), expected)
+        page = {'next': None, 'results': self.payload}
+        self.assertEqual(FastJSONRenderer().render(page), JSONRenderer().render(page))
+
+    @mock.patch('api.renderers.orjson', None)
+    def test_without_orjson_the_stdlib_path_is_used(self):
+        self.assertEqual(FastJSONRenderer().render(self.payload), JSONRenderer().render(self.payload))
+
+    def test_columnar_output_carries_the_same_values(self):
+        rows = [dict(self.payload[0], id=2, prices={'lat': 1.0}), dict(self.payload[0], id=3, prices={'lat': 2.0})]
+
+        page = json.loads(ColumnarJSONRenderer().render({'next': None, 'results': rows}))
+        plain = json.loads(JSONRenderer().render(rows))
+
+        self.assertEqual(page['next'], None)
+        self.assertEqual(page['results']['count'], 2)
+        for field in ('id', 'reported_at', 'opens', 'price', 'uuid', 'label'):
+            self.assertEqual(page['results']['columns'][field], [row[field] for row in plain])
+        self.assertEqual(page['results']['columns']['prices.lat'], [1.0, 2.0])
+
+
+class ConcurrentReviewTests(TransactionTestCase):
+    def run_concurrently(self, work, items):
+        barrier = threading.Barrier(len(items))
+        errors = []
+
+        def run(item):
+            try:
+                barrier.wait()
+                work(item)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(item,)) for item in items]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def aggregates(self, station):
+        fields = [column for columns in AGGREGATES.values() for column in columns]
+        return PetrolStation.objects.values(*fields).get(pk=station.pk)
+
+    def test_concurrent_review_writes_keep_the_aggregates_exact(self):
+        station = create_station()
+        users = [User.objects.create_user(f'reviewer{number}') for number in range(8)]
+
+        def create(user):
+            with transaction.atomic():
+                review = Review.objects.create(
+                    user=user, station=station, rating=user.id % 5 + 1, service_rating=3, comment='Fine'
+                )
+                review_changed(new=review_snapshot(review))
+
+        self.run_concurrently(create, users)
+        created = self.aggregates(station)
+        self.assertEqual(created['reviews_count'], 8)
+        self.assertEqual(created['rating_total'], sum(user.id % 5 + 1 for user in users))
+        self.assertEqual(created['service_rating_count'], 8)
+
+        def edit_or_delete(review):
+            with transaction.atomic():
+                old = review_snapshot(review)
+                if review.user_id % 2:
+                    review.delete()
+                    review_changed(old=old)
+                else:
+                    review.rating, review.cleanliness_rating = 1, 5
+                    review.save()
+                    review_changed(old=old, new=review_snapshot(review))
+
+        self.run_concurrently(edit_or_delete, list(Review.objects.all()))
+        updated = self.aggregates(station)
+        rebuild_station_ratings()
+        self.assertEqual(updated, self.aggregates(station))
+        self.assertEqual(updated['reviews_count'], 4)
+        self.assertEqual(updated['avg_rating'], 1.0)
@@ -34,6 +34,9 @@ urlpatterns = [
     path('login/', views.login_user, name='login_user'),
     path('login-verify-otp/', views.login_verify_otp, name='login_verify_otp'),
     path('api/', include(router.urls)),
+    path('api/v1/live/', views.live_updates, name='live-updates'),
+    path('api/v1/changes/', views.changes, name='changes'),
+    path('api/v1/traffic/', views.traffic_observations, name='traffic-observations'),
     path(
         'api/v1/stations/nearby/',
         PetrolStationViewSet.as_view({'get': 'nearby_with_real_data'}),
@@ -1,4 +1,4 @@
-from rest_framework.decorators import api_view, action
+from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework import filters
@@ -14,24 +14,23 @@ from django.utils import timezone
 from datetime import timedelta
 import datetime
 from django.conf import settings
-from django.db.models import Sum
+from django.db.models import F, Sum
 from django.core.cache import cache
 import requests
 import logging
-from bs4 import BeautifulSoup
 from django.core.cache import cache
 from django.conf import settings
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import json
-import re
 import traceback
 from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
 import math
 from typing import List, Dict
 from .models import (
     User, Vehicle, FuelCompany, PetrolStation, StationAmenity,
-    FuelType, FuelPrice, StationTraffic, UserVisit, Review,
+    FuelType, FuelPrice, StationCurrentPrice, StationTraffic, UserVisit, Review,
     ReviewImage, Favorite, PriceAlert, FuelTransaction,
     TripPlan, RefuelStop, StationReport, Notification,
     PromotionCampaign, StationPromotion, UserSubscription
@@ -40,7 +39,7 @@ from .serializers import (
     UserSerializer, VehicleSerializer, FuelCompanySerializer,
     PetrolStationListSerializer,
     StationAmenitySerializer, FuelTypeSerializer, FuelPriceSerializer,
-    StationTrafficSerializer, ReviewSerializer, ReviewImageSerializer,
+    StationTrafficSerializer, TrafficObservationSerializer, ReviewSerializer, ReviewImageSerializer,
     FavoriteSerializer, PriceAlertSerializer, FuelTransactionSerializer,
     TripPlanSerializer, RefuelStopSerializer, StationReportSerializer,
     NotificationSerializer, PromotionCampaignSerializer,
@@ -56,9 +55,35 @@ logger = logging.getLogger(__name__)
 # Add this import or definition for GooglePlacesService
 from .services.google_places_service import GooglePlacesService  # Make sure this path is correct and the service exists
 from .services.fuel_price_service import FuelPriceService
+from .services.station_index import get_station_index
+from .services.price_ingestion import prices_written, recompute_current_prices
+from .services.price_baselines import get_price_baseline, save_price_baseline
+from .services.scrapers import race_scrapers
+from .services.official_prices import get_official_prices
+from .services.price_estimation import get_price_estimator
+from .services.regions import Region, resolve_region
+from .services.notifications import mark_all_notifications_read, mark_notification_read
+from .services.live_updates import Subscription, event_stream
+from .services.ratings import review_changed, review_snapshot
+from .services.amenities import boolean_amenity_mask, has_amenity, parse_amenities
+from .services.traffic import create_traffic_records
+from .services.change_log import (
+    DEFAULT_PAGE_SIZE as DEFAULT_CHANGES_PAGE_SIZE, MAX_PAGE_SIZE as MAX_CHANGES_PAGE_SIZE, changes_since
+)
+from .pagination import FuelPriceCursorPagination, ReviewCursorPagination
+from .renderers import STATION_LIST_RENDERERS
+from .services.geo import (
+    as_coordinates, distance_km, distance_matrix, distances_from, geohash_cell, within_radius
+)
 
 User = get_user_model()
 
+# Nearby search caching: geohash precision 6 cells are roughly 1.2km x 0.6km
+NEARBY_CACHE_PRECISION = 6
+NEARBY_CACHE_TIMEOUT = 900  # 15 minutes
+NEARBY_RADIUS_BUCKETS = (1, 2, 5, 10, 25, 50, 100)
+NEARBY_RESULT_LIMIT = 20
+
 @api_view(['POST'])
 def register_user(request):
     data = request.data
@@ -175,6 +200,88 @@ def login_user(request):
     return Response({"message": "OTP sent to your email. Please verify to login."})
 
 
+
+async def live_updates(request):
+    """Server-sent event stream of price, traffic and station status changes.
+
+    Subscribe with ?stations=<id>,<id> and/or ?bbox=<south>,<west>,<north>,<east>.
+    Serve under ASGI; each open stream holds a worker connection.
+    """
+    station_ids = [s for s in request.GET.get('stations', '').split(',') if s]
+    max_stations = getattr(settings, 'LIVE_UPDATES_MAX_STATIONS', 200)
+    if len(station_ids) > max_stations:
+        return JsonResponse({"error": f"At most {max_stations} stations per stream"}, status=400)
+
+    bbox = None
+    if request.GET.get('bbox'):
+        try:
+            bbox = [float(value) for value in request.GET['bbox'].split(',')]
+        except ValueError:
+            bbox = []
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            return JsonResponse({"error": "bbox must be south,west,north,east"}, status=400)
+
+    if not station_ids and not bbox:
+        return JsonResponse({"error": "stations or bbox parameter is required"}, status=400)
+
+    response = StreamingHttpResponse(
+        event_stream(Subscription(station_ids=station_ids, bbox=bbox)),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@api_view(['GET'])
+def changes(request):
+    """Stations and current prices changed since a cursor, for clients keeping a local copy.
+
+    Omit since (or get reset=true back) to do a full fetch, then sync from the returned cursor.
+    """
+    try:
+        since = int(request.query_params['since']) if request.query_params.get('since') else None
+        limit = min(int(request.query_params.get('limit', DEFAULT_CHANGES_PAGE_SIZE)), MAX_CHANGES_PAGE_SIZE)
+    except ValueError:
+        return Response({"error": "since and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+    bbox = None
+    if request.query_params.get('bbox'):
+        try:
+            bbox = [float(value) for value in request.query_params['bbox'].split(',')]
+        except ValueError:
+            bbox = []
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            return Response({"error": "bbox must be south,west,north,east"}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(changes_since(since, bbox=bbox, limit=max(limit, 1)))
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def traffic_observations(request):
+    """Upload a batch of traffic readings: a list of {station, current_visitors, queue_length, estimated_wait_time, timestamp}"""
+    if not isinstance(request.data, list):
+        return Response({"error": "Expected a list of traffic readings"}, status=status.HTTP_400_BAD_REQUEST)
+    max_size = getattr(settings, 'TRAFFIC_BATCH_MAX_SIZE', 1000)
+    if len(request.data) > max_size:
+        return Response({"error": f"At most {max_size} readings per batch"}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = TrafficObservationSerializer(data=request.data, many=True)
+    serializer.is_valid(raise_exception=True)
+    readings = serializer.validated_data
+
+    # One query for every station in the batch rather than one per reading
+    station_ids = {reading['station_id'] for reading in readings}
+    known = set(PetrolStation.objects.filter(id__in=station_ids).values_list('id', flat=True))
+    if station_ids - known:
+        return Response(
+            {"error": "Unknown stations", "stations": sorted(str(s) for s in station_ids - known)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    created = create_traffic_records([StationTraffic(**reading) for reading in readings])
+    return Response({"created": len(created)}, status=status.HTTP_201_CREATED)
+
 #DASHBOARD MAIN FUNCTIONS
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -211,12 +318,13 @@ class FuelCompanyViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['name']
 
 class PetrolStationViewSet(viewsets.ModelViewSet):
-    queryset = PetrolStation.objects.filter(is_active=True)
+    queryset = PetrolStation.objects.filter(is_active=True).select_related('company', 'current_traffic')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     serializer_class = PetrolStationListSerializer
     filterset_fields = ['city', 'state', 'company', 'is_24h']
     search_fields = ['name', 'address', 'city']
+    renderer_classes = STATION_LIST_RENDERERS
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -225,18 +333,19 @@ class PetrolStationViewSet(viewsets.ModelViewSet):
         self.price_methods = PetrolStationEnhancedMethods() 
 
         self.cache_timeout = 3600  # 1 hour cache
-        self.price_sources = [
-            'https://www.fuelprices.co.za/',
-            'https://www.aa.co.za/fuel-price',
-            'https://www.automobil.co.za/fuel-prices/',
-        ]
-            # Base prices for South Africa (updated monthly by government)
-        self.sa_base_prices = {
-            'petrol_93': 23.50,  # R per liter
-            'petrol_95': 24.20,
-            'diesel_0005': 22.80,
-            'diesel_005': 22.90,
-        } 
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list' and self.request.query_params.get('amenities'):
+            try:
+                mask = parse_amenities(self.request.query_params['amenities'])
+            except ValueError as e:
+                raise serializers.ValidationError({'amenities': str(e)})
+            # Stations with every requested bit set
+            queryset = queryset.alias(
+                matched_amenities=F('amenity_flags').bitand(mask)
+            ).filter(matched_amenities=mask)
+        return queryset
     
     @action(detail=False, methods=['get'])
     def nearby_with_real_data(self, request):
@@ -300,21 +409,32 @@ class PetrolStationViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
+            try:
+                amenities = parse_amenities(request.query_params.get('amenities', ''))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
             force_refresh = request.query_params.get('refresh', 'false').lower() == 'true'
             
-            # Cache key for this location
-            cache_key = f"nearby_stations_{lat}_{lng}_{radius}"
+            # Cache entries are keyed by geohash cell and radius bucket, and hold every
+            # station within the bucket plus the cell's half-diagonal of the cell centre,
+            # so they cover any point in the cell. Distances are recomputed from the
+            # caller's exact point, and only the stations served are priced.
+            cell, center_lat, center_lng, cell_padding = geohash_cell(lat, lng, NEARBY_CACHE_PRECISION)
+            bucket = next(b for b in NEARBY_RADIUS_BUCKETS if b >= radius)
             
             if not force_refresh:
-                cached_result = cache.get(cache_key)
-                if cached_result:
+                superset = self._get_cached_superset(cell, bucket, amenities)
+                if superset is not None:
                     logger.info("Returning cached result")
-                    return Response(cached_result)
+                    return Response(self._serve_from_superset(superset, lat, lng, radius))
+            
+            search_radius = bucket + cell_padding
             
             # Get stations from database first
             logger.info("Starting database query...")
             try:
-                db_stations = self._get_nearby_db_stations(lat, lng, radius)
+                db_stations = self._get_nearby_db_stations(center_lat, center_lng, search_radius, amenities)
                 logger.info("DB stations count: %d", len(db_stations))
             except Exception as e:
                 logger.error(f"Error getting DB stations: {e}")
@@ -324,7 +444,7 @@ class PetrolStationViewSet(viewsets.ModelViewSet):
             # Get Google stations
             logger.info("Starting Google Places query...")
             try:
-                google_stations = self.places_service.find_nearby_stations(lat, lng, radius * 1000)
+                google_stations = self.places_service.find_nearby_stations(center_lat, center_lng, search_radius * 1000)
                 logger.info("Google stations count: %d", len(google_stations))
             except Exception as e:
                 logger.error(f"Error getting Google stations: {e}")
@@ -333,28 +453,21 @@ class PetrolStationViewSet(viewsets.ModelViewSet):
 
             # Merge and process stations
             try:
-                all_stations = self._merge_station_data(db_stations, google_stations, lat, lng)
-                logger.info("Merged station count: %d", len(all_stations))
-
-                enhanced_stations = self._enhance_with_prices(all_stations[:20])
-                logger.info("Enhanced station count: %d", len(enhanced_stations))
-
-                # Format for frontend compatibility
-                frontend_formatted = self._format_for_frontend(enhanced_stations)
-                logger.info("Frontend formatted station count: %d", len(frontend_formatted))
-
-                # Sort by distance and reliability with safe handling
-                result = sorted(
-                    frontend_formatted,
-                    key=lambda x: (
-                        float(x.get('distance') or 0) if x.get('distance') is not None else float('inf'),
-                        -(float(x.get('reliability_score') or 0))
-                    )
-                )
-                
+                all_stations = self._merge_station_data(db_stations, google_stations, center_lat, center_lng)
+                if amenities:
+                    # Database stations were filtered in the index scan; Google ones only have their defaults
+                    all_stations = [
+                        s for s in all_stations
+                        if s.get('source') == 'database' or boolean_amenity_mask(s) & amenities == amenities
+                    ]
+                # No count cap: the nearest stations to the centre aren't the nearest to every point in the cell
+                superset = [s for s in all_stations if None not in self._station_coordinates(s)]
+                logger.info("Merged station count: %d", len(superset))
+
                 # Cache for 15 minutes
-                cache.set(cache_key, result, 900)
+                cache.set(self._nearby_cache_key(cell, bucket, amenities), superset, NEARBY_CACHE_TIMEOUT)
                 
+                result = self._serve_from_superset(superset, lat, lng, radius)
                 logger.info(f"Returning {len(result)} stations")
                 return Response(result)
                 
@@ -381,60 +494,91 @@ class PetrolStationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
-    def _get_nearby_db_stations(self, lat: float, lng: float, radius: float) -> List[Dict]:
+    def _nearby_cache_key(self, cell: str, bucket: int, amenities: int = 0) -> str:
+        key = f"nearby_stations_{cell}_{bucket}"
+        return f"{key}_a{amenities}" if amenities else key
+    
+    def _get_cached_superset(self, cell: str, bucket: int, amenities: int = 0) -> Optional[List[Dict]]:
+        """Return the smallest cached superset for this cell that covers the radius bucket"""
+        keys = [self._nearby_cache_key(cell, b, amenities) for b in NEARBY_RADIUS_BUCKETS if b >= bucket]
+        cached = cache.get_many(keys)
+        for key in keys:
+            if key in cached:
+                return cached[key]
+        return None
+    
+    def _serve_from_superset(self, superset: List[Dict], lat: float, lng: float, radius: float) -> List[Dict]:
+        """Re-measure a cached superset from the exact request point, trim it to the radius, then price and format"""
+        if not superset:
+            return []
+        
+        coordinates = [self._station_coordinates(s) for s in superset]
+        mask, distances = within_radius(
+            lat, lng,
+            as_coordinates(c[0] for c in coordinates),
+            as_coordinates(c[1] for c in coordinates),
+            radius,
+        )
+        hits = np.flatnonzero(mask)
+        hits = hits[np.argsort(distances[hits], kind='stable')][:NEARBY_RESULT_LIMIT]
+        # Copies, so pricing never writes into the cached superset
+        stations = [dict(superset[i], distance=round(float(distances[i]), 2)) for i in hits]
+        
+        stations = self._format_for_frontend(self._enhance_with_prices(stations))
+        
+        # Sort by distance and reliability with safe handling
+        stations.sort(key=lambda x: (x['distance'], -(float(x.get('reliability_score') or 0))))
+        return stations
+    
+    def _get_nearby_db_stations(self, lat: float, lng: float, radius: float, amenities: int = 0) -> List[Dict]:
         """Get nearby stations from database with proper null handling"""
         try:
-            # Calculate latitude/longitude ranges with validation
             if radius <= 0:
                 return []
-                
-            lat_range = radius * 0.009
-            lng_range = radius * 0.009
-            
+
             # Validate coordinate ranges
             if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
                 return []
-            
-            # Get stations with safe float conversion
+
+            # Candidates come from the in-process grid index, already filtered
+            # by true distance and amenities, so the DB is only hit for matching rows
+            distances = dict(get_station_index().nearby(lat, lng, radius, amenities))
+            if not distances:
+                return []
+
             stations = PetrolStation.objects.filter(
-                latitude__range=(lat - lat_range, lat + lat_range),
-                longitude__range=(lng - lng_range, lng + lng_range),
+                id__in=list(distances.keys()),
                 is_active=True
-            ).select_related('company')
-            
+            ).select_related('company', 'current_traffic')
+            stations = sorted(stations, key=lambda s: distances[s.id])
+
+            # Serialize all stations at once so related data is loaded in bulk
+            serialized = PetrolStationListSerializer(stations, many=True).data
+
             result = []
-            for station in stations:
+            for station, station_data in zip(stations, serialized):
                 try:
-                    # Safely convert coordinates to float
-                    station_lat = float(station.latitude) if station.latitude is not None else None
-                    station_lng = float(station.longitude) if station.longitude is not None else None
-                    
-                    # Skip if coordinates are invalid
-                    if station_lat is None or station_lng is None:
-                        continue
-                    
-                    distance = self._calculate_distance(lat, lng, station_lat, station_lng)
-                    
-                    # Skip if distance calculation failed or exceeds radius
-                    if distance is None or distance > radius:
-                        continue
-                    
-                    # Serialize station data with null checks
-                    station_data = PetrolStationListSerializer(station).data
+                    distance = distances[station.id]
+                    traffic = getattr(station, 'current_traffic', None)
+
                     station_data['distance'] = round(distance, 2)
                     station_data['source'] = 'database'
                     
                     # Add database-specific fields with null checks
                     additional_data = {
-                        'has_atm': bool(station.has_atm) if station.has_atm is not None else None,
-                        'has_shop': bool(station.has_shop) if station.has_shop is not None else None,
-                        'has_coffee': bool(station.has_coffee) if station.has_coffee is not None else None,
-                        'has_ev_charging': bool(station.has_ev_charging) if station.has_ev_charging is not None else None,
-                        'busy_level': int(station.busy_level) if station.busy_level is not None else None,
-                        'wait_time': int(station.wait_time) if station.wait_time is not None else None,
+                        'latitude': float(station.latitude),
+                        'longitude': float(station.longitude),
+                        'has_atm': has_amenity(station.amenity_flags, 'ATM'),
+                        'has_shop': has_amenity(station.amenity_flags, 'SHOP'),
+                        'has_coffee': has_amenity(station.amenity_flags, 'COFFEE'),
+                        'has_ev_charging': has_amenity(station.amenity_flags, 'EV_CHARGING'),
+                        'busy_level': traffic.busy_level if traffic else station.busy_level,
+                        'wait_time': traffic.estimated_wait_time if traffic else station.wait_time,
                         'is_24h': bool(station.is_24h) if station.is_24h is not None else None,
                         'google_rating': float(station.google_rating) if station.google_rating is not None else None,
                         'opening_hours': station.opening_hours if station.opening_hours else None,
+                        'province': station.province,
+                        'price_zone': station.price_zone,
                     }
                     
                     station_data.update(additional_data)
@@ -454,50 +598,63 @@ class PetrolStationViewSet(viewsets.ModelViewSet):
     def _merge_station_data(self, db_stations: List[Dict], google_stations: List[Dict], lat: float, lng: float) -> List[Dict]:
         """Merge database stations with Google Places data, avoiding duplicates"""
         result = list(db_stations)  # Start with database stations
-        
-        for google_station in google_stations:
+
+        google_stations = [
+            s for s in google_stations
+            if s.get('latitude') is not None and s.get('longitude') is not None
+        ]
+        if not google_stations:
+            return result
+
+        google_lats = as_coordinates(s['latitude'] for s in google_stations)
+        google_lngs = as_coordinates(s['longitude'] for s in google_stations)
+        db_coords = [self._station_coordinates(s) for s in db_stations]
+
+        # One vectorised pass for every google x db pair and every google station to the origin
+        pair_distances = distance_matrix(
+            google_lats, google_lngs,
+            as_coordinates(c[0] for c in db_coords),
+            as_coordinates(c[1] for c in db_coords),
+        )
+        origin_distances = distances_from(lat, lng, google_lats, google_lngs)
+
+        for i, google_station in enumerate(google_stations):
             # Check if this station already exists in our database
             is_duplicate = False
-            google_lat = google_station.get('latitude')
-            google_lng = google_station.get('longitude')
-            
-            if google_lat is not None and google_lng is not None:
-                for db_station in db_stations:
-                    db_lat = db_station.get('latitude')
-                    db_lng = db_station.get('longitude')
-                    
-                    if db_lat is not None and db_lng is not None:
-                        db_distance = self._calculate_distance(
-                            google_lat, google_lng, db_lat, db_lng
-                        )
-                        
-                        # If within 100 meters and similar name, consider it a duplicate
-                        if (db_distance is not None and db_distance < 0.1 and 
-                            self._name_similarity(google_station.get('name', ''), db_station.get('name', '')) > 0.7):
-                            is_duplicate = True
-                            # Update database station with Google data
-                            db_station.update({
-                                'google_place_id': google_station.get('google_place_id'),
-                                'rating': google_station.get('rating', db_station.get('google_rating')),
-                                'is_open': google_station.get('is_open'),
-                                'photos': google_station.get('photos', [])
-                            })
-                            break
-                
-                if not is_duplicate:
-                    # Add new station from Google with intelligent defaults
-                    distance = self._calculate_distance(lat, lng, google_lat, google_lng)
-                    if distance is not None:
-                        google_station['distance'] = round(distance, 2)
-                        google_station['source'] = 'google_places'
-                        
-                        # Add intelligent defaults for missing amenities
-                        google_station.update(self._add_intelligent_defaults(google_station))
-                        
-                        result.append(google_station)
-        
+
+            # If within 100 meters and similar name, consider it a duplicate
+            for j in np.flatnonzero(pair_distances[i] < 0.1):
+                db_station = db_stations[j]
+                if self._name_similarity(google_station.get('name', ''), db_station.get('name', '')) > 0.7:
+                    is_duplicate = True
+                    # Update database station with Google data
+                    db_station.update({
+                        'google_place_id': google_station.get('google_place_id'),
+                        'rating': google_station.get('rating', db_station.get('google_rating')),
+                        'is_open': google_station.get('is_open'),
+                        'photos': google_station.get('photos', [])
+                    })
+                    break
+
+            if not is_duplicate:
+                # Add new station from Google with intelligent defaults
+                google_station['distance'] = round(float(origin_distances[i]), 2)
+                google_station['source'] = 'google_places'
+
+                # Add intelligent defaults for missing amenities
+                google_station.update(self._add_intelligent_defaults(google_station))
+
+                result.append(google_station)
+
         return result
 
+    def _station_coordinates(self, station: Dict):
+        """Return (lat, lng) for a station dict, falling back to its serialized coordinates"""
+        coordinates = station.get('coordinates') or {}
+        lat = station.get('latitude', coordinates.get('lat'))
+        lng = station.get('longitude', coordinates.get('lng'))
+        return lat, lng
+
     def _enhance_with_prices(self, stations: List[Dict]) -> List[Dict]:
        return self.price_methods._enhance_with_prices_implementation(stations)
     
@@ -692,16 +849,7 @@ class PetrolStationViewSet(viewsets.ModelViewSet):
     
     def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
         """Calculate distance using Haversine formula"""
-        import math
-        
-        R = 6371  # Earth radius in km
-        dlat = math.radians(lat2 - lat1)
-        dlng = math.radians(lng2 - lng1)
-        a = (math.sin(dlat/2) * math.sin(dlat/2) + 
-             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-             math.sin(dlng/2) * math.sin(dlng/2))
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        return R * c
+        return distance_km(lat1, lng1, lat2, lng2)
     
     def _name_similarity(self, name1: str, name2: str) -> float:
         """Calculate similarity between two station names"""
@@ -781,85 +929,6 @@ class PetrolStationViewSet(viewsets.ModelViewSet):
         
         return synced_count
     
-    def _get_official_price_baselines(self) -> Dict:
-        """Get the latest official fuel prices for South Africa"""
-        # This would scrape or read from a stored official price file
-        return {
-            '93_unleaded': 23.96,  # Inland price
-            '95_unleaded': 24.30,
-            'diesel_0.05': 21.20,
-            'diesel_0.005': 21.35,
-            'last_updated': datetime.date(2024, 6, 5)
-        }
-
-    def _calculate_regional_adjustments(self, stations: List[Dict]) -> Dict:
-        """Calculate regional price differences (coastal vs inland)"""
-        adjustments = defaultdict(float)
-        
-        # Group stations by region
-        coastal_stations = [s for s in stations if self._is_coastal(s)]
-        inland_stations = [s for s in stations if not self._is_coastal(s)]
-        
-        # Calculate average differences
-        if coastal_stations and inland_stations:
-            for fuel_type in ['93_unleaded', '95_unleaded', 'diesel']:
-                coastal_avg = np.mean([s.get(fuel_type, 0) for s in coastal_stations])
-                inland_avg = np.mean([s.get(fuel_type, 0) for s in inland_stations])
-                adjustments[fuel_type] = inland_avg - coastal_avg
-        
-        return adjustments
-
-    def _get_db_station_prices(self, station_data: Dict, official_prices: Dict) -> List[Dict]:
-        """Get precise prices for database stations"""
-        station = PetrolStation.objects.get(id=station_data['id'])
-        
-        # Try to get recent user-reported prices first
-        user_prices = FuelPrice.objects.filter(
-            station=station,
-            reported_at__gte=timezone.now() - timedelta(hours=6)
-        ).order_by('-reported_at')
-        
-        if user_prices.exists():
-            return self._format_price_objects(user_prices)
-        
-        # Fallback to station-specific adjustments
-        return [{
-            'fuel_type': '93_unleaded',
-            'price': official_prices['93_unleaded'] * station.price_adjustment,
-            'source': 'station_profile',
-            'confidence': 0.7
-        }, {
-            'fuel_type': '95_unleaded',
-            'price': official_prices['95_unleaded'] * station.price_adjustment,
-            'source': 'station_profile',
-            'confidence': 0.7
-        }]
-
-    def _estimate_prices_for_station(self, station_data: Dict, 
-                                official_prices: Dict,
-                                regional_adjustments: Dict) -> List[Dict]:
-        """Estimate prices for non-database stations"""
-        base_prices = official_prices.copy()
-        
-        # Adjust for coastal regions
-        if self._is_coastal(station_data):
-            for fuel_type, adjustment in regional_adjustments.items():
-                base_prices[fuel_type] -= adjustment
-        
-        # Brand-based adjustments
-        brand = station_data.get('brand', '').lower()
-        if 'shell' in brand:
-            base_prices = {k: v * 1.02 for k, v in base_prices.items()}  # 2% premium
-        elif 'engen' in brand:
-            base_prices = {k: v * 1.01 for k, v in base_prices.items()}
-        
-        return [{
-            'fuel_type': k,
-            'price': round(v, 2),
-            'source': 'estimated',
-            'confidence': 0.6
-        } for k, v in base_prices.items()]
-
     def _extract_individual_prices(self, prices: List[Dict]) -> Dict:
         """Extract simplified price fields"""
         result = {
@@ -890,12 +959,6 @@ class PetrolStationViewSet(viewsets.ModelViewSet):
         })
         return station_data
 
-    def _is_coastal(self, station_data: Dict) -> bool:
-        """Determine if station is in coastal region"""
-        coastal_cities = ['cape town', 'durban', 'port elizabeth', 'east london']
-        return any(city in station_data.get('city', '').lower() 
-                for city in coastal_cities)
-    
     def _create_or_update_station(self, google_data: Dict) -> int:
         """Create or update a station from Google Places data"""
         try:
@@ -908,6 +971,8 @@ class PetrolStationViewSet(viewsets.ModelViewSet):
                     'google_place_id': google_data.get('google_place_id'),
                     'is_active': True
                 }
+                region = resolve_region(google_data.get('latitude'), google_data.get('longitude'))
+                defaults.update(province=region.province, price_zone=region.price_zone)
                 
                 # Try to find existing station by Google Place ID or location
                 existing = None
@@ -947,13 +1012,27 @@ class FuelTypeViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 class FuelPriceViewSet(viewsets.ModelViewSet):
-    queryset = FuelPrice.objects.all().order_by('-reported_at')
+    queryset = FuelPrice.objects.select_related('station', 'fuel_type').order_by('-reported_at', '-id')
     serializer_class = FuelPriceSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = FuelPriceCursorPagination
     filterset_fields = ['station', 'fuel_type', 'is_verified']
     
     def perform_create(self, serializer):
-        serializer.save(reported_by=self.request.user)
+        with transaction.atomic():
+            price = serializer.save(reported_by=self.request.user)
+            prices_written([price])
+    
+    def perform_update(self, serializer):
+        old_key = (serializer.instance.station_id, serializer.instance.fuel_type_id)
+        with transaction.atomic():
+            price = serializer.save()
+            recompute_current_prices({old_key, (price.station_id, price.fuel_type_id)})
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            recompute_current_prices([(instance.station_id, instance.fuel_type_id)])
     
     @action(detail=False, methods=['get'])
     def latest_by_station(self, request):
@@ -966,38 +1045,51 @@ class FuelPriceViewSet(viewsets.ModelViewSet):
             )
             
         # Get the latest price for each fuel type at this station
-        latest_prices = []
+        current_prices = StationCurrentPrice.objects.filter(
+            station_id=station_id,
+            fuel_price__isnull=False
+        ).select_related('fuel_price__fuel_type', 'fuel_price__station')
         
-        for fuel_type in FuelType.objects.all():
-            latest_price = FuelPrice.objects.filter(
-                station_id=station_id,
-                fuel_type=fuel_type
-            ).order_by('-reported_at').first()
-            
-            if latest_price:
-                latest_prices.append(FuelPriceSerializer(latest_price).data)
-                
-        return Response(latest_prices)
+        latest_prices = [current.fuel_price for current in current_prices]
+        return Response(FuelPriceSerializer(latest_prices, many=True).data)
 
 
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = ReviewCursorPagination
     filterset_fields = ['station', 'user', 'rating']
     
     def get_queryset(self):
-        return Review.objects.all().order_by('-created_at')
+        return Review.objects.select_related('user', 'station').prefetch_related('images').order_by('-created_at', '-id')
     
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            review = serializer.save(user=self.request.user)
+            review_changed(new=review_snapshot(review))
+    
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            old = review_snapshot(serializer.instance)
+            review = serializer.save()
+            review_changed(old=old, new=review_snapshot(review))
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            old = review_snapshot(instance)
+            instance.delete()
+            review_changed(old=old)
 
 
 class FavoriteViewSet(viewsets.ModelViewSet):
     serializer_class = FavoriteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = STATION_LIST_RENDERERS
     
     def get_queryset(self):
-        return Favorite.objects.filter(user=self.request.user)
+        return Favorite.objects.filter(user=self.request.user).select_related(
+            'station__company', 'station__current_traffic'
+        )
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -1136,29 +1228,20 @@ class TripPlanViewSet(viewsets.ModelViewSet):
             
             # Find nearest station to this point (within 5km)
             # In a real app, this would use a route-based approach rather than straight line
-            stations = PetrolStation.objects.filter(
+            stations = list(PetrolStation.objects.filter(
                 is_active=True,
                 latitude__range=(point_lat - 0.045, point_lat + 0.045),
                 longitude__range=(point_lng - 0.045, point_lng + 0.045)
-            )
+            ))
             
             nearest_station = None
-            min_distance = float('inf')
-            
-            for station in stations:
-                # Calculate distance from station to point using Haversine
-                R = 6371  # Earth radius in km
-                dlat = math.radians(float(station.latitude) - point_lat)
-                dlng = math.radians(float(station.longitude) - point_lng)
-                a = (math.sin(dlat/2) * math.sin(dlat/2) + 
-                     math.cos(math.radians(point_lat)) * math.cos(math.radians(float(station.latitude))) *
-                     math.sin(dlng/2) * math.sin(dlng/2))
-                c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-                distance = R * c
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_station = station
+            if stations:
+                distances = distances_from(
+                    point_lat, point_lng,
+                    as_coordinates(s.latitude for s in stations),
+                    as_coordinates(s.longitude for s in stations),
+                )
+                nearest_station = stations[int(np.nanargmin(distances))]
             
             # If no station found within radius, create a note but continue
             if not nearest_station:
@@ -1195,14 +1278,12 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
-        notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        mark_notification_read(self.get_object())
         return Response({"status": "notification marked as read"})
     
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        mark_all_notifications_read(request.user)
         return Response({"status": "all notifications marked as read"})
 
 
@@ -1239,10 +1320,8 @@ class DashboardViewSet(viewsets.ViewSet):
         # Get recent price alerts
         active_alerts = PriceAlert.objects.filter(user=user, is_active=True).count()
         
-        # Get unread notifications
-        unread_notifications = Notification.objects.filter(
-            user=user, is_read=False
-        ).count()
+        # Unread notifications, from the user's denormalized counter
+        unread_notifications = user.unread_notifications
         
         # Calculate fuel spending this month
         today = timezone.now()
@@ -1280,25 +1359,14 @@ class EnhancedPetrolStationSerializer(serializers.ModelSerializer):
     
     def get_current_prices(self, obj):
         """Get latest prices for each fuel type"""
-        latest_prices = []
-        
-        for fuel_type in FuelType.objects.all():
-            latest_price = FuelPrice.objects.filter(
-                station=obj,
-                fuel_type=fuel_type
-            ).order_by('-reported_at').first()
-            
-            if latest_price:
-                latest_prices.append({
-                    'fuel_type': fuel_type.name,
-                    'price': float(latest_price.price),
-                    'reported_at': latest_price.reported_at,
-                    'source': latest_price.source,
-                    'confidence_score': latest_price.confidence_score,
-                    'price_change': float(latest_price.price_change) if latest_price.price_change else None
-                })
-        
-        return latest_prices
+        return [{
+            'fuel_type': current.fuel_type.name,
+            'price': float(current.price),
+            'reported_at': current.reported_at,
+            'source': current.source,
+            'confidence_score': current.confidence_score,
+            'price_change': float(current.price_change) if current.price_change else None
+        } for current in obj.current_prices.select_related('fuel_type')]
     
     def get_price_trend(self, obj):
         """Calculate price trend over the last week"""
@@ -1333,187 +1401,42 @@ class EnhancedPetrolStationSerializer(serializers.ModelSerializer):
 class FuelPriceEnhancer:
     """Enhanced fuel price service with web scraping and intelligent fallbacks"""
     
-    def __init__(self):
-        self.cache_timeout = 3600  # 1 hour cache
-        self.price_sources = [
-            'https://www.fuelprices.co.za/',
-            'https://www.aa.co.za/fuel-price',
-            'https://www.automobil.co.za/fuel-prices/',
-        ]
-        
-        # Base prices for South Africa (updated monthly by government)
-        self.sa_base_prices = {
-            'petrol_93': 23.50,  # R per liter
-            'petrol_95': 24.20,
-            'diesel_0005': 22.80,
-            'diesel_005': 22.90,
-        }
-    
     def get_current_fuel_prices(self, location: Dict = None) -> Dict:
-        """Get current fuel prices with multiple sources and caching"""
-        cache_key = f"fuel_prices_{location.get('province', 'national') if location else 'national'}"
-        
-        # Try cache first
-        cached_prices = cache.get(cache_key)
-        if cached_prices:
-            logger.info("Returning cached fuel prices")
-            return cached_prices
+        """Get current fuel prices from the stored baseline; never scrapes on the request path"""
+        # Stale baselines are still served; get_price_baseline queues a background refresh
+        snapshot = get_price_baseline()
+        if snapshot and snapshot.prices:
+            return dict(snapshot.prices)
         
-        # Try web scraping
+        # Nothing scraped yet: fall back to base prices with regional adjustments
+        return self._get_fallback_prices(location)
+    
+    def refresh_baseline(self) -> Optional[Dict]:
+        """Scrape the price sites and store the result (run from the refresh_price_baselines task)"""
         scraped_prices = self._scrape_fuel_prices()
         if scraped_prices:
-            cache.set(cache_key, scraped_prices, self.cache_timeout)
-            return scraped_prices
-        
-        # Fallback to base prices with regional adjustments
-        fallback_prices = self._get_fallback_prices(location)
-        cache.set(cache_key, fallback_prices, 1800)  # Cache for 30 minutes
-        return fallback_prices
+            save_price_baseline(scraped_prices, source=scraped_prices.get('source', 'scraped'))
+        return scraped_prices
     
     def _scrape_fuel_prices(self) -> Optional[Dict]:
-        """Scrape fuel prices from South African websites"""
-        for source_url in self.price_sources:
-            try:
-                logger.info(f"Scraping fuel prices from {source_url}")
-                
-                if 'fuelprices.co.za' in source_url:
-                    prices = self._scrape_fuelprices_co_za()
-                elif 'aa.co.za' in source_url:
-                    prices = self._scrape_aa_co_za()
-                elif 'automobil.co.za' in source_url:
-                    prices = self._scrape_automobil_co_za()
-                else:
-                    continue
-                
-                if prices and self._validate_prices(prices):
-                    logger.info(f"Successfully scraped prices from {source_url}")
-                    return prices
-                    
-            except Exception as e:
-                logger.error(f"Error scraping {source_url}: {str(e)}")
-                continue
-        
-        logger.warning("All scraping attempts failed")
-        return None
-    
-    def _scrape_fuelprices_co_za(self) -> Optional[Dict]:
-        """Scrape from fuelprices.co.za"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get('https://www.fuelprices.co.za/', headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            prices = {}
-            
-            # Look for price tables or divs
-            price_elements = soup.find_all(['div', 'td', 'span'], class_=re.compile(r'price|fuel', re.I))
-            
-            for element in price_elements:
-                text = element.get_text().strip()
-                
-                # Extract prices using regex
-                price_match = re.search(r'R?(\d+\.?\d*)', text)
-                if price_match:
-                    price = float(price_match.group(1))
-                    
-                    if 'petrol' in text.lower() or '93' in text:
-                        prices['regular'] = price
-                    elif '95' in text or 'premium' in text.lower():
-                        prices['premium'] = price
-                    elif 'diesel' in text.lower():
-                        prices['diesel'] = price
-            
-            return self._format_prices(prices) if prices else None
-            
-        except Exception as e:
-            logger.error(f"Error scraping fuelprices.co.za: {str(e)}")
-            return None
-    
-    def _scrape_aa_co_za(self) -> Optional[Dict]:
-        """Scrape from AA South Africa"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get('https://www.aa.co.za/fuel-price', headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            prices = {}
-            
-            # Look for fuel price sections
-            fuel_sections = soup.find_all(['div', 'table'], class_=re.compile(r'fuel|price', re.I))
-            
-            for section in fuel_sections:
-                text = section.get_text()
-                
-                # Extract petrol prices
-                petrol_match = re.search(r'Petrol.*?R(\d+\.?\d*)', text, re.I)
-                if petrol_match:
-                    prices['regular'] = float(petrol_match.group(1))
-                
-                # Extract diesel prices
-                diesel_match = re.search(r'Diesel.*?R(\d+\.?\d*)', text, re.I)
-                if diesel_match:
-                    prices['diesel'] = float(diesel_match.group(1))
-            
-            return self._format_prices(prices) if prices else None
-            
-        except Exception as e:
-            logger.error(f"Error scraping AA: {str(e)}")
-            return None
+        """Scrape fuel prices from South African websites, all at once; first valid result wins"""
+        prices = race_scrapers(self._accept_scraped_prices)
+        if not prices:
+            logger.warning("All scraping attempts failed")
+        return prices
     
-    def _scrape_automobil_co_za(self) -> Optional[Dict]:
-        """Scrape from automobil.co.za"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get('https://www.automobil.co.za/fuel-prices/', headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            prices = {}
-            
-            # Look for price tables
-            tables = soup.find_all('table')
-            for table in tables:
-                rows = table.find_all('tr')
-                for row in rows:
-                    cells = row.find_all(['td', 'th'])
-                    if len(cells) >= 2:
-                        fuel_type = cells[0].get_text().strip().lower()
-                        price_text = cells[1].get_text().strip()
-                        
-                        price_match = re.search(r'R?(\d+\.?\d*)', price_text)
-                        if price_match:
-                            price = float(price_match.group(1))
-                            
-                            if 'petrol' in fuel_type or '93' in fuel_type:
-                                prices['regular'] = price
-                            elif '95' in fuel_type or 'premium' in fuel_type:
-                                prices['premium'] = price
-                            elif 'diesel' in fuel_type:
-                                prices['diesel'] = price
-            
-            return self._format_prices(prices) if prices else None
-            
-        except Exception as e:
-            logger.error(f"Error scraping automobil.co.za: {str(e)}")
-            return None
+    def _accept_scraped_prices(self, raw_prices: Dict) -> Optional[Dict]:
+        prices = self._format_prices(raw_prices)
+        return prices if self._validate_prices(prices) else None
     
     def _format_prices(self, raw_prices: Dict) -> Dict:
         """Format scraped prices into standard structure"""
+        # Grades a site doesn't list are filled from the official baseline
+        official = get_official_prices()
         return {
-            'regular': raw_prices.get('regular', self.sa_base_prices['petrol_93']),
-            'premium': raw_prices.get('premium', self.sa_base_prices['petrol_95']),
-            'diesel': raw_prices.get('diesel', self.sa_base_prices['diesel_0005']),
+            'regular': raw_prices.get('regular', official['regular']),
+            'premium': raw_prices.get('premium', official['premium']),
+            'diesel': raw_prices.get('diesel', official['diesel']),
             'last_updated': datetime.now().isoformat(),
             'source': 'scraped'
         }
@@ -1534,7 +1457,7 @@ class FuelPriceEnhancer:
     
     def _get_fallback_prices(self, location: Dict = None) -> Dict:
         """Get fallback prices based on base prices and regional adjustments"""
-        base_prices = self.sa_base_prices.copy()
+        base_prices = get_official_prices()
         
         # Apply regional adjustments
         if location:
@@ -1557,17 +1480,17 @@ class FuelPriceEnhancer:
             adjustment = regional_adjustments.get(province, {'regular': 0, 'premium': 0, 'diesel': 0})
             
             return {
-                'regular': base_prices['petrol_93'] + adjustment['regular'],
-                'premium': base_prices['petrol_95'] + adjustment['premium'],
-                'diesel': base_prices['diesel_0005'] + adjustment['diesel'],
+                'regular': base_prices['regular'] + adjustment['regular'],
+                'premium': base_prices['premium'] + adjustment['premium'],
+                'diesel': base_prices['diesel'] + adjustment['diesel'],
                 'last_updated': datetime.now().isoformat(),
                 'source': 'fallback_regional'
             }
         
         return {
-            'regular': base_prices['petrol_93'],
-            'premium': base_prices['petrol_95'],
-            'diesel': base_prices['diesel_0005'],
+            'regular': base_prices['regular'],
+            'premium': base_prices['premium'],
+            'diesel': base_prices['diesel'],
             'last_updated': datetime.now().isoformat(),
             'source': 'fallback_base'
         }
@@ -1580,53 +1503,61 @@ class PetrolStationEnhancedMethods:
     def __init__(self):
         self.price_enhancer = FuelPriceEnhancer()
     
-    def _get_official_price_baselines(self) -> Dict:
-        """Get official fuel price baselines"""
-        return self.price_enhancer.get_current_fuel_prices()
-    
-    def _calculate_regional_adjustments(self, stations: List[Dict]) -> Dict:
-        """Calculate regional price adjustments based on station locations"""
-        regional_data = {}
-        
+    def _get_official_price_baselines(self, price_zone: str = None) -> Dict:
+        """Get official fuel price baselines in force today for a price zone"""
+        official = get_official_prices(zone=price_zone or 'inland')
+        if official['effective_date'] is None:
+            # Nothing published in the table yet; use the scraped baseline
+            return self.price_enhancer.get_current_fuel_prices()
+        return official
+    
+    def _calculate_regional_adjustments(self, stations: List[Dict]) -> Dict[int, Region]:
+        """Province and price zone per station dict (keyed by id()), preferring values stored at import"""
+        regions = {}
         for station in stations:
-            try:
-                # Extract location info from address or coordinates
-                address = station.get('address', '').lower()
-                
-                # Determine province/region from address
-                province = self._extract_province_from_address(address)
-                if province:
-                    if province not in regional_data:
-                        regional_data[province] = []
-                    regional_data[province].append(station)
-            except Exception as e:
-                logger.error(f"Error processing station for regional adjustment: {e}")
-                continue
-        
-        return regional_data
+            if station.get('price_zone'):
+                regions[id(station)] = Region(station.get('province', ''), station['price_zone'])
+            else:
+                regions[id(station)] = resolve_region(station.get('latitude'), station.get('longitude'))
+        return regions
     
     def _enhance_with_prices_implementation(self, stations: List[Dict]) -> List[Dict]:
         """Enhanced price logic with web scraping and intelligent fallbacks"""
         enhanced = []
         
         try:
-            # 1. Get official price baselines
-            official_prices = self._get_official_price_baselines()
+            # 1. Resolve each station's price zone and get the official baselines for those zones
+            regions = self._calculate_regional_adjustments(stations)
+            baselines = {
+                price_zone: self._get_official_price_baselines(price_zone)
+                for price_zone in {region.price_zone for region in regions.values()}
+            }
             
-            # 2. Get regional price adjustments
-            regional_adjustments = self._calculate_regional_adjustments(stations)
+            # 2. Estimate every non-database station, one batch per price zone
+            estimated = {}
+            for price_zone, official_prices in baselines.items():
+                estimated.update(self._estimate_prices_batch([
+                    station for station in stations
+                    if not self._is_db_station(station) and regions[id(station)].price_zone == price_zone
+                ], official_prices))
+            
+            # 3. Recent prices for every database station in one query
+            recent_db_prices = self._get_recent_db_prices(
+                [station['id'] for station in stations if self._is_db_station(station)]
+            )
             
             for station_data in stations:
                 try:
                     prices = []
                     
                     # Database stations get precise pricing
-                    if station_data.get('source') == 'database' and station_data.get('id'):
-                        prices = self._get_db_station_prices(station_data, official_prices)
+                    if self._is_db_station(station_data):
+                        official_prices = baselines[regions[id(station_data)].price_zone]
+                        prices = self._get_db_station_prices(station_data, official_prices, recent_db_prices)
                     
                     # Google/other stations get estimated pricing
                     else:
-                        prices = self._estimate_prices_for_station(station_data, official_prices, regional_adjustments)
+                        prices = estimated[id(station_data)]
                     
                     # Enhance station data
                     station_data.update({
@@ -1695,191 +1626,64 @@ class PetrolStationEnhancedMethods:
         
         return min(1.0, score)
     
-    def _extract_province_from_address(self, address: str) -> Optional[str]:
-        """Extract province from address string"""
-        province_keywords = {
-            'western cape': ['cape town', 'stellenbosch', 'paarl', 'george', 'mossel bay'],
-            'gauteng': ['johannesburg', 'pretoria', 'soweto', 'sandton', 'roodepoort'],
-            'kwazulu-natal': ['durban', 'pietermaritzburg', 'newcastle', 'richards bay'],
-            'eastern cape': ['port elizabeth', 'east london', 'grahamstown', 'uitenhage'],
-            'free state': ['bloemfontein', 'welkom', 'kroonstad', 'bethlehem'],
-            'northern cape': ['kimberley', 'upington', 'springbok', 'kathu'],
-            'mpumalanga': ['nelspruit', 'witbank', 'secunda', 'middelburg'],
-            'limpopo': ['polokwane', 'tzaneen', 'thohoyandou', 'mokopane'],
-            'north west': ['mahikeng', 'potchefstroom', 'klerksdorp', 'mmabatho']
-        }
-        
-        for province, cities in province_keywords.items():
-            if any(city in address for city in cities):
-                return province
-        
-        return None
-    
-    def _get_db_station_prices(self, station_data: Dict, official_prices: Dict) -> List[Dict]:
+    def _get_db_station_prices(self, station_data: Dict, official_prices: Dict,
+                               recent_prices: Dict = None) -> List[Dict]:
         """Get prices for database stations with recent price records"""
         try:
             station_id = station_data.get('id')
             if not station_id:
                 return self._create_estimated_prices(official_prices, station_data)
             
-            # Try to get recent price records from database
-            from .models import FuelPrice  # Adjust import as needed
-            recent_prices = FuelPrice.objects.filter(
-                station_id=station_id,
-                created_at__gte=datetime.now() - timedelta(days=7)
-            ).order_by('-created_at')
+            if recent_prices is None:
+                recent_prices = self._get_recent_db_prices([station_id])
             
-            if recent_prices.exists():
-                # Convert database prices to API format
-                prices = []
-                for price_record in recent_prices[:3]:  # Latest 3 records
-                    prices.append({
-                        'fuel_type': price_record.fuel_type,
-                        'price': float(price_record.price),
-                        'last_updated': price_record.created_at.isoformat(),
-                        'reliability_score': 0.9,  # High reliability for DB data
-                        'source': 'database'
-                    })
-                return prices
-            else:
-                # No recent data, return estimated prices
-                return self._create_estimated_prices(official_prices, station_data)
+            # No recent data, return estimated prices
+            return recent_prices.get(str(station_id)) or self._create_estimated_prices(official_prices, station_data)
                 
         except Exception as e:
             logger.error(f"Error getting DB station prices: {e}")
             return self._create_estimated_prices(official_prices, station_data)
     
-    def _estimate_prices_for_station(self, station_data: Dict, official_prices: Dict, regional_adjustments: Dict) -> List[Dict]:
-        """Estimate prices for stations without database records"""
+    def _get_recent_db_prices(self, station_ids: List) -> Dict[str, List[Dict]]:
+        """Prices reported in the last 7 days for many database stations, in one query"""
+        recent = StationCurrentPrice.objects.filter(
+            station_id__in=station_ids,
+            reported_at__gte=timezone.now() - timedelta(days=7)
+        ).order_by('station_id', '-reported_at').values_list(
+            'station_id', 'fuel_type__name', 'price', 'reported_at'
+        )
+        
+        prices = defaultdict(list)
+        for station_id, fuel_type, price, reported_at in recent:
+            prices[str(station_id)].append({
+                'fuel_type': fuel_type.lower(),
+                'price': float(price),
+                'last_updated': reported_at.isoformat(),
+                'reliability_score': 0.9,  # High reliability for DB data
+                'source': 'database'
+            })
+        return prices
+    
+    def _is_db_station(self, station_data: Dict) -> bool:
+        return station_data.get('source') == 'database' and bool(station_data.get('id'))
+    
+    def _estimate_prices_batch(self, stations: List[Dict], official_prices: Dict) -> Dict[int, List[Dict]]:
+        """Estimated prices for many stations at once, keyed by id() of each station dict"""
         try:
-            base_prices = official_prices
-            
-            # Apply brand-based adjustments
-            brand_adjustments = self._get_brand_price_adjustments(station_data.get('name', ''))
-            
-            # Apply location-based adjustments
-            location_adjustments = self._get_location_price_adjustments(station_data)
-            
-            # Apply quality-based adjustments
-            quality_adjustments = self._get_quality_price_adjustments(station_data)
-            
-            estimated_prices = []
-            
-            for fuel_type in ['regular', 'premium', 'diesel']:
-                base_price = base_prices.get(fuel_type, 23.0)
-                
-                # Apply all adjustments
-                final_price = base_price
-                final_price += brand_adjustments.get(fuel_type, 0)
-                final_price += location_adjustments.get(fuel_type, 0)
-                final_price += quality_adjustments.get(fuel_type, 0)
-                
-                # Add some randomness for realism (±0.10)
-                import random
-                final_price += random.uniform(-0.10, 0.10)
-                
-                estimated_prices.append({
-                    'fuel_type': fuel_type,
-                    'price': round(final_price, 2),
-                    'last_updated': datetime.now().isoformat(),
-                    'reliability_score': 0.6,  # Medium reliability for estimates
-                    'source': 'estimated'
-                })
-            
-            return estimated_prices
-            
+            estimates = get_price_estimator().estimate(stations, official_prices)
         except Exception as e:
             logger.error(f"Error estimating prices: {e}")
-            return self._create_fallback_prices_list(official_prices)
-    
-    def _get_brand_price_adjustments(self, station_name: str) -> Dict:
-        """Get price adjustments based on fuel station brand"""
-        name_lower = station_name.lower()
-        
-        brand_adjustments = {
-            'shell': {'regular': 0.15, 'premium': 0.20, 'diesel': 0.10},
-            'bp': {'regular': 0.12, 'premium': 0.18, 'diesel': 0.08},
-            'total': {'regular': 0.10, 'premium': 0.15, 'diesel': 0.05},
-            'engen': {'regular': 0.08, 'premium': 0.12, 'diesel': 0.03},
-            'sasol': {'regular': 0.05, 'premium': 0.08, 'diesel': 0.02},
-            'caltex': {'regular': 0.07, 'premium': 0.10, 'diesel': 0.04},
-        }
-        
-        for brand, adjustments in brand_adjustments.items():
-            if brand in name_lower:
-                return adjustments
-        
-        # Default for unknown brands
-        return {'regular': 0, 'premium': 0, 'diesel': 0}
+            estimates = [self._create_fallback_prices_list(official_prices) for _ in stations]
+        return {id(station): prices for station, prices in zip(stations, estimates)}
     
-    def _get_location_price_adjustments(self, station_data: Dict) -> Dict:
-        """Get price adjustments based on location (highway, city center, etc.)"""
-        address = station_data.get('address', '').lower()
-        
-        # Highway stations typically charge more
-        if any(keyword in address for keyword in ['highway', 'n1', 'n2', 'n3', 'n4', 'freeway']):
-            return {'regular': 0.20, 'premium': 0.25, 'diesel': 0.15}
-        
-        # City center stations
-        if any(keyword in address for keyword in ['cbd', 'city', 'center', 'central']):
-            return {'regular': 0.10, 'premium': 0.12, 'diesel': 0.08}
-        
-        # Township/rural areas might be cheaper
-        if any(keyword in address for keyword in ['township', 'rural', 'village']):
-            return {'regular': -0.05, 'premium': -0.08, 'diesel': -0.03}
-        
-        return {'regular': 0, 'premium': 0, 'diesel': 0}
-    
-    def _get_quality_price_adjustments(self, station_data: Dict) -> Dict:
-        """Get price adjustments based on station quality/rating"""
-        rating = station_data.get('rating') or station_data.get('google_rating')
-        
-        if rating is None:
-            return {'regular': 0, 'premium': 0, 'diesel': 0}
-        
-        try:
-            rating = float(rating)
-            
-            if rating >= 4.5:
-                return {'regular': 0.08, 'premium': 0.10, 'diesel': 0.05}
-            elif rating >= 4.0:
-                return {'regular': 0.05, 'premium': 0.07, 'diesel': 0.03}
-            elif rating >= 3.5:
-                return {'regular': 0.02, 'premium': 0.03, 'diesel': 0.01}
-            elif rating < 3.0:
-                return {'regular': -0.03, 'premium': -0.05, 'diesel': -0.02}
-            
-        except (ValueError, TypeError):
-            pass
-        
-        return {'regular': 0, 'premium': 0, 'diesel': 0}
+    def _estimate_prices_for_station(self, station_data: Dict, official_prices: Dict) -> List[Dict]:
+        """Estimate prices for stations without database records"""
+        return self._estimate_prices_batch([station_data], official_prices)[id(station_data)]
     
     def _create_estimated_prices(self, official_prices: Dict, station_data: Dict) -> List[Dict]:
         """Create estimated prices based on official prices and station characteristics"""
-        prices = []
-        
-        for fuel_type in ['regular', 'premium', 'diesel']:
-            base_price = official_prices.get(fuel_type, 23.0)
-            
-            # Apply station-specific adjustments
-            brand_adj = self._get_brand_price_adjustments(station_data.get('name', ''))
-            location_adj = self._get_location_price_adjustments(station_data)
-            quality_adj = self._get_quality_price_adjustments(station_data)
-            
-            final_price = base_price
-            final_price += brand_adj.get(fuel_type, 0)
-            final_price += location_adj.get(fuel_type, 0)
-            final_price += quality_adj.get(fuel_type, 0)
-            
-            prices.append({
-                'fuel_type': fuel_type,
-                'price': round(final_price, 2),
-                'last_updated': datetime.now().isoformat(),
-                'reliability_score': 0.7,
-                'source': 'estimated'
-            })
-        
-        return prices
+        # Database stations are estimated without jitter, as before
+        return get_price_estimator().estimate([station_data], official_prices, jitter=False, reliability=0.7)[0]
     
     def _create_fallback_prices_list(self, official_prices: Dict) -> List[Dict]:
         """Create fallback price list when all else fails"""
@@ -1909,12 +1713,13 @@ class PetrolStationEnhancedMethods:
     
     def _create_fallback_prices(self, station_data: Dict) -> Dict:
         """Create fallback station data when price enhancement fails"""
+        official = get_official_prices()
         station_data.update({
-            'current_prices': self._create_fallback_prices_list(self.price_enhancer.sa_base_prices),
+            'current_prices': self._create_fallback_prices_list(official),
             'has_price_data': True,
             'reliability_score': 0.4,
-            'regular_price': 23.50,
-            'premium_price': 24.20,
-            'diesel_price': 22.80
+            'regular_price': official['regular'],
+            'premium_price': official['premium'],
+            'diesel_price': official['diesel']
         })
         return station_data
\ No newline at end of file
@@ -163,30 +163,106 @@ OOGLE_PLACES_API_KEY = env('GOOGLE_PLACES_API_KEY')
 EIA_API_KEY = env('EIA_API_KEY')  # US Energy Information Administration
 GASBUDDY_API_KEY = os.environ.get('GASBUDDY_API_KEY')  # If available
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-dev-cache',
+# The in-process indexes (stations, regions, official prices, price alerts) hear about
+# changes through version keys in this cache, so web and Celery workers should share it.
+# Without CACHE_REDIS_URL each process has its own LocMemCache and the indexes fall
+# back to their periodic resyncs below.
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-dev-cache',
+        }
+    }
+
+# Station grid index: seconds between delta syncs from updated_at, whatever the version key says
+STATION_INDEX_SYNC_SECONDS = 30
+
+# Official price table: seconds after which workers reload it, whatever the version key says
+OFFICIAL_PRICES_MAX_STALENESS = 300
+
+# Region resolver: seconds between checks of the boundary table for changes made by other processes
+REGION_RESOLVER_CHECK_SECONDS = 60
 
 CELERY_BROKER_URL = 'redis://localhost:6379'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379'
 CELERY_BEAT_SCHEDULE = {
     'sync-fuel-prices': {
-        'task': 'stations.tasks.sync_fuel_prices',
+        'task': 'api.tasks.sync_fuel_prices',
         'schedule': crontab(minute=0, hour='*/2'),  # Every 2 hours
     },
     'sync-google-places': {
-        'task': 'stations.tasks.sync_google_places_data',
+        'task': 'api.tasks.sync_google_places_data',
         'schedule': crontab(minute=0, hour=1),  # Daily at 1 AM
     },
     'cleanup-old-prices': {
-        'task': 'stations.tasks.cleanup_old_price_data',
+        'task': 'api.tasks.cleanup_old_price_data',
         'schedule': crontab(minute=0, hour=2),  # Daily at 2 AM
     },
+    'refresh-price-baselines': {
+        'task': 'api.tasks.refresh_price_baselines',
+        'schedule': crontab(minute='*/30'),  # Every 30 minutes
+    },
+    'prune-change-log': {
+        'task': 'api.tasks.prune_change_log',
+        'schedule': crontab(minute=30, hour=2),  # Daily at 2:30 AM
+    },
 }
 
+# Fuel price sync (sync_fuel_prices): stations per batch, and an optional cap per run
+FUEL_PRICE_SYNC_BATCH_SIZE = 200
+FUEL_PRICE_SYNC_MAX_STATIONS = None
+
+# External price sources: overall per-station deadline (seconds) and thread pool size
+FUEL_PRICE_SOURCE_DEADLINE = 12
+FUEL_PRICE_SOURCE_WORKERS = 8
+
+# Price scrapers race each other; overall budget (seconds) for one baseline refresh
+FUEL_PRICE_SCRAPE_DEADLINE = 15
+
+# Scraped price baselines: age (seconds) after which a read queues a background
+# refresh, and how long that refresh lock is held if the task never reports back
+PRICE_BASELINE_MAX_AGE = 3600
+PRICE_BASELINE_REFRESH_LOCK_TIMEOUT = 300
+
+# Price alerts: an alert notifies at most once per station within this many hours;
+# workers pick up alert edits signalled through the cache after at most MAX_STALENESS
+# seconds, and reload regardless after MAX_AGE (for processes not sharing the cache)
+PRICE_ALERT_DEDUP_HOURS = 24
+PRICE_ALERT_INDEX_MAX_STALENESS = 60
+PRICE_ALERT_INDEX_MAX_AGE = 300
+
+# Favourite station price drops: smallest drop (rand per litre) worth a notification,
+# and hours before the same user hears about the same station again
+FAVORITE_PRICE_DROP_MIN = 0.10
+FAVORITE_PRICE_DROP_COOLDOWN_HOURS = 24
+
+# Live update stream (SSE): Redis pub/sub channel shared by all workers, seconds
+# between keep-alives, stations one stream may watch, and publish back-off after errors
+LIVE_UPDATES_REDIS_URL = CELERY_BROKER_URL
+LIVE_UPDATES_CHANNEL = 'live_updates'
+LIVE_UPDATES_HEARTBEAT = 15
+LIVE_UPDATES_MAX_STATIONS = 200
+LIVE_UPDATES_RETRY_SECONDS = 30
+
+# Delta sync (changes endpoint): entries younger than the settle window are held back
+# so concurrent writers can't slip in below a cursor; older entries are pruned
+CHANGE_LOG_SETTLE_SECONDS = 5
+CHANGE_LOG_RETENTION_DAYS = 30
+
+# Fuel price history retention (cleanup_old_price_data)
+PRICE_RETENTION_DAYS = 30
+PRICE_RETENTION_KEEP = 10  # Older records kept per station/fuel type
+PRICE_RETENTION_CHUNK_SIZE = 5000
+
 # Rate limiting for API calls
 RATELIMIT_ENABLE = True
 RATELIMIT_USE_CACHE = 'default'